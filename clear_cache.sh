@@ -16,8 +16,9 @@ sudo systemctl restart nginx
 
 # Force Django to regenerate static file manifests
 echo "Regenerating Django static file manifests..."
-cd /var/www/podcast_cms
-source venv/bin/activate
+# Only the live release: older releases keep their own files for rollbacks
+source /var/www/podcast_cms/venv/bin/activate
+cd /var/www/podcast_cms/current
 python manage.py collectstatic --noinput --clear
 
 echo "Cache clearing completed!"
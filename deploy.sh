@@ -1,11 +1,90 @@
 #!/bin/bash
 
+# Zero-downtime deployment.
+#
+# Each deploy is built into its own directory under releases/, with its own
+# static files. Once it is ready, the "current" symlink is switched atomically
+# and Gunicorn is reloaded gracefully with HUP: old workers finish their
+# requests while new ones start from the new release.
+#
+#   /var/www/podcast_cms/            git checkout, venv and .env (shared)
+#   /var/www/podcast_cms/media/      uploaded media (shared)
+#   /var/www/podcast_cms/releases/   one directory per deploy
+#   /var/www/podcast_cms/current ->  releases/<the live one>
+#
+# Gunicorn must run with "-c /var/www/podcast_cms/current/gunicorn.conf.py" and
+# nginx must serve /static/ from /var/www/podcast_cms/current/staticfiles/.
+#
+# Usage: ./deploy.sh              build and switch to a new release
+#        ./deploy.sh --rollback   switch back to the previous release
+
+set -o pipefail
+
+APP_DIR=/var/www/podcast_cms
+RELEASES_DIR=$APP_DIR/releases
+CURRENT=$APP_DIR/current
+KEEP_RELEASES=5
+SERVICE=gunicorn-intothemoss
+# Where Gunicorn listens, and how many requests per page reach every worker
+WARM_URL=${WARM_URL:-http://127.0.0.1:8000}
+WARM_REPEAT=${WARM_REPEAT:-8}
+
 # Set up environment variables
 export DJANGO_SETTINGS_MODULE=podcast_cms.settings
-export PYTHONPATH=/var/www/podcast_cms
 
 # Go to the project directory
-cd /var/www/podcast_cms
+cd $APP_DIR
+
+switch_release() {
+    # rename() over the old link is atomic, so every request sees one release
+    ln -sfn "$1" "$CURRENT.tmp"
+    mv -Tf "$CURRENT.tmp" "$CURRENT"
+    echo "Current release: $(readlink "$CURRENT")"
+}
+
+preloads_app() {
+    # Ask gunicorn.conf.py, so that .env is parsed (quotes, spaces, CRLF line
+    # endings) exactly as Gunicorn will parse it
+    [ "$("$APP_DIR/venv/bin/python" -c 'import runpy, sys; print(runpy.run_path(sys.argv[1])["preload_app"])' "$CURRENT/gunicorn.conf.py")" = "True" ]
+}
+
+reload_gunicorn() {
+    GUNICORN_PID=$(systemctl show -p MainPID --value $SERVICE)
+    if [ -z "$GUNICORN_PID" ] || [ "$GUNICORN_PID" = "0" ]; then
+        echo "Gunicorn isn't running, starting it..."
+        sudo systemctl start $SERVICE
+    elif preloads_app; then
+        # Preloaded workers fork from a master holding the old code, so a HUP
+        # would bring it straight back. Restart the master instead: requests
+        # wait in the gunicorn socket unit's backlog while it boots.
+        echo "Restarting preloaded Gunicorn..."
+        sudo systemctl restart $SERVICE
+    else
+        echo "Reloading Gunicorn gracefully..."
+        sudo kill -HUP "$GUNICORN_PID"
+    fi
+
+    # Check Gunicorn status
+    sleep 2
+    if ! sudo systemctl is-active --quiet $SERVICE; then
+        echo "Error: Gunicorn failed to reload!"
+        sudo systemctl status $SERVICE
+        exit 1
+    fi
+}
+
+if [ "$1" = "--rollback" ]; then
+    # The newest release older than the live one
+    PREVIOUS=$(ls -1d "$RELEASES_DIR"/*/ 2>/dev/null | sed 's#/$##' | grep -B 1 -x "$(readlink "$CURRENT")" | head -n -1)
+    if [ -z "$PREVIOUS" ]; then
+        echo "No previous release to roll back to"
+        exit 1
+    fi
+    echo "Rolling back to $PREVIOUS..."
+    switch_release "$PREVIOUS"
+    reload_gunicorn
+    exit 0
+fi
 
 echo "Starting deployment..."
 
@@ -19,56 +98,81 @@ if [ $? -ne 0 ]; then
     exit 1
 fi
 
+RELEASE=$RELEASES_DIR/$(date +%Y%m%d%H%M%S)-$(git rev-parse --short HEAD)
+PREVIOUS_RELEASE=$(readlink "$CURRENT")
+export PYTHONPATH=$RELEASE
+
+# Build the release from the committed tree
+echo "Building release $RELEASE..."
+mkdir -p "$RELEASE"
+git archive HEAD | tar -x -C "$RELEASE"
+ln -s $APP_DIR/.env "$RELEASE/.env"
+ln -s $APP_DIR/media "$RELEASE/media"
+if [ -f $APP_DIR/db.sqlite3 ]; then
+    ln -s $APP_DIR/db.sqlite3 "$RELEASE/db.sqlite3"
+fi
+
 # Activate the virtual environment
 echo "Activating virtual environment..."
 source venv/bin/activate
 
 # Install/update dependencies
 echo "Installing/updating dependencies..."
-pip install -r requirements.txt
+pip install -r "$RELEASE/requirements.txt" || exit 1
+
+cd "$RELEASE"
 
 # Run migrations
 echo "Running database migrations..."
-python manage.py migrate
+python manage.py migrate --noinput || exit 1
 
-# Clear old static files to prevent caching issues
-echo "Clearing old static files..."
-rm -rf staticfiles/*
+# Start from the live release's static files (hard links, so this is cheap).
+# Pages still being served by old workers keep finding their hashed assets.
+if [ -n "$PREVIOUS_RELEASE" ] && [ -d "$PREVIOUS_RELEASE/staticfiles" ]; then
+    echo "Seeding static files from $PREVIOUS_RELEASE..."
+    cp -al "$PREVIOUS_RELEASE/staticfiles" "$RELEASE/staticfiles"
+fi
 
-# Collect static files with cache busting
+# Collect static files with cache busting. No --clear: unchanged files are
+# skipped, and the previous release's hashed names stay valid.
 echo "Collecting static files..."
-python manage.py collectstatic --noinput --clear
+python manage.py collectstatic --noinput || exit 1
 
 # Run system check
 echo "Running Django system check..."
-python manage.py check --deploy
+python manage.py check --deploy || exit 1
 
-# Restart Gunicorn
-echo "Restarting Gunicorn..."
-sudo systemctl restart gunicorn-intothemoss
+# Switch the live release and reload Gunicorn without dropping requests
+switch_release "$RELEASE"
+reload_gunicorn
 
-# Check Gunicorn status
-if ! sudo systemctl is-active --quiet gunicorn-intothemoss; then
-    echo "Error: Gunicorn failed to restart!"
-    sudo systemctl status gunicorn-intothemoss
-    exit 1
-fi
+# Build the feed, pages and renditions before aggregators find cold workers
+echo "Warming caches..."
+python manage.py warm_caches --url "$WARM_URL" --repeat $WARM_REPEAT || echo "Warning: cache warm-up failed"
 
-# Restart Apache
-echo "Restarting Apache..."
-sudo systemctl restart apache2
+# Reload Apache and Nginx gracefully
+echo "Reloading Apache..."
+sudo systemctl reload apache2
 
-# Reload Nginx
 sudo systemctl reload nginx
 
 # Check Nginx status
 if ! sudo systemctl is-active --quiet nginx; then
-    echo "Error: Nginx failed to restart!"
+    echo "Error: Nginx failed to reload!"
     sudo systemctl status nginx
     exit 1
 fi
 
+# Keep the last few releases for rollbacks
+echo "Removing old releases..."
+ls -1d "$RELEASES_DIR"/*/ | sed 's#/$##' | head -n -$KEEP_RELEASES | while read -r OLD; do
+    if [ "$OLD" != "$(readlink "$CURRENT")" ]; then
+        rm -rf "$OLD"
+    fi
+done
+
 echo "Deployment completed successfully!"
 echo "Services status:"
-echo "  Gunicorn: $(sudo systemctl is-active gunicorn-intothemoss)"
+echo "  Gunicorn: $(sudo systemctl is-active $SERVICE)"
 echo "  Nginx: $(sudo systemctl is-active nginx)"
+echo "  Release: $(readlink "$CURRENT")"
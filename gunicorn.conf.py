@@ -0,0 +1,41 @@
+"""
+Gunicorn settings for the site.
+
+Run with ``gunicorn -c /var/www/podcast_cms/current/gunicorn.conf.py``, through
+the ``current`` symlink, so that every start and reload picks up the live
+release. The bind address and number of workers stay on the command line.
+
+With ``GUNICORN_PRELOAD=True`` the app is imported and warmed once in the
+master, and workers fork with Django, Wagtail, the URLconf and the compiled
+templates already in memory. Workers then start in milliseconds and share
+those pages with the master, but a HUP no longer loads new code: deploy.sh
+restarts the service instead (see the README).
+"""
+
+import os
+
+import environ
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+env = environ.Env()
+environ.Env.read_env(os.path.join(BASE_DIR, ".env"))
+
+wsgi_app = "podcast_cms.wsgi"
+chdir = BASE_DIR
+preload_app = env.bool("GUNICORN_PRELOAD", default=False)
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from podcast_cms.startup import close_connections, warm_up
+
+        warm_up()
+        close_connections()
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        from podcast_cms.startup import warm_up
+
+        warm_up()
@@ -3,6 +3,15 @@ from wagtail.models import Page, Orderable
 from wagtail.fields import RichTextField
 from wagtail.admin.panels import FieldPanel, InlinePanel
 from modelcluster.fields import ParentalKey
+from podcast.cache import (
+    CachedPageMixin,
+    artifact_response,
+    get_artifact,
+    get_cached,
+    is_cacheable_request,
+    page_artifact_name,
+)
+from podcast.instrumentation import label_request
 
 
 class HomePage(Page):
@@ -16,34 +25,52 @@ class HomePage(Page):
     # Allow creating about, contact, and podcast index pages as children
     subpage_types = ["podcast.PodcastIndexPage", "home.AboutPage", "home.ContactPage"]
 
-    def serve(self, request):
-        """Redirect to the podcast index page if it exists."""
+    def get_podcast_index_id(self):
+        """
+        Return the ID of the podcast index this home page shows, cached per
+        site until pages are next published or moved.
+        """
         from podcast.models import (
             PodcastIndexPage,
         )  # Import here to avoid circular imports
 
-        # Find the first PodcastIndexPage in the site
-        podcast_index = None
-
-        try:
+        def find_podcast_index_id():
             # First check if there's a direct child that is a PodcastIndexPage
             podcast_index = PodcastIndexPage.objects.child_of(self).live().first()
 
             # If not found as a direct child, search more broadly
             if not podcast_index:
                 podcast_index = PodcastIndexPage.objects.live().first()
+            return podcast_index.pk if podcast_index else None
+
+        return get_cached(f"home:{self.pk}:podcast-index", find_podcast_index_id)
+
+    def serve(self, request):
+        """Serve the podcast index page in place, if it exists."""
+        from podcast.models import PodcastIndexPage
+
+        label_request("page:HomePage")
+        try:
+            podcast_index_id = self.get_podcast_index_id()
+            if podcast_index_id is None:
+                # Fall back to the default behavior if no podcast index exists yet
+                return super().serve(request)
+
+            # Share the index page's cached rendering without loading the page
+            if is_cacheable_request(request):
+                artifact = get_artifact(page_artifact_name(podcast_index_id))
+                if artifact is not None:
+                    return artifact_response(request, artifact)
+
+            podcast_index = PodcastIndexPage.objects.get(pk=podcast_index_id)
         except Exception as e:
             # Fall back to default behavior if any errors occur
             return super().serve(request)
 
-        if podcast_index:
-            return podcast_index.serve(request)
-        else:
-            # Fall back to the default behavior if no podcast index exists yet
-            return super().serve(request)
+        return podcast_index.serve(request)
 
 
-class AboutPage(Page):
+class AboutPage(CachedPageMixin, Page):
     """About page model."""
 
     body = RichTextField(blank=True)
@@ -71,7 +98,7 @@ class PlatformLink(Orderable):
     ]
 
 
-class ContactPage(Page):
+class ContactPage(CachedPageMixin, Page):
     """Contact page model."""
 
     body = RichTextField(blank=True)
@@ -0,0 +1,187 @@
+"""
+Read-only JSON API for the player apps.
+
+``/api/episodes/`` lists live episodes newest first, a page at a time with
+cursor pagination on the episode number, so a client walking the list never
+skips or repeats an episode when a new one is published. ``?fields=`` picks
+the fields to return. By default lists leave out the transcript and the cover,
+and ``/api/episodes/<number>/`` adds the URLs of the cover renditions, so apps
+never need to download the original image.
+
+Unknown query parameters are rejected, so that responses are rendered once
+per distinct set of parameters and stored as cached artifacts. Publishing
+invalidates them along with the feed. They carry an ETag, and a client
+sending it back in ``If-None-Match`` gets a 304.
+"""
+
+import hashlib
+from urllib.parse import urlencode
+
+from django.db.models import Prefetch
+from rest_framework import generics, serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from wagtail.images import get_image_model
+from wagtail.rich_text import expand_db_html
+
+from podcast.cache import artifact_response, get_or_build
+from podcast.models import COVER_RENDITIONS, PodcastEpisodePage
+
+# Every field a client can ask for
+EPISODE_FIELDS = (
+    "number",
+    "season",
+    "season_episode",
+    "title",
+    "url",
+    "published",
+    "description",
+    "duration",
+    "explicit",
+    "audio_url",
+    "guid",
+    "cover",
+    "transcript",
+)
+LIST_FIELDS = tuple(f for f in EPISODE_FIELDS if f not in ("cover", "transcript"))
+DETAIL_FIELDS = tuple(f for f in EPISODE_FIELDS if f != "transcript")
+
+
+class RichTextField(serializers.CharField):
+    """Rich text as HTML, with internal page and image links resolved."""
+
+    def to_representation(self, value):
+        return expand_db_html(value)
+
+
+class EpisodeSerializer(serializers.ModelSerializer):
+    number = serializers.IntegerField(source="episode_number")
+    season = serializers.IntegerField(source="season_number")
+    season_episode = serializers.IntegerField(source="season_episode_number")
+    url = serializers.SerializerMethodField()
+    published = serializers.DateTimeField(source="publication_date")
+    description = RichTextField()
+    transcript = RichTextField()
+    duration = serializers.IntegerField(source="duration_in_seconds")
+    explicit = serializers.BooleanField(source="explicit_content")
+    audio_url = serializers.SerializerMethodField()
+    cover = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PodcastEpisodePage
+        fields = EPISODE_FIELDS
+
+    def __init__(self, *args, fields=EPISODE_FIELDS, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in set(self.fields) - set(fields):
+            self.fields.pop(name)
+
+    def get_url(self, episode):
+        return episode.get_full_url(self.context["request"])
+
+    def get_audio_url(self, episode):
+        return self.context["request"].build_absolute_uri(episode.audio_url)
+
+    def get_cover(self, episode):
+        """The URL and size of each template rendition, keyed by filter spec."""
+        if episode.cover_image is None:
+            return None
+        request = self.context["request"]
+        renditions = episode.cover_image.get_renditions(*COVER_RENDITIONS)
+        return {
+            spec: {
+                "url": request.build_absolute_uri(rendition.url),
+                "width": rendition.width,
+                "height": rendition.height,
+            }
+            for spec, rendition in renditions.items()
+        }
+
+
+class EpisodePagination(CursorPagination):
+    ordering = "-episode_number"
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class EpisodeAPIMixin:
+    """Sparse fieldsets and cached, conditional responses for the episode views."""
+
+    serializer_class = EpisodeSerializer
+    renderer_classes = [JSONRenderer]
+    # Public and read-only: no session, CSRF or user lookups
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    default_fields = EPISODE_FIELDS
+    # The query parameters the view accepts, in the order they're cached by
+    query_params = ("fields",)
+
+    def check_query_params(self):
+        unknown = set(self.request.query_params) - set(self.query_params)
+        if unknown:
+            raise ValidationError(
+                {"detail": f"Unknown query parameters: {', '.join(sorted(unknown))}"}
+            )
+
+    def get_fields(self):
+        requested = self.request.query_params.get("fields")
+        if not requested:
+            return self.default_fields
+        fields = tuple(dict.fromkeys(f.strip() for f in requested.split(",") if f.strip()))
+        unknown = set(fields) - set(EPISODE_FIELDS)
+        if unknown:
+            raise ValidationError(
+                {"fields": f"Unknown fields: {', '.join(sorted(unknown))}"}
+            )
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fields", self.get_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        fields = self.get_fields()
+        queryset = PodcastEpisodePage.objects.live().public()
+        if "transcript" not in fields:
+            queryset = queryset.defer("transcript")
+        if "cover" in fields:
+            Rendition = get_image_model().get_rendition_model()
+            queryset = queryset.select_related("cover_image").prefetch_related(
+                Prefetch("cover_image__renditions", queryset=Rendition.objects.all())
+            )
+        return queryset
+
+    def get_cache_name(self, request):
+        """The view's URL and accepted parameters, so their order doesn't matter."""
+        params = {name: request.query_params.get(name, "") for name in self.query_params}
+        params["fields"] = ",".join(sorted(self.get_fields()))
+        if self.paginator is not None:
+            params["page_size"] = self.paginator.get_page_size(request)
+        key = f"{request.build_absolute_uri(request.path)}?{urlencode(params)}"
+        return f"api:{hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()}"
+
+    def get(self, request, *args, **kwargs):
+        # A bad request is answered before touching the cache
+        self.check_query_params()
+        self.get_fields()
+
+        def render():
+            response = super(EpisodeAPIMixin, self).get(request, *args, **kwargs)
+            return JSONRenderer().render(response.data), "application/json"
+
+        return artifact_response(request, get_or_build(self.get_cache_name(request), render))
+
+
+class EpisodeListView(EpisodeAPIMixin, generics.ListAPIView):
+    pagination_class = EpisodePagination
+    default_fields = LIST_FIELDS
+    query_params = ("cursor", "page_size", "fields")
+
+
+class EpisodeDetailView(EpisodeAPIMixin, generics.RetrieveAPIView):
+    lookup_field = "episode_number"
+    lookup_url_kwarg = "number"
+    default_fields = DETAIL_FIELDS
@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class PodcastConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'podcast'
+
+    def ready(self):
+        from django.conf import settings
+        from podcast.instrumentation import install_query_counter
+        from podcast.signals import register_signal_handlers
+
+        register_signal_handlers()
+        install_query_counter()
+
+        if settings.PODCAST_ADMIN_PROFILING:
+            from podcast.instrumentation import install_hook_profiler
+
+            install_hook_profiler()
@@ -0,0 +1,263 @@
+"""
+Benchmark helpers shared by the ``generate_catalogue`` and ``benchmark``
+management commands.
+
+A synthetic catalogue of episodes (with covers, transcripts and audio stubs)
+is generated at a given size, then each public endpoint is requested through
+the full Django stack while measuring latency, queries and peak memory.
+"""
+
+import datetime
+import glob
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from PIL import Image as PILImage
+from wagtail.images import get_image_model
+from wagtail.models import Page
+
+from podcast.models import PodcastEpisodePage, PodcastIndexPage
+
+# Metrics compared against a baseline, all "lower is better"
+COMPARED_METRICS = ("median_ms", "queries", "peak_kb")
+
+FIRST_PUBLICATION_DATE = datetime.datetime(2010, 1, 1, 17, 30, tzinfo=datetime.timezone.utc)
+
+
+@contextmanager
+def benchmark_environment():
+    """Run the block against a throwaway test database, cache and media directory."""
+    media_root = tempfile.mkdtemp(prefix="podcast-benchmark-")
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        with override_settings(
+            MEDIA_ROOT=media_root,
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                    "LOCATION": "podcast-benchmark",
+                }
+            },
+            STORAGES={
+                "default": {
+                    "BACKEND": "django.core.files.storage.FileSystemStorage",
+                },
+                "staticfiles": {
+                    "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+                },
+            },
+        ):
+            yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(media_root, ignore_errors=True)
+
+
+def sample_transcripts():
+    """Real transcripts from texts/, falling back to filler text."""
+    transcripts = []
+    for path in sorted(glob.glob(os.path.join(settings.BASE_DIR, "texts", "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            transcripts.append(f.read().strip())
+    return transcripts or ["A sunken raft of weeds woven into a verdant morass. " * 200]
+
+
+def create_cover_images(count=10):
+    covers = []
+    for i in range(count):
+        buffer = BytesIO()
+        colour = (30 + i * 20 % 200, 90, 40)
+        PILImage.new("RGB", (1400, 1400), colour).save(buffer, "JPEG", quality=80)
+        covers.append(
+            get_image_model().objects.create(
+                title=f"Benchmark cover {i + 1}",
+                file=ContentFile(buffer.getvalue(), f"benchmark-cover-{i + 1}.jpg"),
+            )
+        )
+    return covers
+
+
+def get_or_create_index():
+    podcast_index = PodcastIndexPage.objects.live().first()
+    if podcast_index:
+        return podcast_index
+    home = Page.objects.filter(depth=2).first()
+    podcast_index = PodcastIndexPage(title="Episodes", slug="episodes")
+    home.add_child(instance=podcast_index)
+    return podcast_index
+
+
+def generate_catalogue(count, progress=None):
+    """
+    Add ``count`` live episodes after the highest existing episode number.
+
+    ``progress`` is called with the number of episodes created so far.
+    """
+    podcast_index = get_or_create_index()
+    covers = create_cover_images()
+    transcripts = sample_transcripts()
+    start = (
+        PodcastEpisodePage.objects.aggregate(Max("episode_number"))["episode_number__max"]
+        or 0
+    ) + 1
+
+    for offset in range(count):
+        number = start + offset
+        transcript = transcripts[number % len(transcripts)]
+        episode = PodcastEpisodePage(
+            title=f"Episode {number}",
+            episode_number=number,
+            season_number=(number - 1) // 52 + 1,
+            season_episode_number=(number - 1) % 52 + 1,
+            publication_date=FIRST_PUBLICATION_DATE + datetime.timedelta(weeks=number),
+            description=f"<p>{transcript[:250]}</p>",
+            transcript="".join(f"<p>{p}</p>" for p in transcript.split("\n\n")),
+            cover_image=covers[number % len(covers)],
+            audio_file=ContentFile(b"ID3" + bytes(1021), f"{number:03d}.mp3"),
+            duration_in_seconds=840,
+            explicit_content=number % 50 == 0,
+        )
+        podcast_index.add_child(instance=episode)
+        if progress and (offset + 1) % 100 == 0:
+            progress(offset + 1)
+    return count
+
+
+def public_endpoints():
+    """The public URLs to benchmark, keyed by a stable name."""
+    latest = PodcastEpisodePage.objects.live().order_by("-episode_number").first()
+    podcast_index = PodcastIndexPage.objects.live().first()
+    endpoints = {"feed": "/feed.xml", "search": "/search/?query=moss"}
+    if podcast_index:
+        endpoints["index"] = podcast_index.url
+    if latest:
+        endpoints["episode"] = latest.url
+    return endpoints
+
+
+def measure(client, url, repeat=5, warm=False):
+    """
+    Request ``url`` ``repeat`` times and summarise latency, queries and memory.
+
+    Unless ``warm`` is set the cache is cleared before every request, so each
+    run measures a full render. Peak memory is taken from one extra request,
+    as tracing allocations would distort the timings.
+    """
+    timings = []
+    queries = []
+    for _ in range(repeat):
+        if not warm:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured.captured_queries))
+
+    if not warm:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        client.get(url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "url": url,
+        "status": response.status_code,
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+        "queries": max(queries),
+        "peak_kb": peak / 1024,
+        "bytes": len(response.content),
+    }
+
+
+def run_endpoints(repeat=5):
+    """Measure every public endpoint, both cold and with a warm cache."""
+    client = Client()
+    results = {}
+    for name, url in public_endpoints().items():
+        results[name] = measure(client, url, repeat=repeat)
+        client.get(url)
+        results[f"{name}_warm"] = measure(client, url, repeat=repeat, warm=True)
+    return results
+
+
+def middleware_overhead(urls, repeat=500):
+    """
+    Time warm-cache requests to ``urls`` through the full middleware stack and
+    through the public fast path, returning per-request medians.
+    """
+    client = Client()
+    results = {}
+    for name, url in urls.items():
+        client.get(url)
+        row = {"url": url}
+        for mode, enabled in (("full", False), ("fast", True)):
+            timings = []
+            with override_settings(PODCAST_FAST_PATH_ENABLED=enabled):
+                with CaptureQueriesContext(connection) as captured:
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        client.get(url)
+                        timings.append((time.perf_counter() - start) * 1_000_000)
+            row[f"{mode}_us"] = statistics.median(timings)
+            row[f"{mode}_queries"] = len(captured.captured_queries) / repeat
+        row["saved_us"] = row["full_us"] - row["fast_us"]
+        results[name] = row
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Return a list of regressions, where a metric grew by more than
+    ``threshold`` (a fraction) over the baseline.
+    """
+    regressions = []
+    for size, endpoints in results["results"].items():
+        for endpoint, metrics in endpoints.items():
+            previous = baseline.get("results", {}).get(size, {}).get(endpoint)
+            if not previous:
+                continue
+            for metric in COMPARED_METRICS:
+                before, after = previous.get(metric), metrics.get(metric)
+                if before is None or after is None:
+                    continue
+                # Allow a little absolute slack for tiny values (e.g. 0 -> 1 query)
+                if after > before * (1 + threshold) and after - before > 1:
+                    regressions.append(
+                        {
+                            "size": size,
+                            "endpoint": endpoint,
+                            "metric": metric,
+                            "baseline": before,
+                            "current": after,
+                            "change": (after - before) / before if before else None,
+                        }
+                    )
+    return regressions
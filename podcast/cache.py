@@ -0,0 +1,337 @@
+"""
+Cached response artifacts for the public site.
+
+The feed and the public pages are rendered once, compressed once (gzip and,
+when the optional ``brotli`` package is installed, brotli) and stored in the
+Django cache. Requests are then answered with whichever stored encoding the
+client accepts, so no compression work happens per request.
+
+All artifacts share a single version number. Bumping it with ``invalidate()``
+makes every stored artifact unreachable without having to know their keys.
+A whole set of artifacts can also be built ahead of time under a new version
+with ``staging()``, then made live at once with ``activate()``.
+"""
+
+import gzip
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from podcast.instrumentation import label_request, record_cache
+from podcast.routers import use_primary
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+
+VERSION_KEY = "podcast:artifacts:version"
+
+# Encodings we store, in order of preference when the client accepts several
+ENCODINGS = ("br", "gzip")
+
+# Don't bother compressing tiny responses, the headers would outweigh the gain
+MIN_COMPRESS_SIZE = 200
+
+
+# The version being built by ``staging()`` in the current context, if any
+_staged_version = ContextVar("podcast_staged_version", default=None)
+
+
+def get_version():
+    """Return the current artifact version, initialising it if needed."""
+    staged = _staged_version.get()
+    if staged is not None:
+        return staged
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted version key never reuses an old number
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Make every stored artifact stale by moving to a new version."""
+    if _staged_version.get() is not None:
+        return  # the live version is left alone while staging
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def new_version():
+    """Return a version number that no artifact has been stored under yet."""
+    return time.time_ns()
+
+
+@contextmanager
+def staging(version):
+    """
+    Build and read artifacts under ``version`` rather than the live version
+    for the duration of the block, in this context only. Invalidations inside
+    the block are ignored: the changes being staged are expected to be rolled
+    back, and made for real when the version is activated.
+    """
+    token = _staged_version.set(version)
+    try:
+        yield
+    finally:
+        _staged_version.reset(token)
+
+
+def activate(version):
+    """Make ``version`` the live version, e.g. one built under ``staging()``."""
+    cache.set(VERSION_KEY, version, None)
+
+
+def artifact_key(name, version=None):
+    if version is None:
+        version = get_version()
+    return f"podcast:artifact:{name}:{version}"
+
+
+def compress(body):
+    """Return a dict of the stored encodings for ``body``."""
+    encoded = {}
+    if len(body) < MIN_COMPRESS_SIZE:
+        return encoded
+    encoded["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+    if brotli is not None:
+        encoded["br"] = brotli.compress(body, mode=brotli.MODE_TEXT)
+    return encoded
+
+
+def build_artifact(body, content_type):
+    """Build a cacheable artifact from a rendered response body."""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return {
+        "content_type": content_type,
+        "body": body,
+        "encoded": compress(body),
+        # Weak, as the compressed encodings are the same resource
+        "etag": f'W/"{hashlib.md5(body, usedforsecurity=False).hexdigest()}"',
+    }
+
+
+def get_artifact(name):
+    """Return the artifact stored under ``name``, or ``None`` if not built yet."""
+    artifact = cache.get(artifact_key(name))
+    record_cache(artifact is not None)
+    return artifact
+
+
+def get_or_build(name, builder):
+    """
+    Return the artifact stored under ``name`` for the current version.
+
+    ``builder`` is called on a miss and must return a ``(body, content_type)``
+    tuple. Returning ``None`` skips caching and is passed back to the caller.
+    """
+    key = artifact_key(name)
+    artifact = cache.get(key)
+    record_cache(artifact is not None)
+    if artifact is None:
+        with use_primary():
+            built = builder()
+        if built is None:
+            return None
+        artifact = build_artifact(*built)
+        cache.set(key, artifact, settings.PODCAST_CACHE_TIMEOUT)
+    return artifact
+
+
+def store_together(built, version):
+    """
+    Build and store each ``(body, content_type)`` in the ``{name: built}`` dict
+    under ``version``, and return the artifacts by name.
+    """
+    artifacts = {name: build_artifact(*parts) for name, parts in built.items()}
+    cache.set_many(
+        {artifact_key(name, version): artifact for name, artifact in artifacts.items()},
+        settings.PODCAST_CACHE_TIMEOUT,
+    )
+    return artifacts
+
+
+def get_or_build_together(name, builder):
+    """
+    Return the artifact stored under ``name``, one of several rendered in a
+    single pass.
+
+    On a miss ``builder`` must return a dict mapping each artifact name,
+    ``name`` included, to a ``(body, content_type)`` tuple. All of them are
+    stored under the same version, so they're built from the same data and
+    invalidated together.
+    """
+    version = get_version()
+    artifact = cache.get(artifact_key(name, version))
+    record_cache(artifact is not None)
+    if artifact is None:
+        with use_primary():
+            built = builder()
+        artifact = store_together(built, version)[name]
+    return artifact
+
+
+async def aget_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, time.time_ns(), None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+async def aget_or_build(name, builder):
+    """
+    Async version of ``get_or_build`` for the ASGI views.
+
+    ``builder`` is synchronous. On a miss it runs in a worker thread, and the
+    compression work runs there too.
+    """
+    key = artifact_key(name, await aget_version())
+    artifact = await cache.aget(key)
+    record_cache(artifact is not None)
+    if artifact is None:
+
+        def build():
+            with use_primary():
+                built = builder()
+            return built and build_artifact(*built)
+
+        artifact = await sync_to_async(build)()
+        if artifact is None:
+            return None
+        await cache.aset(key, artifact, settings.PODCAST_CACHE_TIMEOUT)
+    return artifact
+
+
+async def aget_or_build_together(name, builder):
+    """Async version of ``get_or_build_together``; the build runs in a thread."""
+    version = await aget_version()
+    artifact = await cache.aget(artifact_key(name, version))
+    record_cache(artifact is not None)
+    if artifact is None:
+
+        def build():
+            with use_primary():
+                built = builder()
+            return store_together(built, version)[name]
+
+        artifact = await sync_to_async(build)()
+    return artifact
+
+
+def get_cached(name, compute):
+    """
+    Return a small value (such as a page ID) computed by ``compute``, cached
+    until the next invalidation. ``None`` results are cached too.
+    """
+    key = artifact_key(name)
+    cached = cache.get(key)
+    record_cache(cached is not None)
+    if cached is None:
+        with use_primary():
+            cached = (compute(),)
+        cache.set(key, cached, settings.PODCAST_CACHE_TIMEOUT)
+    return cached[0]
+
+
+def page_artifact_name(page_id):
+    return f"page:{page_id}"
+
+
+def accepted_encodings(header):
+    """Parse an Accept-Encoding header into the set of acceptable codings."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def artifact_response(request, artifact, status=200):
+    """
+    Serve ``artifact`` in the best encoding the client accepts, or a 304 when
+    the client already has it.
+    """
+    accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    body = artifact["body"]
+    content_encoding = None
+    for encoding in ENCODINGS:
+        if encoding in artifact["encoded"] and (encoding in accepted or "*" in accepted):
+            body = artifact["encoded"][encoding]
+            content_encoding = encoding
+            break
+
+    response = HttpResponse(body, content_type=artifact["content_type"], status=status)
+    if content_encoding:
+        response.headers["Content-Encoding"] = content_encoding
+    response.headers["Content-Length"] = str(len(body))
+    if artifact["encoded"]:
+        patch_vary_headers(response, ("Accept-Encoding",))
+    etag = artifact.get("etag")
+    if etag and status == 200:
+        response.headers["ETag"] = etag
+        return get_conditional_response(request, etag=etag, response=response)
+    return response
+
+
+def is_cacheable_request(request):
+    """Only anonymous, plain GET/HEAD requests outside of preview are cached."""
+    if request.method not in ("GET", "HEAD") or request.GET:
+        return False
+    if getattr(request, "is_preview", False):
+        return False
+    user = getattr(request, "user", None)
+    return user is None or not user.is_authenticated
+
+
+class CachedPageMixin:
+    """Serve anonymous page views from a cached, pre-compressed artifact."""
+
+    def get_cache_name(self):
+        return page_artifact_name(self.pk)
+
+    def serve(self, request, *args, **kwargs):
+        label_request(f"page:{type(self).__name__}")
+        if not is_cacheable_request(request):
+            return super().serve(request, *args, **kwargs)
+
+        # Responses that can't be shared (errors, cookies) are returned as-is
+        uncacheable = []
+
+        def render():
+            response = super(CachedPageMixin, self).serve(request, *args, **kwargs)
+            if hasattr(response, "render"):
+                response.render()
+            if response.status_code != 200 or response.cookies:
+                uncacheable.append(response)
+                return None
+            return response.content, response["Content-Type"]
+
+        artifact = get_or_build(self.get_cache_name(), render)
+        if artifact is None:
+            return uncacheable[0]
+        return artifact_response(request, artifact)
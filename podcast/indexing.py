@@ -0,0 +1,109 @@
+"""
+Batched search index updates for episodes.
+
+Wagtail re-indexes a page as part of every save, which for an episode means
+extracting the title, description and full transcript, then refreshing the
+title norms of the whole index, inside the editor's request. Episodes opt out
+(``search_auto_update = False``) and a save instead records the episode in
+``PendingSearchUpdate``, in the same transaction.
+
+``update_search_index`` then indexes the queued episodes ``BATCH_SIZE`` at a
+time, with one bulk insert per batch. With a task backend that can defer
+(``TASKS_DATABASE=True`` and ``manage.py db_worker``), the first save queues
+it to run ``PODCAST_SEARCH_INDEX_DELAY`` seconds later, and saves made in the
+meantime are picked up by the same run. Otherwise it runs as each transaction
+commits, still in one batch per commit, or once at the end of a ``batch()``
+block, which bulk commands use.
+
+``manage.py rebuild_podcast_index`` rebuilds the whole index in parallel.
+"""
+
+import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django_tasks import default_task_backend, task
+from wagtail.search.backends import get_search_backends
+
+from podcast.models import PendingSearchUpdate, PodcastEpisodePage
+
+# Set while a run of ``update_search_index`` is queued
+SCHEDULED_KEY = "podcast:search:scheduled"
+
+# Episodes indexed per bulk statement
+BATCH_SIZE = 100
+
+# Whether the current context is inside ``batch()``, and has queued anything
+_batch = ContextVar("podcast_search_batch", default=None)
+
+
+def queue_episodes(*episode_ids):
+    """Queue episodes for indexing, once the current transaction commits."""
+    now = timezone.now()
+    PendingSearchUpdate.objects.bulk_create(
+        [PendingSearchUpdate(episode_id=pk, queued_at=now) for pk in episode_ids],
+        # Already queued, and indexed from the database as it is then
+        ignore_conflicts=True,
+    )
+    transaction.on_commit(schedule_update)
+
+
+def schedule_update():
+    batch = _batch.get()
+    if batch is not None:
+        batch.append(True)
+        return
+    if not default_task_backend.supports_defer:
+        update_search_index.enqueue()
+        return
+    delay = settings.PODCAST_SEARCH_INDEX_DELAY
+    # Only the first save in each delay queues a run
+    if cache.add(SCHEDULED_KEY, True, delay):
+        run_after = timezone.now() + datetime.timedelta(seconds=delay)
+        update_search_index.using(run_after=run_after).enqueue()
+
+
+@contextmanager
+def batch():
+    """Index the episodes queued inside the block once, when it exits."""
+    queued = []
+    token = _batch.set(queued)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+        if queued:
+            schedule_update()
+
+
+def index_episodes(episode_ids):
+    """Add the episodes to every auto-updated search backend in one batch."""
+    episodes = list(PodcastEpisodePage.get_indexed_objects().filter(pk__in=episode_ids))
+    if episodes:
+        for backend in get_search_backends(with_auto_update=True):
+            backend.add_bulk(PodcastEpisodePage, episodes)
+    return len(episodes)
+
+
+@task()
+def update_search_index():
+    """Index every queued episode, oldest first, and return how many."""
+    # Saves from now on queue another run, which finds them if this one doesn't
+    cache.delete(SCHEDULED_KEY)
+    indexed = 0
+    while True:
+        with transaction.atomic():
+            episode_ids = list(
+                PendingSearchUpdate.objects.order_by("queued_at").values_list(
+                    "episode_id", flat=True
+                )[:BATCH_SIZE]
+            )
+            if not episode_ids:
+                return indexed
+            # Saved again from here on and they're queued afresh
+            PendingSearchUpdate.objects.filter(episode_id__in=episode_ids).delete()
+            indexed += index_episodes(episode_ids)
@@ -0,0 +1,521 @@
+"""
+Request instrumentation helpers.
+
+``count_queries`` measures the database work done inside a block. The admin
+hook profiler builds on it to show how many queries each Wagtail hook runs
+while an admin page is being rendered.
+
+``PerformanceMiddleware`` records wall time, queries, cache hits and misses
+and rendition generation time for every request. They are reported in a
+``Server-Timing`` header and aggregated per view for the metrics endpoint,
+without needing anything beyond the Django cache, along with each process's
+database connection settings and pool statistics.
+"""
+
+import cProfile
+import functools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+# Hook calls recorded for the current admin request, when profiling it
+_hook_calls = ContextVar("podcast_hook_calls", default=None)
+
+# Metrics for the request currently being handled
+_request_metrics = ContextVar("podcast_request_metrics", default=None)
+
+METRICS_PROCESSES_KEY = "podcast:metrics:processes"
+
+
+# The ``count_queries()`` blocks the current context is inside
+_query_stats = ContextVar("podcast_query_stats", default=())
+
+
+class QueryStats:
+    """The number and duration of the queries run inside ``count_queries()``."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection by ``install_query_counter``."""
+    active = _query_stats.get()
+    if not active:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        for stats in active:
+            stats.count += 1
+            stats.duration += duration
+
+
+def add_query_counter(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_query_counter():
+    """
+    Count queries on every connection, including those that ``sync_to_async``
+    threads open for the async views, which the context variable follows.
+    """
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(add_query_counter, dispatch_uid="podcast_query_counter")
+    # Connections of this thread that are already open
+    for connection in connections.all(initialized_only=True):
+        add_query_counter(connection)
+
+
+@contextmanager
+def count_queries():
+    """Count and time the queries run on any database inside the block."""
+    stats = QueryStats()
+    token = _query_stats.set((*_query_stats.get(), stats))
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def _profile_hook(hook_name, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        calls = _hook_calls.get()
+        if calls is None:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        with count_queries() as queries:
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                calls.append(
+                    {
+                        "hook": hook_name,
+                        "function": f"{fn.__module__}.{fn.__qualname__}",
+                        "queries": queries.count,
+                        "duration": time.perf_counter() - start,
+                    }
+                )
+
+    return wrapper
+
+
+def install_hook_profiler():
+    """
+    Wrap ``wagtail.hooks.get_hooks`` so hook calls can be profiled per request.
+    Return a function that puts the original back.
+    """
+    from wagtail import hooks
+
+    if getattr(hooks.get_hooks, "profiled", False):
+        return lambda: None  # installed by someone else, who uninstalls it
+    get_hooks = hooks.get_hooks
+
+    def profiled_get_hooks(hook_name):
+        return [_profile_hook(hook_name, fn) for fn in get_hooks(hook_name)]
+
+    def uninstall():
+        if hooks.get_hooks is profiled_get_hooks:
+            hooks.get_hooks = get_hooks
+
+    profiled_get_hooks.profiled = True
+    hooks.get_hooks = profiled_get_hooks
+    return uninstall
+
+
+def summarise_hook_calls(calls):
+    """Aggregate recorded hook calls per hook function, busiest first."""
+    summary = {}
+    for call in calls:
+        row = summary.setdefault(
+            (call["hook"], call["function"]),
+            {
+                "hook": call["hook"],
+                "function": call["function"],
+                "calls": 0,
+                "queries": 0,
+                "duration_ms": 0.0,
+            },
+        )
+        row["calls"] += 1
+        row["queries"] += call["queries"]
+        row["duration_ms"] += call["duration"] * 1000
+    return sorted(
+        summary.values(), key=lambda row: (row["queries"], row["duration_ms"]), reverse=True
+    )
+
+
+class AdminHookProfilingMiddleware:
+    """
+    Append a panel to admin pages listing the queries run by each Wagtail hook.
+
+    Enabled with ``PODCAST_ADMIN_PROFILING`` and only shown to superusers.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.is_profiled(request):
+            return self.get_response(request)
+
+        calls = []
+        token = _hook_calls.set(calls)
+        start = time.perf_counter()
+        try:
+            with count_queries() as queries:
+                response = self.get_response(request)
+        finally:
+            _hook_calls.reset(token)
+        return self.add_panel(
+            response, getattr(request, "user", None), calls, queries, start
+        )
+
+    async def __acall__(self, request):
+        if not self.is_profiled(request):
+            return await self.get_response(request)
+
+        calls = []
+        token = _hook_calls.set(calls)
+        start = time.perf_counter()
+        try:
+            with count_queries() as queries:
+                response = await self.get_response(request)
+        finally:
+            _hook_calls.reset(token)
+        user = await request.auser() if hasattr(request, "auser") else None
+        return self.add_panel(response, user, calls, queries, start)
+
+    def is_profiled(self, request):
+        return settings.PODCAST_ADMIN_PROFILING and request.path.startswith(
+            reverse("wagtailadmin_home")
+        )
+
+    def add_panel(self, response, user, calls, queries, start):
+        if (
+            user is None
+            or not user.is_superuser
+            or response.streaming
+            or not response.get("Content-Type", "").startswith("text/html")
+            or b"</body>" not in response.content
+        ):
+            return response
+
+        rows = summarise_hook_calls(calls)
+        panel = render_to_string(
+            "podcast/admin/hook_profile.html",
+            {
+                "rows": rows,
+                "hook_queries": sum(row["queries"] for row in rows),
+                "total_queries": queries.count,
+                "total_ms": (time.perf_counter() - start) * 1000,
+            },
+        )
+        response.content = response.content.replace(
+            b"</body>", panel.encode("utf-8") + b"</body>", 1
+        )
+        if response.has_header("Content-Length"):
+            response["Content-Length"] = str(len(response.content))
+        return response
+
+
+class RequestMetrics:
+    """Counters collected while a single request is handled."""
+
+    def __init__(self):
+        self.view = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.renditions = 0
+        self.rendition_time = 0.0
+
+
+def label_request(view):
+    """Name the view handling the current request, e.g. a Wagtail page type."""
+    metrics = _request_metrics.get()
+    if metrics is not None:
+        metrics.view = view
+
+
+def record_cache(hit):
+    metrics = _request_metrics.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+def install_rendition_timer():
+    """Time rendition generation, which happens outside of the database."""
+    from wagtail.images.models import AbstractImage
+
+    generate_rendition_file = AbstractImage.generate_rendition_file
+    if getattr(generate_rendition_file, "timed", False):
+        return
+
+    @functools.wraps(generate_rendition_file)
+    def timed_generate_rendition_file(self, *args, **kwargs):
+        metrics = _request_metrics.get()
+        if metrics is None:
+            return generate_rendition_file(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return generate_rendition_file(self, *args, **kwargs)
+        finally:
+            metrics.renditions += 1
+            metrics.rendition_time += time.perf_counter() - start
+
+    timed_generate_rendition_file.timed = True
+    AbstractImage.generate_rendition_file = timed_generate_rendition_file
+
+
+class ViewStats:
+    """Per-process aggregates for every view, shared between threads."""
+
+    FIELDS = (
+        "requests",
+        "errors",
+        "wall_ms",
+        "max_wall_ms",
+        "queries",
+        "db_ms",
+        "cache_hits",
+        "cache_misses",
+        "renditions",
+        "rendition_ms",
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.started_at = time.time()
+        self.last_flush = 0.0
+
+    def add(self, view, values):
+        with self.lock:
+            row = self.views.setdefault(view, dict.fromkeys(self.FIELDS, 0))
+            row["requests"] += 1
+            row["max_wall_ms"] = max(row["max_wall_ms"], values["wall_ms"])
+            for field, value in values.items():
+                if field != "max_wall_ms":
+                    row[field] += value
+
+    def snapshot(self):
+        from podcast.invalidation import bus
+
+        with self.lock:
+            return {
+                "pid": os.getpid(),
+                "started_at": self.started_at,
+                "views": {view: dict(row) for view, row in self.views.items()},
+                "databases": database_stats(),
+                "invalidation": bus.stats(),
+            }
+
+    def flush(self, force=False):
+        """Share this process's counters through the cache for the metrics view."""
+        now = time.monotonic()
+        if not force and now - self.last_flush < settings.PODCAST_METRICS_FLUSH_INTERVAL:
+            return
+        self.last_flush = now
+        pid = os.getpid()
+        cache.set(f"podcast:metrics:process:{pid}", self.snapshot(), 24 * 60 * 60)
+        processes = cache.get(METRICS_PROCESSES_KEY) or []
+        if pid not in processes:
+            cache.set(METRICS_PROCESSES_KEY, processes[-63:] + [pid], None)
+
+
+view_stats = ViewStats()
+
+
+def collect_metrics():
+    """Merge the counters of every process that has reported recently."""
+    view_stats.flush(force=True)
+    processes = []
+    totals = {}
+    invalidation = {}
+    for pid in cache.get(METRICS_PROCESSES_KEY) or []:
+        snapshot = cache.get(f"podcast:metrics:process:{pid}")
+        if snapshot is None:
+            continue
+        processes.append(
+            {
+                "pid": pid,
+                "started_at": snapshot["started_at"],
+                "databases": snapshot.get("databases", {}),
+            }
+        )
+        for view, row in snapshot["views"].items():
+            total = totals.setdefault(view, dict.fromkeys(ViewStats.FIELDS, 0))
+            for field, value in row.items():
+                if field == "max_wall_ms":
+                    total[field] = max(total[field], value)
+                else:
+                    total[field] += value
+        for field, value in snapshot.get("invalidation", {}).items():
+            invalidation[field] = invalidation.get(field, 0) + value
+    for row in totals.values():
+        requests = row["requests"] or 1
+        row["mean_wall_ms"] = row["wall_ms"] / requests
+        row["mean_queries"] = row["queries"] / requests
+    return {"processes": processes, "views": totals, "invalidation": invalidation}
+
+
+def connection_stats(connection):
+    """Connection reuse settings for one alias, plus psycopg pool counters."""
+    settings_dict = connection.settings_dict
+    stats = {
+        "vendor": connection.vendor,
+        "conn_max_age": settings_dict.get("CONN_MAX_AGE"),
+        "health_checks": settings_dict.get("CONN_HEALTH_CHECKS"),
+        "pool": None,
+    }
+    # Only look at the pool when one is configured, as accessing it opens it
+    if settings_dict.get("OPTIONS", {}).get("pool"):
+        stats["pool"] = connection.pool.get_stats()
+    return stats
+
+
+def database_stats():
+    return {alias: connection_stats(connections[alias]) for alias in connections}
+
+
+def resolve_view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    return match.view_name or match._func_path
+
+
+def server_timing(wall, queries, metrics):
+    entries = [
+        f"total;dur={wall * 1000:.1f}",
+        f'db;dur={queries.duration * 1000:.1f};desc="{queries.count} queries"',
+        f'cache;desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses"',
+    ]
+    if metrics.renditions:
+        entries.append(
+            f'rendition;dur={metrics.rendition_time * 1000:.1f};desc="{metrics.renditions} generated"'
+        )
+    return ", ".join(entries)
+
+
+class PerformanceMiddleware:
+    """
+    Record timing, query and cache statistics for every request.
+
+    Slow requests can optionally be profiled: a sample of requests
+    (``PODCAST_PROFILE_SAMPLE_RATE``) runs under cProfile, and the profile is
+    kept in ``PODCAST_PROFILE_DIR`` when the request takes longer than
+    ``PODCAST_PROFILE_SLOW_MS``. cProfile can't follow a request across the
+    event loop, so sampling only applies to the WSGI server.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install_rendition_timer()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.PODCAST_METRICS_ENABLED:
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _request_metrics.set(metrics)
+        profiler = None
+        if settings.PODCAST_PROFILE_SAMPLE_RATE and (
+            random.random() < settings.PODCAST_PROFILE_SAMPLE_RATE
+        ):
+            profiler = cProfile.Profile()
+
+        start = time.perf_counter()
+        try:
+            with count_queries() as queries:
+                if profiler is not None:
+                    response = profiler.runcall(self.get_response, request)
+                else:
+                    response = self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        wall = time.perf_counter() - start
+
+        return self.record(request, response, metrics, queries, wall, profiler)
+
+    async def __acall__(self, request):
+        if not settings.PODCAST_METRICS_ENABLED:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _request_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with count_queries() as queries:
+                response = await self.get_response(request)
+        finally:
+            _request_metrics.reset(token)
+        wall = time.perf_counter() - start
+
+        return self.record(request, response, metrics, queries, wall)
+
+    def record(self, request, response, metrics, queries, wall, profiler=None):
+        view = metrics.view or resolve_view_name(request)
+        view_stats.add(
+            view,
+            {
+                "errors": int(response.status_code >= 500),
+                "wall_ms": wall * 1000,
+                "max_wall_ms": wall * 1000,
+                "queries": queries.count,
+                "db_ms": queries.duration * 1000,
+                "cache_hits": metrics.cache_hits,
+                "cache_misses": metrics.cache_misses,
+                "renditions": metrics.renditions,
+                "rendition_ms": metrics.rendition_time * 1000,
+            },
+        )
+        view_stats.flush()
+
+        if profiler is not None and wall * 1000 >= settings.PODCAST_PROFILE_SLOW_MS:
+            self.save_profile(profiler, view, wall)
+
+        if settings.PODCAST_SERVER_TIMING:
+            response["Server-Timing"] = server_timing(wall, queries, metrics)
+        return response
+
+    def save_profile(self, profiler, view, wall):
+        os.makedirs(settings.PODCAST_PROFILE_DIR, exist_ok=True)
+        safe_view = "".join(c if c.isalnum() else "-" for c in view)
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_view}-{wall * 1000:.0f}ms.prof"
+        profiler.dump_stats(os.path.join(settings.PODCAST_PROFILE_DIR, filename))
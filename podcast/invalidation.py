@@ -0,0 +1,163 @@
+"""
+Coalesced cache invalidation.
+
+Signal handlers report what changed to ``bus`` as keys such as ``"episode:12"``
+or ``"settings"``, rather than invalidating on the spot. A key reported inside
+a transaction only counts once the transaction commits, so readers can't
+rebuild an artifact from data they can't see yet, and rolled back changes
+invalidate nothing.
+
+Keys are then deduplicated and flushed together:
+
+- at the end of a ``bus.batch()`` block. ``InvalidationMiddleware`` wraps
+  every request in one, so publishing a page (which saves it, its revision
+  and its references, each in their own transaction) costs one invalidation.
+- otherwise, such as for the saves of a bulk command, at most once every
+  ``PODCAST_INVALIDATION_WINDOW`` seconds.
+
+A flush bumps the artifact version once and, if any key affects the feeds,
+pings the WebSub hub once. Keys that only change the redirect table bump the
+redirects version instead. ``bus.stats()`` counts how much was coalesced, and
+the metrics view reports it for every process.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections, transaction
+
+from podcast import cache, redirects, websub
+
+# Keys with these prefixes change the feeds
+FEED_KEYS = ("episode:", "settings")
+
+# Keys with these prefixes only change the redirect table
+REDIRECT_KEYS = ("redirect:", "redirects")
+
+# The keys collected by the innermost ``batch()`` in the current context
+_batch = ContextVar("podcast_invalidation_batch", default=None)
+
+
+class InvalidationBus:
+    STATS = ("reported", "flushed_keys", "flushes", "hub_pings")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(self.STATS, 0)
+        # Committed keys outside a batch, waiting for the window to end
+        self.pending = set()
+        self.timer = None
+
+    def report(self, *keys):
+        """Invalidate for ``keys`` once the current transaction commits."""
+        with self.lock:
+            self.counters["reported"] += len(keys)
+        # Runs straight away in autocommit mode
+        transaction.on_commit(lambda: self.collect(keys))
+
+    def collect(self, keys):
+        batch = _batch.get()
+        if batch is not None:
+            batch.update(keys)
+            return
+        with self.lock:
+            self.pending.update(keys)
+            if self.timer is None:
+                # Not a daemon, so a command exiting first still flushes
+                self.timer = threading.Timer(
+                    settings.PODCAST_INVALIDATION_WINDOW, self.flush_after_window
+                )
+                self.timer.start()
+
+    @contextmanager
+    def batch(self):
+        """Flush the keys committed inside the block once, when it exits."""
+        keys = set()
+        token = _batch.set(keys)
+        try:
+            yield
+        finally:
+            _batch.reset(token)
+            self.flush(keys)
+
+    def flush_batch(self, version=None):
+        """
+        Flush the keys collected so far by the current batch. With ``version``,
+        activate that cache version instead of moving to a new one.
+        """
+        batch = _batch.get()
+        keys = set(batch or ())
+        if batch is not None:
+            batch.clear()
+        self.flush(keys, version)
+
+    def flush_after_window(self):
+        try:
+            self.flush_pending()
+        finally:
+            # Queueing a hub ping may have connected from the timer's thread
+            connections.close_all()
+
+    def flush_pending(self):
+        with self.lock:
+            keys, self.pending = self.pending, set()
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        self.flush(keys)
+
+    def flush(self, keys, version=None):
+        if not keys and version is None:
+            return
+        if any(key.startswith(REDIRECT_KEYS) for key in keys):
+            redirects.invalidate()
+        if version is not None:
+            cache.activate(version)
+        elif not all(key.startswith(REDIRECT_KEYS) for key in keys):
+            cache.invalidate()
+        ping = bool(settings.PODCAST_WEBSUB_HUB) and any(
+            key.startswith(FEED_KEYS) for key in keys
+        )
+        if ping:
+            websub.notify_hub()
+        with self.lock:
+            self.counters["flushes"] += 1
+            self.counters["flushed_keys"] += len(keys)
+            self.counters["hub_pings"] += ping
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats["pending"] = len(self.pending)
+        # Reports that didn't need an invalidation of their own
+        stats["coalesced"] = stats["reported"] - stats["flushes"]
+        return stats
+
+
+bus = InvalidationBus()
+
+
+class InvalidationMiddleware:
+    """Flush the invalidations of each request once, as it finishes."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with bus.batch():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with bus.batch():
+            return await self.get_response(request)
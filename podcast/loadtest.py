@@ -0,0 +1,280 @@
+"""
+Load generation against a running instance of the site.
+
+Requests come either from a recorded access log (nginx/Apache "combined"
+format) or from a synthetic mix shaped like our real traffic: mostly
+aggregator polls of the feed, plus range requests for the MP3s. Each worker
+thread keeps its own keep-alive connection, and latencies are reported per
+route.
+"""
+
+import datetime
+import http.client
+import math
+import random
+import re
+import threading
+import time
+from queue import Empty, Queue
+from urllib.parse import urlsplit
+
+LOG_LINE = re.compile(
+    r'\S+ \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+) [^"]*" '
+    r"(?P<status>\d{3}) "
+)
+LOG_TIME_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
+
+# How a podcast app asks for the start of an episode
+AUDIO_RANGE = "bytes=0-1048575"
+
+ROUTES = (
+    ("feed", re.compile(r"^/feed\.xml$")),
+    ("audio", re.compile(r"^/media/episodes/[^/]+\.mp3$")),
+    ("episode", re.compile(r"^/episodes/\d+/?$")),
+    ("index", re.compile(r"^/(episodes/)?$")),
+    ("search", re.compile(r"^/search/")),
+    ("static", re.compile(r"^/(static|media)/")),
+    ("admin", re.compile(r"^/admin/")),
+)
+
+# Default synthetic mix, as (route, weight)
+SYNTHETIC_MIX = (("feed", 60), ("audio", 15), ("episode", 15), ("index", 8), ("search", 2))
+
+
+def route_for(path):
+    path = urlsplit(path).path
+    for name, pattern in ROUTES:
+        if pattern.match(path):
+            return name
+    return "other"
+
+
+def parse_access_log(lines):
+    """Yield ``(offset_seconds, method, path, headers)`` for replayable requests."""
+    first = None
+    for line in lines:
+        match = LOG_LINE.match(line)
+        if not match or match["method"] not in ("GET", "HEAD"):
+            continue
+        timestamp = datetime.datetime.strptime(match["time"], LOG_TIME_FORMAT).timestamp()
+        if first is None:
+            first = timestamp
+        headers = {}
+        if match["status"] == "206" or route_for(match["path"]) == "audio":
+            headers["Range"] = AUDIO_RANGE
+        yield timestamp - first, match["method"], match["path"], headers
+
+
+def synthetic_requests(count, episode_numbers, seed=None):
+    """Build a request mix shaped like our real traffic."""
+    rng = random.Random(seed)
+    routes, weights = zip(*SYNTHETIC_MIX)
+    latest = max(episode_numbers) if episode_numbers else 1
+    requests = []
+    for _ in range(count):
+        route = rng.choices(routes, weights)[0]
+        # Listeners overwhelmingly want the newest episode
+        number = latest
+        if episode_numbers and rng.random() >= 0.7:
+            number = rng.choice(episode_numbers)
+        if route == "feed":
+            requests.append((0, "GET", "/feed.xml", {}))
+        elif route == "audio":
+            requests.append(
+                (0, "GET", f"/media/episodes/{number:03d}.mp3", {"Range": AUDIO_RANGE})
+            )
+        elif route == "episode":
+            requests.append((0, "GET", f"/episodes/{number:03d}/", {}))
+        elif route == "index":
+            requests.append((0, "GET", "/", {}))
+        else:
+            requests.append((0, "GET", "/search/?query=moss", {}))
+    return requests
+
+
+class Results:
+    """Thread-safe per-route latency and error collection."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.client_errors = {}
+        self.statuses = {}
+
+    def add(self, route, latency, status):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(latency)
+            self.statuses.setdefault(route, {}).setdefault(status, 0)
+            self.statuses[route][status] += 1
+            if status == "error" or status >= 500:
+                self.errors[route] = self.errors.get(route, 0) + 1
+            elif status >= 400:
+                # Reported apart: a replayed log has its share of 404s and 429s
+                self.client_errors[route] = self.client_errors.get(route, 0) + 1
+
+    def summary(self, elapsed):
+        report = {}
+        with self.lock:
+            for route, latencies in sorted(self.latencies.items()):
+                latencies = sorted(latencies)
+                report[route] = {
+                    "requests": len(latencies),
+                    "rps": len(latencies) / elapsed if elapsed else 0,
+                    "p50_ms": percentile(latencies, 50),
+                    "p95_ms": percentile(latencies, 95),
+                    "p99_ms": percentile(latencies, 99),
+                    "max_ms": latencies[-1] * 1000,
+                    "error_rate": self.errors.get(route, 0) / len(latencies),
+                    "client_error_rate": self.client_errors.get(route, 0) / len(latencies),
+                    "statuses": {str(k): v for k, v in self.statuses[route].items()},
+                }
+        return report
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list, in milliseconds."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank] * 1000
+
+
+class Client:
+    """A keep-alive HTTP connection to the target, reopened after errors."""
+
+    def __init__(self, target, host_header=None, timeout=30):
+        parts = urlsplit(target)
+        self.connection_class = (
+            http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        )
+        self.netloc = parts.netloc
+        self.host_header = host_header
+        self.timeout = timeout
+        self.connection = None
+
+    def request(self, method, path, headers):
+        headers = dict(headers)
+        headers.setdefault("Accept-Encoding", "gzip, br")
+        headers.setdefault("User-Agent", "podcast-loadtest")
+        if self.host_header:
+            headers["Host"] = self.host_header
+        start = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+            self.connection.request(method, path, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            status = response.status
+            if response.will_close:
+                self.close()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            status = "error"
+        return time.perf_counter() - start, status
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def replay(target, requests, concurrency, host_header=None, speed=None, timeout=30):
+    """
+    Send ``requests`` with ``concurrency`` worker threads.
+
+    When ``speed`` is given, each request waits for its recorded offset divided
+    by ``speed``, reproducing the original arrival pattern.
+    """
+    queue = Queue()
+    for request in requests:
+        queue.put(request)
+    results = Results()
+    started = time.perf_counter()
+
+    def worker():
+        client = Client(target, host_header, timeout)
+        while True:
+            try:
+                offset, method, path, headers = queue.get_nowait()
+            except Empty:
+                break
+            if speed:
+                delay = offset / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            latency, status = client.request(method, path, headers)
+            results.add(route_for(path), latency, status)
+        client.close()
+
+    run_threads(worker, concurrency)
+    return results.summary(time.perf_counter() - started)
+
+
+def thundering_herd(target, clients, waves, latest_episode, host_header=None, audio_share=0.5):
+    """
+    Simulate the publish-time herd: every client polls the feed at the same
+    instant, and a share of them then fetch the start of the newest MP3.
+    """
+    results = Results()
+    barrier = threading.Barrier(clients)
+    audio_path = f"/media/episodes/{latest_episode:03d}.mp3"
+    started = time.perf_counter()
+
+    def worker():
+        client = Client(target, host_header)
+        rng = random.Random()
+        for _ in range(waves):
+            barrier.wait()
+            latency, status = client.request("GET", "/feed.xml", {})
+            results.add("feed", latency, status)
+            if rng.random() < audio_share:
+                latency, status = client.request("GET", audio_path, {"Range": AUDIO_RANGE})
+                results.add("audio", latency, status)
+        client.close()
+
+    run_threads(worker, clients)
+    return results.summary(time.perf_counter() - started)
+
+
+def slow_downloads(target, count, path, rate, stop, host_header=None):
+    """
+    Keep ``count`` listeners downloading ``path`` at ``rate`` bytes per second
+    until ``stop`` is set, as a mobile podcast app on a poor connection would.
+    Returns the started threads.
+    """
+    parts = urlsplit(target)
+    connection_class = (
+        http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    )
+    chunk_size = max(1, rate // 10)
+
+    def listener():
+        while not stop.is_set():
+            connection = connection_class(parts.netloc, timeout=60)
+            try:
+                headers = {"User-Agent": "podcast-loadtest"}
+                if host_header:
+                    headers["Host"] = host_header
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                while not stop.is_set() and response.read(chunk_size):
+                    time.sleep(0.1)
+            except (OSError, http.client.HTTPException):
+                time.sleep(0.5)
+            finally:
+                connection.close()
+
+    threads = [threading.Thread(target=listener, daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def run_threads(target, count):
+    threads = [threading.Thread(target=target, daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,106 @@
+import json
+import platform
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from podcast.benchmark import (
+    benchmark_environment,
+    compare,
+    generate_catalogue,
+    run_endpoints,
+)
+from podcast.models import PodcastEpisodePage
+
+
+class Command(BaseCommand):
+    help = "Benchmark the feed, index, episode and search endpoints at catalogue scale"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="100,1000,10000",
+            help="Comma-separated catalogue sizes to measure (default: 100,1000,10000)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Requests per endpoint and mode (default: 5)",
+        )
+        parser.add_argument(
+            "--output", help="Write the results as JSON to this file"
+        )
+        parser.add_argument(
+            "--compare",
+            metavar="BASELINE",
+            help="Compare against a previous results file and fail on regressions",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="Allowed growth over the baseline before flagging (default: 0.25)",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options["sizes"].split(","))
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers")
+
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+
+        results = {
+            "meta": {
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "repeat": options["repeat"],
+            },
+            "results": {},
+        }
+
+        with benchmark_environment():
+            for size in sizes:
+                existing = PodcastEpisodePage.objects.count()
+                self.stdout.write(f"Generating catalogue of {size} episodes...")
+                generate_catalogue(
+                    size - existing,
+                    progress=lambda done: self.stdout.write(f"  {existing + done}/{size}"),
+                )
+                self.stdout.write(f"Measuring endpoints at {size} episodes...")
+                results["results"][str(size)] = run_endpoints(options["repeat"])
+                self.report(size, results["results"][str(size)])
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options["threshold"])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(
+                        self.style.ERROR(
+                            "  {size} episodes, {endpoint}: {metric} "
+                            "{baseline:.1f} -> {current:.1f}".format(**regression)
+                        )
+                    )
+                raise CommandError(f"{len(regressions)} regressions against baseline")
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
+
+    def report(self, size, endpoints):
+        for name, metrics in endpoints.items():
+            self.stdout.write(
+                f"  {name:<14} {metrics['median_ms']:>9.1f} ms  "
+                f"{metrics['queries']:>5} queries  {metrics['peak_kb']:>9.0f} KiB peak  "
+                f"HTTP {metrics['status']}"
+            )
@@ -0,0 +1,140 @@
+import importlib.util
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from podcast.loadtest import replay, slow_downloads
+
+# A long episode, big enough that a slow listener keeps the server busy
+SLOW_AUDIO_NAME = "episodes/benchmark-slow-listener.mp3"
+
+
+def server_command(server, workers, port):
+    if server == "wsgi":
+        # The current production setup: Gunicorn with sync workers
+        return [
+            sys.executable, "-m", "gunicorn", "podcast_cms.wsgi",
+            "--workers", str(workers), "--bind", f"127.0.0.1:{port}",
+        ]
+    return [
+        sys.executable, "-m", "uvicorn", "podcast_cms.asgi:application",
+        "--workers", str(workers), "--port", str(port), "--no-access-log",
+    ]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"Server didn't start listening on port {port}")
+
+
+class Command(BaseCommand):
+    help = "Compare feed latency under Gunicorn sync workers and the ASGI server while slow listeners download audio"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=2, help="Server worker processes (default: 2)"
+        )
+        parser.add_argument(
+            "--slow-clients",
+            default="0,4,16",
+            help="Comma-separated numbers of slow listeners to test (default: 0,4,16)",
+        )
+        parser.add_argument(
+            "--rate",
+            type=int,
+            default=64 * 1024,
+            help="Bytes per second each slow listener reads (default: 65536)",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Feed requests per run (default: 200)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=10,
+            help="Concurrent feed clients (default: 10)",
+        )
+        parser.add_argument(
+            "--port", type=int, default=8765, help="Port to run the servers on"
+        )
+
+    def handle(self, *args, **options):
+        for module in ("gunicorn", "uvicorn"):
+            if importlib.util.find_spec(module) is None:
+                raise CommandError(f"{module} is needed: pip install {module}")
+        if not settings.MEDIA_URL.startswith("/"):
+            raise CommandError("Audio is served by the CDN, not by the app")
+
+        slow_counts = [int(count) for count in options["slow_clients"].split(",")]
+        if default_storage.exists(SLOW_AUDIO_NAME):
+            default_storage.delete(SLOW_AUDIO_NAME)
+        default_storage.save(SLOW_AUDIO_NAME, ContentFile(b"ID3" + bytes(64 * 1024 * 1024)))
+
+        rows = []
+        try:
+            for server in ("wsgi", "asgi"):
+                rows += self.run_server(server, slow_counts, options)
+        finally:
+            default_storage.delete(SLOW_AUDIO_NAME)
+
+        self.stdout.write(
+            f"\n{'server':<6} {'slow':>5} {'feed rps':>9} {'p50 ms':>8} "
+            f"{'p99 ms':>8} {'errors':>7}"
+        )
+        for server, count, stats in rows:
+            line = (
+                f"{server:<6} {count:>5} {stats['rps']:>9.1f} {stats['p50_ms']:>8.1f} "
+                f"{stats['p99_ms']:>8.1f} {stats['error_rate']:>7.1%}"
+            )
+            self.stdout.write(self.style.ERROR(line) if stats["error_rate"] else line)
+
+    def run_server(self, server, slow_counts, options):
+        port = options["port"]
+        target = f"http://127.0.0.1:{port}"
+        audio_path = f"{settings.MEDIA_URL}{SLOW_AUDIO_NAME}"
+        process = subprocess.Popen(
+            server_command(server, options["workers"], port),
+            cwd=settings.BASE_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        rows = []
+        try:
+            wait_for_port(port)
+            # Warm the feed cache in every worker
+            replay(target, [(0, "GET", "/feed.xml", {})] * options["workers"] * 4, 1)
+            for count in slow_counts:
+                self.stdout.write(f"{server}: {count} slow listeners...")
+                stop = threading.Event()
+                listeners = slow_downloads(target, count, audio_path, options["rate"], stop)
+                time.sleep(1)
+                report = replay(
+                    target,
+                    [(0, "GET", "/feed.xml", {})] * options["requests"],
+                    options["concurrency"],
+                    timeout=10,
+                )
+                stop.set()
+                for listener in listeners:
+                    listener.join()
+                rows.append((server, count, report["feed"]))
+        finally:
+            process.terminate()
+            process.wait()
+        return rows
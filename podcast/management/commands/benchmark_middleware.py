@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from podcast.benchmark import (
+    benchmark_environment,
+    generate_catalogue,
+    middleware_overhead,
+    public_endpoints,
+)
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request middleware overhead saved by the public fast path"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--episodes",
+            type=int,
+            default=50,
+            help="Episodes in the throwaway catalogue (default: 50)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=500,
+            help="Requests per endpoint and mode (default: 500)",
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_environment():
+            generate_catalogue(options["episodes"])
+            urls = public_endpoints()
+            urls.pop("search", None)
+            results = middleware_overhead(urls, options["repeat"])
+
+        self.stdout.write(
+            f"{'endpoint':<10} {'full us':>9} {'fast us':>9} {'saved us':>9} "
+            f"{'full queries':>13} {'fast queries':>13}"
+        )
+        for name, row in results.items():
+            self.stdout.write(
+                f"{name:<10} {row['full_us']:>9.0f} {row['fast_us']:>9.0f} "
+                f"{row['saved_us']:>9.0f} {row['full_queries']:>13.1f} "
+                f"{row['fast_queries']:>13.1f}"
+            )
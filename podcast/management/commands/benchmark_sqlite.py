@@ -0,0 +1,177 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment
+
+from podcast.benchmark import generate_catalogue
+
+PROFILES = {
+    "default": {"SQLITE_TUNED": "0"},
+    "tuned": {"SQLITE_TUNED": "1"},
+}
+
+
+class Command(BaseCommand):
+    help = "Compare SQLite feed and index read throughput during a concurrent import, with and without the tuned profile"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--episodes",
+            type=int,
+            default=200,
+            help="Episodes in the catalogue before the import starts (default: 200)",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=10,
+            help="Seconds to run readers and the import for (default: 10)",
+        )
+        parser.add_argument(
+            "--readers",
+            type=int,
+            default=4,
+            help="Concurrent reader threads (default: 4)",
+        )
+        parser.add_argument("--worker", action="store_true", help="Internal use")
+
+    def handle(self, *args, **options):
+        if options["worker"]:
+            return self.run_worker(options)
+
+        results = {}
+        for profile, env in PROFILES.items():
+            self.stdout.write(f"Running {profile} SQLite profile...")
+            results[profile] = self.run_profile(env, options)
+
+        self.stdout.write(
+            f"\n{'profile':<10} {'feed rps':>9} {'index rps':>10} "
+            f"{'read errors':>12} {'writes/s':>9} {'write errors':>13}"
+        )
+        for profile, result in results.items():
+            self.stdout.write(
+                f"{profile:<10} {result['feed_rps']:>9.1f} {result['index_rps']:>10.1f} "
+                f"{result['read_errors']:>12} {result['writes_per_second']:>9.1f} "
+                f"{result['write_errors']:>13}"
+            )
+
+    def run_profile(self, env, options):
+        """Run the worker in a fresh process against a fresh database file."""
+        workdir = tempfile.mkdtemp(prefix="podcast-sqlite-benchmark-")
+        try:
+            process_env = {
+                **os.environ,
+                **env,
+                "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'db.sqlite3')}",
+                # Every read renders from the database
+                "CACHE_URL": "dummycache://",
+            }
+            completed = subprocess.run(
+                [
+                    sys.executable,
+                    os.path.join(settings.BASE_DIR, "manage.py"),
+                    "benchmark_sqlite",
+                    "--worker",
+                    f"--episodes={options['episodes']}",
+                    f"--duration={options['duration']}",
+                    f"--readers={options['readers']}",
+                ],
+                env=process_env,
+                capture_output=True,
+                text=True,
+            )
+            if completed.returncode != 0:
+                raise CommandError(completed.stderr)
+            return json.loads(completed.stdout.strip().splitlines()[-1])
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run_worker(self, options):
+        media_root = tempfile.mkdtemp(prefix="podcast-sqlite-media-")
+        setup_test_environment()
+        try:
+            with override_settings(
+                MEDIA_ROOT=media_root,
+                STORAGES={
+                    "default": {
+                        "BACKEND": "django.core.files.storage.FileSystemStorage",
+                    },
+                    "staticfiles": {
+                        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+                    },
+                },
+            ):
+                call_command("migrate", verbosity=0)
+                generate_catalogue(options["episodes"])
+                connection.close()
+                result = self.measure(options["duration"], options["readers"])
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+        self.stdout.write(json.dumps(result))
+
+    def measure(self, duration, readers):
+        stop = threading.Event()
+        lock = threading.Lock()
+        counts = {"feed": 0, "index": 0, "read_errors": 0, "writes": 0, "write_errors": 0}
+
+        def count(key):
+            with lock:
+                counts[key] += 1
+
+        def reader(urls):
+            client = Client()
+            try:
+                while not stop.is_set():
+                    for name, url in urls:
+                        try:
+                            response = client.get(url)
+                            count(name if response.status_code == 200 else "read_errors")
+                        except Exception:
+                            count("read_errors")
+            finally:
+                connections.close_all()
+
+        def importer():
+            # Episodes are added one at a time, like migrate_podcast does
+            try:
+                while not stop.is_set():
+                    try:
+                        generate_catalogue(1)
+                        count("writes")
+                    except Exception:
+                        count("write_errors")
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=importer)]
+        threads += [
+            threading.Thread(target=reader, args=([("feed", "/feed.xml"), ("index", "/episodes/")],))
+            for _ in range(readers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        return {
+            "feed_rps": counts["feed"] / elapsed,
+            "index_rps": counts["index"] / elapsed,
+            "read_errors": counts["read_errors"],
+            "writes_per_second": counts["writes"] / elapsed,
+            "write_errors": counts["write_errors"],
+        }
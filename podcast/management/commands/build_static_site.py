@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.forms.models import model_to_dict
+from django.test import Client
+from wagtail.models import Site
+
+from home.models import AboutPage, ContactPage
+from podcast.cache import compress
+from podcast.models import (
+    COVER_RENDITIONS,
+    PodcastEpisodePage,
+    PodcastIndexPage,
+    PodcastSettings,
+)
+from podcast_cms.startup import worker_pool
+
+MANIFEST_NAME = ".build-manifest.json"
+
+
+def fingerprint(*values):
+    """Hash JSON-serialisable values into a short, stable fingerprint."""
+    data = json.dumps(values, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def output_path(output_dir, url):
+    """Map a public URL to the file nginx should serve for it."""
+    path = url.lstrip("/")
+    if not path or path.endswith("/"):
+        path += "index.html"
+    return os.path.join(output_dir, path)
+
+
+def write_file(path, content, precompress=True):
+    """Write ``content`` and its pre-compressed siblings atomically."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    files = {path: content}
+    if precompress:
+        for encoding, encoded in compress(content).items():
+            files[f"{path}.{'gz' if encoding == 'gzip' else encoding}"] = encoded
+    for target, data in files.items():
+        tmp_path = f"{target}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+
+
+def render_urls(urls, output_dir):
+    """Render ``urls`` through the full Django stack and write them to disk."""
+    client = Client(HTTP_HOST=settings.PODCAST_DOMAIN)
+    results = []
+    for url in urls:
+        start = time.monotonic()
+        response = client.get(url, secure=True)
+        if response.status_code == 200:
+            write_file(output_path(output_dir, url), response.content)
+        results.append((url, response.status_code, time.monotonic() - start))
+    return results
+
+
+class Command(BaseCommand):
+    help = "Render the public podcast site and feed to static files for nginx"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=os.path.join(settings.BASE_DIR, "site"),
+            help="Directory to write the site to (default: ./site)",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only rebuild pages whose source changed since the last build",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of processes to render pages with",
+        )
+        parser.add_argument(
+            "--skip-static",
+            action="store_true",
+            help="Don't collect and copy static assets",
+        )
+
+    def handle(self, *args, **options):
+        output_dir = os.path.abspath(options["output"])
+        incremental = options["incremental"]
+        processes = max(1, options["processes"])
+        os.makedirs(output_dir, exist_ok=True)
+
+        site = Site.objects.filter(is_default_site=True).first() or Site.objects.first()
+        if not site:
+            raise CommandError("No site configured")
+
+        manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        previous = {}
+        if incremental and os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                previous = json.load(f).get("pages", {})
+
+        started = time.monotonic()
+
+        if not options["skip_static"]:
+            self.stdout.write("Collecting hashed static assets...")
+            call_command("collectstatic", interactive=False, verbosity=0)
+            shutil.copytree(
+                settings.STATIC_ROOT,
+                os.path.join(output_dir, settings.STATIC_URL.strip("/")),
+                dirs_exist_ok=True,
+            )
+
+        pages, episodes = self.collect_pages(site)
+        stale = [url for url, digest in pages.items() if previous.get(url) != digest]
+        self.stdout.write(
+            f"{len(stale)} of {len(pages)} pages need rendering"
+            + (" (incremental)" if incremental else "")
+        )
+
+        # The listing pages show every cover, otherwise only rebuilt episodes need them
+        if "/" in stale:
+            self.generate_renditions(episodes.values())
+        else:
+            self.generate_renditions(
+                episodes[url] for url in stale if url in episodes
+            )
+        results = self.render(sorted(stale), output_dir, processes)
+
+        failed = [(url, status) for url, status, _ in results if status != 200]
+        for url, status in failed:
+            self.stdout.write(self.style.ERROR(f"  {url}: HTTP {status}"))
+
+        # Remove pages that are no longer public
+        for url in set(previous) - set(pages):
+            path = output_path(output_dir, url)
+            for target in (path, f"{path}.gz", f"{path}.br"):
+                if os.path.exists(target):
+                    os.remove(target)
+            self.stdout.write(f"  Removed {url}")
+
+        # Failed pages are left out of the manifest so the next build retries them
+        built = dict(previous)
+        built.update(pages)
+        for url, _ in failed:
+            built.pop(url, None)
+        for url in set(previous) - set(pages):
+            built.pop(url, None)
+        write_file(
+            manifest_path,
+            json.dumps({"built_at": time.time(), "pages": built}, indent=2).encode(),
+            precompress=False,
+        )
+
+        rendered = len(results) - len(failed)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rendered {rendered} pages to {output_dir} "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
+
+    def collect_pages(self, site):
+        """
+        Return a ``{url: fingerprint}`` mapping of every public URL, along with
+        the live episodes keyed by URL.
+        """
+        pages = {}
+        episodes = {
+            episode.relative_url(site): episode
+            for episode in PodcastEpisodePage.objects.live()
+            .public()
+            .select_related("cover_image")
+        }
+        for url, episode in episodes.items():
+            pages[url] = fingerprint(episode.serializable_data())
+
+        # The index, home page and feed list every episode, so depend on all of them
+        podcast_settings = PodcastSettings.for_site(site)
+        listing = fingerprint(sorted(pages.values()), model_to_dict(podcast_settings))
+        pages["/feed.xml"] = listing
+        pages["/feed.json"] = listing
+        indexes = list(PodcastIndexPage.objects.live().public())
+        for index in indexes:
+            pages[index.relative_url(site)] = fingerprint(
+                listing, index.serializable_data()
+            )
+        # The home page renders the podcast index in place
+        pages["/"] = fingerprint(
+            listing, [index.serializable_data() for index in indexes]
+        )
+
+        for page in list(AboutPage.objects.live().public()) + list(
+            ContactPage.objects.live().public()
+        ):
+            pages[page.relative_url(site)] = fingerprint(page.serializable_data())
+
+        return pages, episodes
+
+    def generate_renditions(self, episodes):
+        """Create the template renditions up front for the pages being rebuilt."""
+        count = 0
+        for episode in episodes:
+            if episode.cover_image:
+                episode.cover_image.get_renditions(*COVER_RENDITIONS)
+                count += 1
+        if count:
+            self.stdout.write(f"Generated renditions for {count} episode covers")
+
+    def render(self, urls, output_dir, processes):
+        if not urls:
+            return []
+        if processes == 1 or len(urls) == 1:
+            return render_urls(urls, output_dir)
+
+        chunks = [urls[i::processes] for i in range(processes)]
+        with worker_pool(processes) as pool:
+            results = pool.starmap(
+                render_urls, [(chunk, output_dir) for chunk in chunks if chunk]
+            )
+        return [result for chunk in results for result in chunk]
@@ -0,0 +1,24 @@
+from django.contrib.staticfiles.management.commands import collectstatic
+
+
+class Command(collectstatic.Command):
+    """
+    ``collectstatic`` that skips files whose content is unchanged, for storages
+    that keep an index of what they collected (see ``podcast_cms.storage``).
+
+    Django only compares modification times, and every file in a release
+    exported with ``git archive`` looks newer than the last collected copy.
+    """
+
+    def delete_file(self, path, prefixed_path, source_storage):
+        is_unmodified = getattr(self.storage, "is_unmodified", None)
+        if (
+            is_unmodified is not None
+            and not self.symlink
+            and is_unmodified(prefixed_path, source_storage, path)
+        ):
+            if prefixed_path not in self.unmodified_files:
+                self.unmodified_files.append(prefixed_path)
+            self.log("Skipping '%s' (not modified)" % path)
+            return False
+        return super().delete_file(path, prefixed_path, source_storage)
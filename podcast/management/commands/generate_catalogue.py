@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from podcast.benchmark import generate_catalogue
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic podcast episodes (with covers, transcripts and audio stubs) for benchmarking"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--episodes",
+            type=int,
+            default=100,
+            help="Number of episodes to add (default: 100)",
+        )
+
+    def handle(self, *args, **options):
+        count = options["episodes"]
+        self.stdout.write(f"Generating {count} episodes...")
+        generate_catalogue(
+            count, progress=lambda done: self.stdout.write(f"  {done}/{count}")
+        )
+        self.stdout.write(self.style.SUCCESS(f"Generated {count} episodes"))
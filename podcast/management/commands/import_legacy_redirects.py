@@ -0,0 +1,105 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.models import Page, Site
+
+from podcast import redirects
+
+
+def read_redirect_map(f):
+    """
+    Yield ``(old, new)`` pairs from a CSV file or a whitespace-separated map,
+    skipping blank lines and ``#`` comments.
+    """
+    for row in csv.reader(f):
+        if len(row) == 1:
+            row = row[0].split()
+        row = [value.strip() for value in row]
+        if not row or not row[0] or row[0].startswith("#"):
+            continue
+        if len(row) < 2 or not row[1]:
+            raise CommandError(f"No target for {row[0]}")
+        yield row[0], row[1]
+
+
+class Command(BaseCommand):
+    help = "Bulk import a legacy URL map (old path, new path or URL) as Wagtail redirects"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or whitespace-separated file of old and new URLs")
+        parser.add_argument(
+            "--site",
+            help="Hostname of the site the redirects apply to (default: all sites)",
+        )
+        parser.add_argument(
+            "--temporary",
+            action="store_true",
+            help="Create temporary (302) instead of permanent (301) redirects",
+        )
+
+    def handle(self, *args, **options):
+        site = None
+        if options["site"]:
+            site = Site.objects.filter(hostname=options["site"]).first()
+            if site is None:
+                raise CommandError(f"No site with hostname {options['site']}")
+        root_site = (
+            site
+            or Site.objects.filter(is_default_site=True).first()
+            or Site.objects.first()
+        )
+        if root_site is None:
+            raise CommandError("No site configured")
+        root = root_site.root_page
+
+        with open(options["path"], encoding="utf-8", newline="") as f:
+            mapping = {
+                Redirect.normalise_path(old): new for old, new in read_redirect_map(f)
+            }
+
+        # Targets on this site point at the page itself, so they survive slug changes
+        def url_path(new):
+            if new.startswith("/"):
+                return f"{root.url_path}{new.strip('/')}/".replace("//", "/")
+
+        pages = {
+            page.url_path: page
+            for page in Page.objects.filter(
+                url_path__in={url_path(new) for new in mapping.values()} - {None}
+            )
+        }
+
+        existing = {
+            redirect.old_path: redirect
+            for redirect in Redirect.objects.filter(
+                site=site, old_path__in=mapping
+            )
+        }
+        created, updated = [], []
+        linked = 0
+        for old_path, new in mapping.items():
+            redirect = existing.get(old_path) or Redirect(old_path=old_path, site=site)
+            redirect.redirect_page = pages.get(url_path(new))
+            redirect.redirect_link = "" if redirect.redirect_page else new
+            linked += redirect.redirect_page is not None
+            redirect.is_permanent = not options["temporary"]
+            (updated if redirect.pk else created).append(redirect)
+
+        # Bulk writes skip the save signals, so invalidate once at the end
+        with transaction.atomic():
+            Redirect.objects.bulk_create(created, batch_size=500)
+            Redirect.objects.bulk_update(
+                updated,
+                ["redirect_page", "redirect_link", "is_permanent"],
+                batch_size=500,
+            )
+        redirects.invalidate()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {len(mapping)} redirects: {len(created)} created, "
+                f"{len(updated)} updated ({linked} to pages)"
+            )
+        )
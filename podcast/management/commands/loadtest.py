@@ -0,0 +1,123 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from podcast.loadtest import (
+    parse_access_log,
+    replay,
+    synthetic_requests,
+    thundering_herd,
+)
+from podcast.models import PodcastEpisodePage
+
+
+class Command(BaseCommand):
+    help = "Replay a recorded or synthetic request mix against a running server and report latencies per route"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            default="http://127.0.0.1:8000",
+            help="Base URL of the running Gunicorn/ASGI server",
+        )
+        parser.add_argument(
+            "--host-header",
+            help="Host header to send, e.g. the production domain",
+        )
+        parser.add_argument(
+            "--log",
+            help="Access log (combined format) to replay instead of a synthetic mix",
+        )
+        parser.add_argument(
+            "--speed",
+            type=float,
+            help="Replay the log with its original timing, sped up by this factor",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=1000,
+            help="Number of synthetic requests (default: 1000)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=10,
+            help="Number of concurrent clients (default: 10)",
+        )
+        parser.add_argument(
+            "--herd",
+            type=int,
+            metavar="CLIENTS",
+            help="Simulate the publish-time thundering herd with this many clients",
+        )
+        parser.add_argument(
+            "--waves",
+            type=int,
+            default=3,
+            help="Number of simultaneous polls per client in --herd mode (default: 3)",
+        )
+        parser.add_argument(
+            "--seed", type=int, help="Random seed for a reproducible synthetic mix"
+        )
+        parser.add_argument("--output", help="Write the report as JSON to this file")
+
+    def handle(self, *args, **options):
+        # Episode numbers come from the local database, matching the target's data
+        episode_numbers = list(
+            PodcastEpisodePage.objects.live().values_list("episode_number", flat=True)
+        )
+
+        if options["herd"]:
+            if not episode_numbers:
+                raise CommandError("No live episodes to fetch audio for")
+            self.stdout.write(
+                f"Thundering herd: {options['herd']} clients x {options['waves']} waves"
+            )
+            report = thundering_herd(
+                options["target"],
+                options["herd"],
+                options["waves"],
+                max(episode_numbers),
+                host_header=options["host_header"],
+            )
+        else:
+            if options["log"]:
+                with open(options["log"], encoding="utf-8", errors="replace") as f:
+                    requests = list(parse_access_log(f))
+                if not requests:
+                    raise CommandError(f"No replayable requests in {options['log']}")
+            else:
+                requests = synthetic_requests(
+                    options["requests"], episode_numbers, seed=options["seed"]
+                )
+            self.stdout.write(
+                f"Replaying {len(requests)} requests with {options['concurrency']} clients"
+            )
+            report = replay(
+                options["target"],
+                requests,
+                options["concurrency"],
+                host_header=options["host_header"],
+                speed=options["speed"],
+            )
+
+        self.stdout.write(
+            f"{'route':<10} {'requests':>8} {'rps':>8} {'p50 ms':>8} "
+            f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'4xx':>7}"
+        )
+        for route, stats in report.items():
+            line = (
+                f"{route:<10} {stats['requests']:>8} {stats['rps']:>8.1f} "
+                f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+                f"{stats['p99_ms']:>8.1f} {stats['error_rate']:>7.1%} "
+                f"{stats['client_error_rate']:>7.1%}"
+            )
+            self.stdout.write(
+                self.style.ERROR(line) if stats["error_rate"] else line
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
@@ -1,19 +1,11 @@
 import os
 import os.path
-import xml.etree.ElementTree as ET
-import requests
 import datetime
 from django.conf import settings
-from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand
-from django.utils.text import slugify
 from django.core.files.temp import NamedTemporaryFile
 from django.core.files import File
 from podcast.models import PodcastIndexPage, PodcastEpisodePage
-from PIL import Image as PILImage
-from io import BytesIO
-from wagtail.images.models import Image
-from wagtail.images import get_image_model
 from wagtail.models import Page
 
 
@@ -33,6 +25,12 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
+        # Only needed for an actual migration, not for --help or a typo
+        import xml.etree.ElementTree as ET
+
+        import requests
+        from wagtail.images import get_image_model
+
         # Find the PodcastIndexPage or create if it doesn't exist
         podcast_index = PodcastIndexPage.objects.live().first()
 
@@ -1,6 +1,7 @@
 import os
 from django.core.management.base import BaseCommand
 from django.conf import settings
+from podcast import indexing
 from podcast.models import PodcastEpisodePage
 
 
@@ -25,6 +26,11 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
+        # Index the updated transcripts in one pass at the end
+        with indexing.batch():
+            self.populate(**options)
+
+    def populate(self, **options):
         force = options.get("force", False)
         dry_run = options.get("dry_run", False)
         specific_episode = options.get("episode", None)
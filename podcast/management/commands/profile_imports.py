@@ -0,0 +1,127 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import get_commands
+from django.core.management.base import BaseCommand, CommandError
+
+# What a server worker imports before it can answer its first request
+SERVER_ENTRY_POINTS = {
+    "wsgi": "import podcast_cms.wsgi",
+    "asgi": "import podcast_cms.asgi",
+}
+LOAD_URLCONF = "; from django.urls import get_resolver; get_resolver().url_patterns"
+
+# What manage.py imports before running a command. Django loads commands with
+# importlib.import_module(), which -X importtime doesn't report, so the command
+# module is imported directly instead.
+LOAD_COMMAND = "import django; django.setup(); import {module}"
+
+# The apps whose management commands are profiled by default
+PROJECT_APPS = ("podcast", "home", "search")
+
+
+def parse_importtime(output):
+    """
+    Parse ``python -X importtime`` output into ``(module, self_us, cumulative_us)``
+    tuples, in the order the imports finished.
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # the header
+        imports.append((module.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def profile(args):
+    """Run ``python -X importtime *args`` and return its parsed imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if result.returncode:
+        raise CommandError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+class Command(BaseCommand):
+    help = "Report the heaviest imports of the web servers and management commands"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "entry_points",
+            nargs="*",
+            help=(
+                "wsgi, asgi or management command names "
+                "(default: both servers and every project command)"
+            ),
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=10,
+            help="Number of packages and modules to list per entry point (default: 10)",
+        )
+
+    def handle(self, *args, **options):
+        entry_points = options["entry_points"]
+        if not entry_points:
+            commands = get_commands()
+            project_apps = {apps.get_app_config(label).name for label in PROJECT_APPS}
+            entry_points = list(SERVER_ENTRY_POINTS) + sorted(
+                name for name, app in commands.items() if app in project_apps
+            )
+
+        summary = []
+        for entry_point in entry_points:
+            if entry_point in SERVER_ENTRY_POINTS:
+                args = ["-c", SERVER_ENTRY_POINTS[entry_point] + LOAD_URLCONF]
+                own_module = None
+            else:
+                app = get_commands().get(entry_point)
+                if app is None:
+                    raise CommandError(f"Unknown entry point {entry_point}")
+                own_module = f"{app}.management.commands.{entry_point}"
+                args = ["-c", LOAD_COMMAND.format(module=own_module)]
+            imports = profile(args)
+            summary.append(self.report(entry_point, imports, own_module, options["top"]))
+
+        self.stdout.write(f"\n{'entry point':<24} {'imports ms':>10} {'own ms':>8}")
+        for entry_point, total_ms, own_ms in summary:
+            own = f"{own_ms:>8.1f}" if own_ms is not None else f"{'':>8}"
+            self.stdout.write(f"{entry_point:<24} {total_ms:>10.1f} {own}")
+
+    def report(self, entry_point, imports, own_module, top):
+        total_ms = sum(self_us for _, self_us, _ in imports) / 1000
+        own_ms = None
+        for module, _, cumulative_us in imports:
+            if module == own_module:
+                own_ms = cumulative_us / 1000
+
+        title = f"{entry_point}: {total_ms:.1f}ms in {len(imports)} modules"
+        if own_ms is not None:
+            title += f", {own_ms:.1f}ms importing the command itself"
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+
+        packages = defaultdict(int)
+        for module, self_us, _ in imports:
+            packages[module.split(".")[0]] += self_us
+        self.stdout.write("  by package:")
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f"    {package:<40} {self_us / 1000:>8.1f}ms")
+
+        self.stdout.write("  heaviest modules (own time):")
+        for module, self_us, _ in sorted(imports, key=lambda item: -item[1])[:top]:
+            self.stdout.write(f"    {module:<40} {self_us / 1000:>8.1f}ms")
+        return entry_point, total_ms, own_ms
@@ -0,0 +1,102 @@
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from wagtail.search.backends import get_search_backend
+from wagtail.search.index import get_indexed_models
+from wagtail.search.management.commands.update_index import group_models_by_index
+
+from podcast.models import PendingSearchUpdate
+from podcast_cms.startup import worker_pool
+
+# Objects per chunk handed to a worker, each added in one bulk statement
+CHUNK_SIZE = 200
+
+
+def index_chunk(backend_name, model_label, pks):
+    """Add the objects with ``pks`` to the backend's index for their model."""
+    model = apps.get_model(model_label)
+    backend = get_search_backend(backend_name)
+    objects = list(model.get_indexed_objects().filter(pk__in=pks))
+    if objects:
+        backend.get_index_for_model(model).add_items(model, objects)
+    return len(objects)
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search index, spreading the indexing across processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backend",
+            help="Only rebuild this search backend (default: all of them)",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of processes to index with",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Objects indexed per bulk statement",
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options["processes"])
+        chunk_size = max(1, options["chunk_size"])
+        backend_names = [options["backend"]] if options["backend"] else list(
+            getattr(settings, "WAGTAILSEARCH_BACKENDS", None) or ["default"]
+        )
+        started_at = timezone.now()
+        start = time.monotonic()
+
+        for backend_name in backend_names:
+            self.rebuild(backend_name, processes, chunk_size)
+
+        # Episodes queued before the rebuild read them are indexed already
+        PendingSearchUpdate.objects.filter(queued_at__lt=started_at).delete()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt the search index in {time.monotonic() - start:.1f}s "
+                f"with {processes} processes"
+            )
+        )
+
+    def rebuild(self, backend_name, processes, chunk_size):
+        backend = get_search_backend(backend_name)
+        # The class attribute, as the atomic rebuilder holds a transaction
+        # open that the workers' connections couldn't write through
+        rebuilder_class = type(backend).rebuilder_class
+        if not rebuilder_class:
+            self.stdout.write(f"{backend_name}: doesn't need rebuilding")
+            return
+
+        for index, models in group_models_by_index(backend, get_indexed_models()).items():
+            rebuilder = rebuilder_class(index)
+            index = rebuilder.start()
+            jobs = []
+            for model in models:
+                index.add_model(model)
+                pks = list(
+                    model.get_indexed_objects().order_by("pk").values_list("pk", flat=True)
+                )
+                jobs += [
+                    (backend_name, model._meta.label, pks[i : i + chunk_size])
+                    for i in range(0, len(pks), chunk_size)
+                ]
+            indexed = self.run(jobs, processes)
+            rebuilder.finish()
+            self.stdout.write(f"{backend_name}: indexed {indexed} objects in {index.name}")
+
+    def run(self, jobs, processes):
+        if processes == 1 or len(jobs) <= 1:
+            return sum(index_chunk(*job) for job in jobs)
+
+        with worker_pool(min(processes, len(jobs))) as pool:
+            return sum(pool.starmap(index_chunk, jobs))
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from podcast.releases import (
+    PREPARED_KEY,
+    REPORTS_KEY,
+    schedule_release,
+    scheduled_revisions,
+)
+
+
+class Command(BaseCommand):
+    help = "List scheduled episode releases and how quickly recent ones went out"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="Queue the prepare and publish tasks of every scheduled release again",
+        )
+
+    def handle(self, *args, **options):
+        revisions = scheduled_revisions()
+        self.stdout.write(self.style.MIGRATE_HEADING("Scheduled"))
+        for revision in revisions:
+            prepared = cache.get(PREPARED_KEY.format(revision_id=revision.pk))
+            self.stdout.write(
+                f"  {revision.approved_go_live_at:%Y-%m-%d %H:%M} {revision.object_str}"
+                f" (revision {revision.pk}{', prepared' if prepared else ''})"
+            )
+            if options["schedule"] and not schedule_release(revision, force=True):
+                self.stdout.write(
+                    self.style.WARNING(
+                        "    Not queued: the task backend can't defer tasks, "
+                        "set TASKS_DATABASE=True"
+                    )
+                )
+        if not revisions:
+            self.stdout.write("  Nothing scheduled")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Recent releases"))
+        self.stdout.write(
+            f"  {'scheduled':<17} {'prepared':>8} {'delay s':>8} "
+            f"{'publish s':>9} {'latency s':>9}  episode"
+        )
+        for report in cache.get(REPORTS_KEY, []):
+            self.stdout.write(
+                f"  {report['scheduled'][:16]:<17} "
+                f"{'yes' if report['prepared'] else 'no':>8} "
+                f"{report['start_delay']:>8.2f} {report['publish_seconds']:>9.2f} "
+                f"{report['latency']:>9.2f}  {report['title']}"
+            )
@@ -0,0 +1,166 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from wagtail.models import Site
+
+from podcast import loadtest
+from podcast.models import (
+    COVER_RENDITIONS,
+    PodcastEpisodePage,
+    PodcastIndexPage,
+    PodcastSettings,
+)
+from podcast.redirects import redirect_table
+from podcast.wagtail_hooks import get_podcast_index_id
+
+
+def fetch(urls, target=None, repeat=1):
+    """
+    Request ``urls`` through the full stack, in this process or from the server
+    at ``target``. Return the number of responses that weren't a 200.
+    """
+    failures = 0
+    if target is None:
+        client = Client(HTTP_HOST=settings.PODCAST_DOMAIN)
+        for url in urls:
+            response = client.get(url, secure=True, HTTP_ACCEPT_ENCODING="gzip, br")
+            failures += response.status_code != 200
+        return failures
+
+    # Workers each keep their own cache, so ask several times to reach them all
+    client = loadtest.Client(target, host_header=settings.PODCAST_DOMAIN)
+    try:
+        for _ in range(repeat):
+            for url in urls:
+                _, status = client.request(
+                    "GET", url, {"X-Forwarded-Proto": "https"}
+                )
+                failures += status != 200
+    finally:
+        client.close()
+    return failures
+
+
+class Command(BaseCommand):
+    help = "Warm the feed, page, rendition and settings caches, e.g. after a deploy"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--episodes",
+            type=int,
+            default=10,
+            help="Number of latest episode pages to render (default: 10)",
+        )
+        parser.add_argument(
+            "--url",
+            help=(
+                "Warm a running server at this address (e.g. http://127.0.0.1:8000) "
+                "instead of the cache shared with this process"
+            ),
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=1,
+            help="Requests per page with --url, to reach every worker (default: 1)",
+        )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=5,
+            help="Stages to run at once; 1 runs them in turn (default: 5, all of them)",
+        )
+
+    def handle(self, *args, **options):
+        site = Site.objects.filter(is_default_site=True).first() or Site.objects.first()
+        if not site:
+            raise CommandError("No site configured")
+
+        # Settings are created on first use, and saving them invalidates the
+        # artifacts, so make sure that has happened before building any
+        PodcastSettings.for_site(site)
+
+        target = options["url"]
+        repeat = max(1, options["repeat"])
+        episodes = list(
+            PodcastEpisodePage.objects.live()
+            .public()
+            .select_related("cover_image")
+            .order_by("-publication_date")
+        )
+        latest = [episode.relative_url(site) for episode in episodes[: options["episodes"]]]
+        indexes = ["/"] + [
+            index.relative_url(site) for index in PodcastIndexPage.objects.live().public()
+        ]
+
+        def renditions():
+            # The listing pages show every cover
+            covers = {episode.cover_image for episode in episodes if episode.cover_image}
+            for image in covers:
+                image.get_renditions(*COVER_RENDITIONS)
+            return len(covers), 0
+
+        def site_settings():
+            Site.get_site_root_paths()
+            PodcastSettings.for_site(site)
+            get_podcast_index_id()
+            redirect_table.get_entries()
+            return 4, 0
+
+        stages = {
+            "feed": lambda: (1, fetch(["/feed.xml"], target, repeat)),
+            "index": lambda: (len(indexes), fetch(indexes, target, repeat)),
+            "episodes": lambda: (len(latest), fetch(latest, target, repeat)),
+            "renditions": renditions,
+        }
+        # These caches live in each process, so this one's are no use to a
+        # running server, whose workers fill theirs answering the requests above
+        skipped = ["settings"] if target else []
+        if not target:
+            stages["settings"] = site_settings
+
+        def run(name):
+            start = time.monotonic()
+            try:
+                count, failures = stages[name]()
+                return name, count, failures, time.monotonic() - start, None
+            except Exception as e:
+                return name, 0, 0, time.monotonic() - start, e
+
+        def run_in_thread(name):
+            try:
+                return run(name)
+            finally:
+                # Each stage runs in its own thread, with its own connections
+                connections.close_all()
+
+        started = time.monotonic()
+        if options["jobs"] <= 1:
+            results = [run(name) for name in stages]
+        else:
+            with ThreadPoolExecutor(options["jobs"]) as executor:
+                results = list(executor.map(run_in_thread, stages))
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(f"{'stage':<11} {'items':>6} {'failed':>7} {'seconds':>8}")
+        failed = False
+        for name, count, failures, duration, error in results:
+            line = f"{name:<11} {count:>6} {failures:>7} {duration:>8.2f}"
+            if error is not None:
+                line += f"  {error}"
+            if failures or error is not None:
+                failed = True
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        for name in skipped:
+            self.stdout.write(f"{name:<11} {'n/a':>6}  (per-process, not warmed with --url)")
+
+        summary = f"Warmed caches in {elapsed:.2f}s"
+        if failed:
+            raise CommandError(f"{summary}, with failures")
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,39 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from podcast.websub import LocalHub
+
+
+class Command(BaseCommand):
+    help = "Run a minimal local WebSub hub for testing publish pings and subscriptions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--bind",
+            default="127.0.0.1:8081",
+            help="Address to listen on (default: 127.0.0.1:8081)",
+        )
+        parser.add_argument(
+            "--origin",
+            help=(
+                "Fetch topics from this server instead of their own host, "
+                "e.g. http://127.0.0.1:8000"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+        host, _, port = options["bind"].rpartition(":")
+        hub = LocalHub((host or "127.0.0.1", int(port)), origin=options["origin"])
+        self.stdout.write(
+            f"WebSub hub listening on {hub.url}\n"
+            f"Set PODCAST_WEBSUB_HUB={hub.url} for the site to ping it."
+        )
+        try:
+            hub.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            hub.server_close()
+            self.stdout.write(f"Received {len(hub.published)} publish pings")
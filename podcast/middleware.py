@@ -0,0 +1,93 @@
+"""
+A lean middleware path for anonymous public requests.
+
+``PublicFastPathMiddleware`` marks GET and HEAD requests to the routes in
+``PODCAST_FAST_PATHS`` that carry no session cookie. The session, CSRF,
+authentication and message middleware below are subclasses of Django's that
+step aside for marked requests, so a feed poll doesn't pay for loading a
+session or resolving a user it will never use. Everything else, including the
+admin and any form submission, gets Django's full behaviour.
+
+Wagtail's ``RedirectMiddleware`` stays on every request: it only does work for
+404 responses, and old episode URLs on the fast path still need redirecting.
+"""
+
+import re
+from importlib import import_module
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.sessions import middleware as sessions_middleware
+from django.middleware import csrf
+
+
+def is_fast_path(request):
+    return getattr(request, "podcast_fast_path", False)
+
+
+class PublicFastPathMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.paths = [re.compile(pattern) for pattern in settings.PODCAST_FAST_PATHS]
+        self.SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+
+    def __call__(self, request):
+        if self.should_skip(request):
+            self.prepare(request)
+        return self.get_response(request)
+
+    def should_skip(self, request):
+        return (
+            settings.PODCAST_FAST_PATH_ENABLED
+            and request.method in ("GET", "HEAD")
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+            and any(path.match(request.path_info) for path in self.paths)
+        )
+
+    def prepare(self, request):
+        request.podcast_fast_path = True
+        # What the skipped middleware would have resolved for a new visitor.
+        # An empty session never touches the session store.
+        request.session = self.SessionStore()
+        request.user = AnonymousUser()
+
+        async def auser():
+            return request.user
+
+        request.auser = auser
+
+
+class SkippedOnFastPathMixin:
+    """Pass fast path requests straight through to the next middleware."""
+
+    def __call__(self, request):
+        if is_fast_path(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(SkippedOnFastPathMixin, sessions_middleware.SessionMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(SkippedOnFastPathMixin, csrf.CsrfViewMiddleware):
+    pass
+
+
+class AuthenticationMiddleware(
+    SkippedOnFastPathMixin, auth_middleware.AuthenticationMiddleware
+):
+    pass
+
+
+class MessageMiddleware(SkippedOnFastPathMixin, messages_middleware.MessageMiddleware):
+    pass
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("podcast", "0004_podcastsettings"),
+        ("wagtailcore", "0095_groupsitepermission"),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name="podcastepisodepage",
+            constraint=models.UniqueConstraint(
+                fields=("episode_number",), name="podcast_episode_number_unique"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="podcastepisodepage",
+            index=models.Index(fields=["guid"], name="podcast_episode_guid_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="podcastepisodepage",
+            index=models.Index(
+                fields=["-publication_date", "page_ptr"],
+                name="podcast_episode_pubdate_idx",
+            ),
+        ),
+    ]
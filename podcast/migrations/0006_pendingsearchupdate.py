@@ -0,0 +1,33 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("podcast", "0005_podcastepisodepage_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingSearchUpdate",
+            fields=[
+                (
+                    "episode",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="podcast.podcastepisodepage",
+                    ),
+                ),
+                ("queued_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["queued_at"], name="podcast_pending_search_idx")
+                ],
+            },
+        ),
+    ]
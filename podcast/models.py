@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
@@ -7,10 +8,22 @@ from wagtail.admin.panels import FieldPanel, MultiFieldPanel, InlinePanel
 from wagtail.search import index
 from wagtail.contrib.settings.models import BaseSiteSetting, register_setting
 from modelcluster.fields import ParentalKey
+from django.utils import timezone
 from django.utils.functional import cached_property
+from wagtail.admin.forms import WagtailAdminPageForm
+from podcast.cache import CachedPageMixin
 import os
 
 
+# Cover renditions used by the episode and index templates, so that they can be
+# generated ahead of the first request
+COVER_RENDITIONS = (
+    "fill-150x150|format-webp",
+    "fill-150x150",
+    "original|format-webp",
+)
+
+
 def validate_mp3_file(value):
     """Validate that the uploaded file is an MP3."""
     if not value:
@@ -48,7 +61,7 @@ def validate_mp3_file(value):
             value.seek(current_pos)
 
 
-class PodcastIndexPage(Page):
+class PodcastIndexPage(CachedPageMixin, Page):
     """Landing page for the podcast."""
 
     intro = RichTextField(blank=True)
@@ -69,7 +82,39 @@ class PodcastIndexPage(Page):
     subpage_types = ["podcast.PodcastEpisodePage"]
 
 
-class PodcastEpisodePage(Page):
+class PodcastEpisodePageForm(WagtailAdminPageForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.schedules_future_episodes():
+            self.fields["publication_date"].help_text = (
+                "When the episode was or should be published. Publishing an "
+                "episode dated in the future schedules it to go live then, "
+                "unless a go-live time is set under Publishing"
+            )
+
+    def schedules_future_episodes(self):
+        return (
+            settings.PODCAST_SCHEDULE_FUTURE_EPISODES
+            and "publication_date" in self.fields
+            and "go_live_at" in self.fields
+        )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # An episode dated in the future is released at that time, unless the
+        # editor chose another go-live time
+        publication_date = cleaned_data.get("publication_date")
+        if (
+            self.schedules_future_episodes()
+            and not cleaned_data.get("go_live_at")
+            and publication_date
+            and publication_date > timezone.now()
+        ):
+            cleaned_data["go_live_at"] = publication_date
+        return cleaned_data
+
+
+class PodcastEpisodePage(CachedPageMixin, Page):
     # Episode_number is the unique identifier
     episode_number = models.IntegerField(
         validators=[MinValueValidator(1)],
@@ -121,7 +166,9 @@ class PodcastEpisodePage(Page):
         help_text="Unique identifier (will be generated automatically if blank)",
     )
 
-    # Search settings
+    # Search settings. Saves queue the episode for indexing in batches rather
+    # than re-indexing it on the spot (see podcast/indexing.py)
+    search_auto_update = False
     search_fields = Page.search_fields + [
         index.SearchField("title"),
         index.SearchField("description"),
@@ -148,15 +195,32 @@ class PodcastEpisodePage(Page):
         FieldPanel("explicit_content"),
     ]
 
+    base_form_class = PodcastEpisodePageForm
+
     # Parent page / subpage type rules
     parent_page_types = ["podcast.PodcastIndexPage"]
     subpage_types = []
 
+    class Meta:
+        constraints = [
+            # Also serve the episode lookups and the index page's ordering
+            models.UniqueConstraint(
+                fields=["episode_number"], name="podcast_episode_number_unique"
+            ),
+        ]
+        indexes = [
+            # Not unique: generated guids only carry the publication date
+            models.Index(fields=["guid"], name="podcast_episode_guid_idx"),
+            # Feed ordering; page_ptr lets the join to the page table use the index alone
+            models.Index(
+                fields=["-publication_date", "page_ptr"],
+                name="podcast_episode_pubdate_idx",
+            ),
+        ]
+
     @cached_property
     def audio_url(self):
         """Return the full URL to the audio file."""
-        from django.conf import settings
-
         return f"{settings.MEDIA_URL}{self.audio_file}"
 
     def save(self, *args, **kwargs):
@@ -186,6 +250,18 @@ class PodcastEpisodePage(Page):
         super().save(*args, **kwargs)
 
 
+class PendingSearchUpdate(models.Model):
+    """An episode saved since it was last added to the search index."""
+
+    episode = models.OneToOneField(
+        PodcastEpisodePage, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    queued_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["queued_at"], name="podcast_pending_search_idx")]
+
+
 # Optional: Add links as a separate model if needed
 class PodcastLink(Orderable):
     """External platform links for the podcast (e.g., Spotify, Apple Podcasts)."""
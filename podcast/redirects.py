@@ -0,0 +1,126 @@
+"""
+Redirect lookups from a per-process table instead of the database.
+
+Bots probe old URLs (``/episodes/196.html``, ``/feed.rss``, ``/wp-admin``)
+all day, and Wagtail's ``RedirectMiddleware`` queries the redirects table for
+every one of those 404s. ``RedirectMiddleware`` here answers them from a dict
+of every redirect, loaded once per redirects version. That version is kept
+apart from the artifacts' so that publishing doesn't reload the table and
+editing a redirect doesn't drop the cached pages. Saving or deleting a
+redirect bumps it (see ``podcast.signals``), as do pages being moved, renamed
+or deleted, which changes the links of redirects to them.
+"""
+
+import threading
+import time
+from urllib.parse import urlparse
+
+from django import http
+from django.core.cache import cache
+from django.utils.encoding import uri_to_iri
+from wagtail.contrib.redirects import middleware
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.models import Site
+
+from podcast.routers import use_primary
+
+VERSION_KEY = "podcast:redirects:version"
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Make every process reload its redirect table."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+class RedirectTable:
+    """``old_path -> {site_id: (link, is_permanent)}`` for every redirect."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.entries = {}
+
+    def load(self):
+        entries = {}
+        with use_primary():
+            redirects = Redirect.objects.select_related("redirect_page")
+            for redirect in redirects:
+                link = redirect.link
+                if link is not None:
+                    entries.setdefault(redirect.old_path, {})[redirect.site_id] = (
+                        link,
+                        redirect.is_permanent,
+                    )
+        return entries
+
+    def get_entries(self):
+        version = get_version()
+        if self.version != version:
+            with self.lock:
+                if self.version != version:
+                    self.entries = self.load()
+                    self.version = version
+        return self.entries
+
+    def find(self, site_id, path):
+        """
+        Return ``(link, is_permanent)`` for ``path``, or ``None``. Like Wagtail,
+        a request that matches no site (``site_id=None``) can follow the
+        redirects of any site.
+        """
+        if "\0" in path:
+            return None
+        entries = self.get_entries()
+        for candidate in (path, uri_to_iri(path)):
+            sites = entries.get(candidate)
+            if not sites:
+                continue
+            if site_id is not None:
+                # A site-specific redirect wins over one for all sites
+                entry = sites.get(site_id) or sites.get(None)
+            elif None in sites or len(sites) == 1:
+                entry = sites.get(None) or next(iter(sites.values()))
+            else:
+                # Ambiguous between sites, which Wagtail doesn't answer either
+                entry = None
+            if entry is not None:
+                return entry
+        return None
+
+
+redirect_table = RedirectTable()
+
+
+class RedirectMiddleware(middleware.RedirectMiddleware):
+    """Wagtail's redirect middleware, answered from ``redirect_table``."""
+
+    def process_response(self, request, response):
+        if response.status_code != 404:
+            return response
+
+        site = Site.find_for_request(request)
+        site_id = site.pk if site else None
+        path = Redirect.normalise_path(request.get_full_path())
+        entry = redirect_table.find(site_id, path)
+        if entry is None:
+            path_without_query = urlparse(path).path
+            if path != path_without_query:
+                entry = redirect_table.find(site_id, path_without_query)
+        if entry is None:
+            return response
+
+        link, is_permanent = entry
+        if is_permanent:
+            return http.HttpResponsePermanentRedirect(link)
+        return http.HttpResponseRedirect(link)
@@ -0,0 +1,232 @@
+"""
+Scheduled episode releases.
+
+When an editor schedules an episode revision (a "go live" date in the future,
+which the episode form fills in from a future publication date), two tasks are
+queued with django-tasks:
+
+``prepare_release`` runs ``PODCAST_RELEASE_LEAD`` seconds before the go-live
+time. It generates the cover renditions, then renders the feeds, the home and
+index pages and the episode page as they will look once it's out, each inside
+a transaction that makes the episode live and is then rolled back. Those
+artifacts are stored under a new cache version that nothing reads yet. On
+SQLite a write transaction holds the database's write lock, so editors saving
+meanwhile wait for the page being rendered, which is well within the busy
+timeout, rather than for the whole release.
+
+``publish_release`` runs at the go-live time. It publishes the revision and,
+when nothing else changed since the release was prepared, activates the
+prepared version once it's committed, so the new feed and pages appear
+together and the first requests find them already built. Otherwise the
+publish invalidates the cache as usual. Either way it reports how long after
+the scheduled time the new feed was available.
+
+Deferred tasks need a backend that supports them (``TASKS_DATABASE=True`` and
+``manage.py db_worker``), and the prepared artifacts need a cache shared with
+the web servers (``CACHE_URL``). Without a deferring backend, Wagtail's
+``publish_scheduled`` command still publishes scheduled episodes.
+"""
+
+import datetime
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.core.handlers.base import BaseHandler
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from django_tasks import default_task_backend, task
+from wagtail.models import Revision, Site
+
+from podcast import cache
+from podcast.invalidation import bus
+from podcast.models import COVER_RENDITIONS, PodcastEpisodePage, PodcastIndexPage
+from podcast.routers import PIN_COOKIE
+
+logger = logging.getLogger(__name__)
+
+PREPARED_KEY = "podcast:release:{revision_id}"
+# Set once the tasks releasing a revision at a go-live time are queued
+QUEUED_KEY = "podcast:release:{revision_id}:{go_live_at}:queued"
+REPORTS_KEY = "podcast:release:reports"
+
+# Number of release reports kept for ``manage.py releases``
+REPORTS_KEPT = 20
+
+
+def is_episode_revision(revision):
+    model = revision.content_type.model_class()
+    return model is not None and issubclass(model, PodcastEpisodePage)
+
+
+def scheduled_revisions():
+    """Episode revisions waiting for their go-live time, soonest first."""
+    return [
+        revision
+        for revision in Revision.objects.filter(approved_go_live_at__isnull=False)
+        .select_related("content_type")
+        .order_by("approved_go_live_at")
+        if is_episode_revision(revision)
+    ]
+
+
+def schedule_release(revision, force=False):
+    """
+    Queue the tasks preparing and publishing a scheduled episode revision,
+    unless they're already queued for its go-live time (or ``force``).
+    Return ``False`` when the task backend can't run tasks at a set time.
+    """
+    if not default_task_backend.supports_defer:
+        logger.info(
+            "Not scheduling revision %s: the %s task backend can't defer tasks",
+            revision.pk,
+            type(default_task_backend).__name__,
+        )
+        return False
+    go_live_at = revision.approved_go_live_at
+    # Saving the revision again doesn't queue another staged render
+    queued_key = QUEUED_KEY.format(
+        revision_id=revision.pk, go_live_at=go_live_at.isoformat()
+    )
+    until_live = (go_live_at - timezone.now()).total_seconds()
+    if not django_cache.add(queued_key, True, max(until_live, 0) + 60) and not force:
+        return True
+    lead = datetime.timedelta(seconds=settings.PODCAST_RELEASE_LEAD)
+    prepare_release.using(run_after=go_live_at - lead).enqueue(
+        revision.pk, go_live_at.isoformat()
+    )
+    publish_release.using(run_after=go_live_at).enqueue(
+        revision.pk, go_live_at.isoformat()
+    )
+    return True
+
+
+def is_still_scheduled(revision_id, go_live_at):
+    """Whether the revision is still due at ``go_live_at`` (an ISO timestamp)."""
+    revision = Revision.objects.filter(pk=revision_id).first()
+    if revision is None or revision.approved_go_live_at is None:
+        return None
+    if revision.approved_go_live_at != datetime.datetime.fromisoformat(go_live_at):
+        return None  # rescheduled, and queued again for the new time
+    return revision
+
+
+def release_urls(episode, site):
+    """The public URLs that change when ``episode`` goes live."""
+    urls = ["/feed.xml", "/", "/api/episodes/", episode.relative_url(site)]
+    for index in PodcastIndexPage.objects.live().public():
+        urls.append(index.relative_url(site))
+    return urls
+
+
+def render(urls, stage=None):
+    """
+    Render ``urls`` through the middleware in this process, storing their
+    artifacts. With ``stage``, each is rendered inside its own transaction,
+    rolled back afterwards, in which ``stage()`` has made its changes.
+    """
+    handler = BaseHandler()
+    handler.load_middleware()
+    factory = RequestFactory(
+        HTTP_HOST=settings.PODCAST_DOMAIN,
+        # Read everything from the primary, where the staged changes are
+        HTTP_COOKIE=f"{PIN_COOKIE}=release",
+    )
+    failures = []
+    for url in urls:
+        request = factory.get(url, secure=True)
+        if stage is None:
+            response = handler.get_response(request)
+        else:
+            with transaction.atomic():
+                stage()
+                response = handler.get_response(request)
+                transaction.set_rollback(True)
+        if response.status_code != 200:
+            failures.append((url, response.status_code))
+    return failures
+
+
+@task()
+def prepare_release(revision_id, go_live_at):
+    """Build the artifacts of the site as it will be once the revision is live."""
+    revision = is_still_scheduled(revision_id, go_live_at)
+    if revision is None:
+        return None
+
+    start = time.monotonic()
+    episode = revision.as_object()
+    if episode.cover_image:
+        episode.cover_image.get_renditions(*COVER_RENDITIONS)
+
+    def make_live():
+        episode.live = True
+        episode.has_unpublished_changes = False
+        episode.go_live_at = None
+        episode.live_revision = revision
+        episode.save(clean=False)
+
+    urls = release_urls(episode, Site.objects.get(is_default_site=True))
+    from_version = cache.get_version()
+    version = cache.new_version()
+    with cache.staging(version):
+        failures = render(urls, stage=make_live)
+
+    if failures:
+        logger.warning("Not preparing revision %s: %s", revision_id, failures)
+        return None
+    django_cache.set(
+        PREPARED_KEY.format(revision_id=revision_id),
+        {"version": version, "from_version": from_version},
+        settings.PODCAST_CACHE_TIMEOUT,
+    )
+    elapsed = time.monotonic() - start
+    logger.info("Prepared revision %s in %.2fs", revision_id, elapsed)
+    return elapsed
+
+
+@task()
+def publish_release(revision_id, go_live_at):
+    """Publish the revision and swap in its prepared artifacts."""
+    revision = is_still_scheduled(revision_id, go_live_at)
+    if revision is None:
+        return None
+
+    scheduled = revision.approved_go_live_at
+    started = timezone.now()
+    prepared = django_cache.get(PREPARED_KEY.format(revision_id=revision_id))
+    # Anything published or edited since, and the prepared build is stale
+    swap = prepared is not None and prepared["from_version"] == cache.get_version()
+    with bus.batch(), transaction.atomic():
+        revision.publish(log_action="wagtail.publish.scheduled")
+        if swap:
+            # Activating the prepared version stands in for the publish's
+            # invalidation, whose keys are collected on commit just before
+            transaction.on_commit(lambda: bus.flush_batch(prepared["version"]))
+    published = timezone.now()
+
+    # The feed is available once its artifact is built, which a swap has done
+    build_start = time.monotonic()
+    render(["/feed.xml"])
+    available = published + datetime.timedelta(seconds=time.monotonic() - build_start)
+
+    report = {
+        "revision": revision_id,
+        "title": revision.object_str,
+        "scheduled": scheduled.isoformat(),
+        "prepared": swap,
+        "start_delay": (started - scheduled).total_seconds(),
+        "publish_seconds": (published - started).total_seconds(),
+        "latency": (available - scheduled).total_seconds(),
+    }
+    reports = django_cache.get(REPORTS_KEY, [])
+    django_cache.set(REPORTS_KEY, [report, *reports][:REPORTS_KEPT], None)
+    logger.info(
+        "Released revision %s %.2fs after its scheduled time (%s)",
+        revision_id,
+        report["latency"],
+        "prepared" if swap else "not prepared",
+    )
+    return report
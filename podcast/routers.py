@@ -0,0 +1,115 @@
+"""
+Optional read/write splitting for public traffic.
+
+When ``DATABASE_REPLICA_URL`` is set, ``ReplicaMiddleware`` marks read-only
+requests to public views, and ``ReplicaRouter`` sends their reads to the
+``replica`` database. Everything else, including the admin, form posts and
+management commands such as ``migrate_podcast``, stays on the primary because
+the router only reads from the replica inside a marked request.
+
+A user who has just written something is pinned to the primary for a few
+seconds with a cookie, so they see their own changes despite replication lag.
+Cached artifacts are always built from the primary, so a publish can't leave a
+stale copy of the feed cached until the next invalidation.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+REPLICA_ALIAS = "replica"
+PIN_COOKIE = "podcast_primary"
+
+# Whether reads in the current context may go to the replica
+_use_replica = ContextVar("podcast_use_replica", default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def using_replica():
+    return _use_replica.get()
+
+
+@contextmanager
+def read_from_replica(enabled=True):
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def use_primary():
+    """Read from the primary for the duration of the block."""
+    return read_from_replica(False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return REPLICA_ALIAS
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema through replication
+        return db == "default"
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not replica_configured():
+            return self.get_response(request)
+
+        if request.method not in ("GET", "HEAD"):
+            return self.pin_to_primary(self.get_response(request))
+
+        with read_from_replica(self.is_public_read(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not replica_configured():
+            return await self.get_response(request)
+
+        if request.method not in ("GET", "HEAD"):
+            return self.pin_to_primary(await self.get_response(request))
+
+        with read_from_replica(self.is_public_read(request)):
+            return await self.get_response(request)
+
+    def pin_to_primary(self, response):
+        response.set_cookie(
+            PIN_COOKIE,
+            str(int(time.time())),
+            max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+            httponly=True,
+            samesite="Lax",
+        )
+        return response
+
+    def is_public_read(self, request):
+        if PIN_COOKIE in request.COOKIES:
+            return False
+        return not request.path.startswith(settings.DATABASE_PRIMARY_PATHS)
@@ -0,0 +1,138 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.models import COMMENTS_RELATION_NAME, Page, Revision
+from wagtail.search import index
+from wagtail.signals import (
+    page_published,
+    page_slug_changed,
+    page_unpublished,
+    post_page_move,
+)
+
+from podcast import indexing, releases
+from podcast.invalidation import bus
+from podcast.models import PodcastEpisodePage, PodcastSettings
+from podcast_cms.database import optimize_sqlite
+
+# When this process last ran PRAGMA optimize
+_last_sqlite_optimize = time.monotonic()
+
+
+def report_page_change(sender, instance, **kwargs):
+    """Queue the cached artifacts for invalidation after a page change."""
+    kind = "episode" if isinstance(instance, PodcastEpisodePage) else "page"
+    bus.report(f"{kind}:{instance.pk}")
+
+
+# What ``save_revision()`` writes to the page: only the draft has changed
+DRAFT_FIELDS = {
+    COMMENTS_RELATION_NAME,
+    "latest_revision_created_at",
+    "draft_title",
+    "latest_revision",
+    "has_unpublished_changes",
+}
+
+
+def report_episode_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Report an episode saved directly, e.g. by a bulk command. Saving a draft
+    or an episode that isn't live doesn't change the feeds, and publishing
+    and unpublishing report the episode themselves.
+    """
+    if instance.live and not (update_fields and set(update_fields) <= DRAFT_FIELDS):
+        bus.report(f"episode:{instance.pk}")
+    else:
+        bus.report(f"page:{instance.pk}")
+
+
+def report_settings_change(sender, instance, **kwargs):
+    bus.report("settings")
+
+
+def report_page_path_change(sender, instance, **kwargs):
+    """A page moved, renamed or deleted also changes the redirects to it."""
+    report_page_change(sender, instance, **kwargs)
+    bus.report("redirects")
+
+
+def report_redirect_change(sender, instance, **kwargs):
+    # The in-memory redirect tables reload on the next redirects version
+    bus.report(f"redirect:{instance.pk}")
+
+
+def queue_episode_indexing(sender, instance, **kwargs):
+    """Queue a saved episode for the next batch of search index updates."""
+    indexing.queue_episodes(instance.pk)
+
+
+def remove_episode_from_index(sender, instance, **kwargs):
+    index.remove_object(instance)
+
+
+def schedule_episode_release(sender, instance, **kwargs):
+    """Queue the release tasks of an episode revision scheduled to go live."""
+    if instance.approved_go_live_at and releases.is_episode_revision(instance):
+        transaction.on_commit(lambda: releases.schedule_release(instance))
+
+
+def optimize_sqlite_periodically(sender, connection, **kwargs):
+    """Keep SQLite's planner statistics fresh without needing a cron job."""
+    global _last_sqlite_optimize
+
+    if connection.vendor != "sqlite":
+        return
+    now = time.monotonic()
+    if now - _last_sqlite_optimize < settings.SQLITE_OPTIMIZE_INTERVAL:
+        return
+    _last_sqlite_optimize = now
+    optimize_sqlite(connection)
+
+
+def register_signal_handlers():
+    page_published.connect(report_page_change, dispatch_uid="podcast_page_published")
+    page_unpublished.connect(report_page_change, dispatch_uid="podcast_page_unpublished")
+    post_page_move.connect(report_page_path_change, dispatch_uid="podcast_page_moved")
+    page_slug_changed.connect(
+        report_page_path_change, dispatch_uid="podcast_page_slug_changed"
+    )
+    post_delete.connect(
+        report_page_path_change, sender=Page, dispatch_uid="podcast_page_deleted"
+    )
+    # Bulk commands save live episodes directly, without publishing a revision
+    post_save.connect(
+        report_episode_save, sender=PodcastEpisodePage, dispatch_uid="podcast_episode_saved"
+    )
+    post_save.connect(
+        report_settings_change,
+        sender=PodcastSettings,
+        dispatch_uid="podcast_settings_saved",
+    )
+    post_save.connect(
+        report_redirect_change, sender=Redirect, dispatch_uid="podcast_redirect_saved"
+    )
+    post_delete.connect(
+        report_redirect_change, sender=Redirect, dispatch_uid="podcast_redirect_deleted"
+    )
+    # Episodes opt out of Wagtail's indexing on save (search_auto_update)
+    post_save.connect(
+        queue_episode_indexing,
+        sender=PodcastEpisodePage,
+        dispatch_uid="podcast_episode_index_queued",
+    )
+    post_delete.connect(
+        remove_episode_from_index,
+        sender=PodcastEpisodePage,
+        dispatch_uid="podcast_episode_index_removed",
+    )
+    post_save.connect(
+        schedule_episode_release, sender=Revision, dispatch_uid="podcast_release_scheduled"
+    )
+    connection_created.connect(
+        optimize_sqlite_periodically, dispatch_uid="podcast_sqlite_optimize"
+    )
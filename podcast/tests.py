@@ -1,3 +1,1525 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+import requests
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.base import BaseHandler
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_tasks import default_task_backend
+from PIL import Image as PILImage
+from wagtail import hooks
+from wagtail.contrib.redirects.models import Redirect
+from wagtail.images import get_image_model
+from wagtail.models import Page, PageViewRestriction, Site
+from wagtail.search.models import IndexEntry
+
+from home.models import AboutPage
+from podcast import cache as cache_module
+from podcast import redirects as redirects_module
+from podcast.cache import accepted_encodings, get_artifact, page_artifact_name
+from podcast.indexing import update_search_index
+from podcast.instrumentation import connection_stats, install_hook_profiler
+from podcast.invalidation import InvalidationBus, bus
+from podcast.loadtest import AUDIO_RANGE, Results, parse_access_log, percentile
+from podcast.management.commands import build_static_site
+from podcast.management.commands.profile_imports import parse_importtime
+from podcast.middleware import is_fast_path
+from podcast.redirects import redirect_table
+from podcast.models import (
+    COVER_RENDITIONS,
+    PendingSearchUpdate,
+    PodcastEpisodePage,
+    PodcastIndexPage,
+    PodcastSettings,
+)
+from podcast.releases import prepare_release, publish_release
+from podcast.routers import (
+    PIN_COOKIE,
+    ReplicaMiddleware,
+    ReplicaRouter,
+    read_from_replica,
+    use_primary,
+)
+from podcast.views import AsyncAudioView, AsyncPodcastFeedView, parse_range
+from podcast.websub import LocalHub, feed_urls, notify_hub, ping_hub
+from podcast_cms.database import configure_connections, configure_sqlite
+from podcast_cms.startup import worker_pool
+
+
+class PodcastTestCase(TestCase):
+    """Sets up a home page with a podcast index, ready for episodes."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        # Templates reference static files that only exist after collectstatic.
+        # A configured read replica can't see the test transaction, so every
+        # query goes to the primary.
+        storage_override = override_settings(
+            DATABASE_ROUTERS=[],
+            MEDIA_ROOT=media_root,
+            STORAGES={
+                "default": {
+                    "BACKEND": "django.core.files.storage.FileSystemStorage",
+                },
+                "staticfiles": {
+                    "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+                },
+            },
+        )
+        storage_override.enable()
+        self.addCleanup(storage_override.disable)
+
+        cache.clear()
+        self.cover_image = self.create_image()
+        self.home = Page.objects.get(slug="home")
+        self.index = PodcastIndexPage(title="Episodes", slug="episodes")
+        self.home.add_child(instance=self.index)
+        self.index.save_revision().publish()
+
+    def create_image(self, title="Cover"):
+        buffer = BytesIO()
+        PILImage.new("RGB", (16, 16), "darkgreen").save(buffer, "PNG")
+        return get_image_model().objects.create(
+            title=title, file=SimpleUploadedFile("cover.png", buffer.getvalue())
+        )
+
+    def create_episode(self, number, **kwargs):
+        kwargs.setdefault("cover_image", self.cover_image)
+        kwargs.setdefault("season_episode_number", number)
+        kwargs.setdefault(
+            "publication_date",
+            datetime.datetime(2025, 1, 3, 17, 30, tzinfo=datetime.timezone.utc)
+            + datetime.timedelta(weeks=number),
+        )
+        episode = PodcastEpisodePage(
+            title=f"Episode {number}",
+            episode_number=number,
+            description=f"<p>Episode {number} description</p>",
+            audio_file=SimpleUploadedFile(
+                f"{number:03d}.mp3", b"ID3" + bytes(125), content_type="audio/mpeg"
+            ),
+            duration_in_seconds=840,
+            **kwargs,
+        )
+        with self.committed():
+            self.index.add_child(instance=episode)
+        return episode
+
+    @contextmanager
+    def committed(self):
+        """Commit the block's changes and flush their invalidations, as a request would."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            with bus.batch(), self.captureOnCommitCallbacks(execute=True) as executed:
+                yield
+        # Then those of the flush itself, such as queueing a hub ping
+        for callback in callbacks[len(executed) :]:
+            callback()
+
+
+class AcceptEncodingTests(TestCase):
+    def test_parses_quality_values(self):
+        self.assertEqual(
+            accepted_encodings("gzip;q=1.0, br; q=0.8, identity;q=0"),
+            {"gzip", "br"},
+        )
+
+    def test_empty_header(self):
+        self.assertEqual(accepted_encodings(""), set())
+
+
+class CompressedFeedTests(PodcastTestCase):
+    def test_feed_served_gzipped_when_accepted(self):
+        for number in range(1, 4):
+            self.create_episode(number)
+
+        plain = self.client.get("/feed.xml")
+        compressed = self.client.get("/feed.xml", HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", compressed["Vary"])
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+
+    def test_publishing_invalidates_feed(self):
+        self.create_episode(1)
+        self.assertNotIn(b"Episode 2", self.client.get("/feed.xml").content)
+
+        self.create_episode(2)
+        self.assertIn(b"Episode 2", self.client.get("/feed.xml").content)
+
+
+class JSONFeedTests(PodcastTestCase):
+    def test_json_feed_built_with_rss_feed(self):
+        self.create_episode(1, explicit_content=True)
+        # Creating the settings on first use would invalidate the feeds
+        PodcastSettings.for_site(Site.objects.get(is_default_site=True))
+        self.client.get("/feed.xml")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/feed.json")
+
+        self.assertFalse(
+            [q for q in queries.captured_queries if "podcastepisodepage" in q["sql"]]
+        )
+        self.assertEqual(response["Content-Type"], "application/feed+json; charset=utf-8")
+        feed = response.json()
+        self.assertEqual(feed["version"], "https://jsonfeed.org/version/1.1")
+        self.assertTrue(feed["feed_url"].endswith("/feed.json"))
+        [item] = feed["items"]
+        self.assertEqual(item["title"], "Episode 1")
+        self.assertTrue(item["_itunes"]["explicit"])
+        [attachment] = item["attachments"]
+        self.assertEqual(attachment["mime_type"], "audio/mpeg")
+        self.assertEqual(attachment["duration_in_seconds"], 840)
+
+    def test_conditional_get_and_invalidation(self):
+        self.create_episode(1)
+        etag = self.client.get("/feed.json")["ETag"]
+
+        self.assertEqual(
+            self.client.get("/feed.json", HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        self.create_episode(2)
+        response = self.client.get("/feed.json", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["items"]), 2)
+
+    def test_episode_without_season_episode_number(self):
+        self.create_episode(1, season_episode_number=None)
+
+        self.assertEqual(self.client.get("/feed.xml").status_code, 200)
+        [item] = self.client.get("/feed.json").json()["items"]
+        self.assertEqual(item["_itunes"], {"season": 1, "explicit": False})
+
+
+class CachedPageTests(PodcastTestCase):
+    def test_index_page_rendered_once(self):
+        self.create_episode(1)
+        self.client.get("/episodes/")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/episodes/", HTTP_ACCEPT_ENCODING="gzip")
+
+        # Routing still happens, but the episode listing isn't queried again
+        self.assertFalse(
+            [q for q in queries.captured_queries if "podcastepisodepage" in q["sql"]]
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn(b"Episode 1", gzip.decompress(response.content))
+
+    def test_home_page_shares_index_rendering(self):
+        self.create_episode(1)
+        index_response = self.client.get("/episodes/")
+        self.client.get("/")
+
+        with CaptureQueriesContext(connection) as queries:
+            home_response = self.client.get("/")
+
+        self.assertEqual(home_response.content, index_response.content)
+        self.assertFalse(
+            [q for q in queries.captured_queries if "podcastindexpage" in q["sql"]]
+        )
+
+
+class AdminTests(PodcastTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_superuser(
+            "editor", "editor@example.com", "password"
+        )
+        self.client.force_login(self.user)
+
+    def test_add_episode_menu_item_points_at_index(self):
+        response = self.client.get("/admin/")
+
+        self.assertContains(
+            response, f"/admin/pages/add/podcast/podcastepisodepage/{self.index.pk}/"
+        )
+
+    @override_settings(PODCAST_ADMIN_PROFILING=True)
+    def test_hook_profiling_panel(self):
+        get_hooks = hooks.get_hooks
+        uninstall = install_hook_profiler()
+        self.addCleanup(uninstall)
+
+        response = self.client.get("/admin/")
+
+        self.assertContains(response, 'id="podcast-hook-profile"')
+        self.assertContains(response, "construct_homepage_summary_items")
+        uninstall()
+        self.assertIs(hooks.get_hooks, get_hooks)
+
+
+class PerformanceMiddlewareTests(PodcastTestCase):
+    @override_settings(PODCAST_SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        response = self.client.get("/feed.xml")
+
+        self.assertIn("total;dur=", response["Server-Timing"])
+        self.assertIn('cache;desc="0 hits, 1 misses"', response["Server-Timing"])
+
+    @override_settings(PODCAST_SERVER_TIMING=False)
+    def test_server_timing_header_off(self):
+        self.assertNotIn("Server-Timing", self.client.get("/feed.xml"))
+
+    @override_settings(PODCAST_METRICS_TOKEN="secret")
+    def test_metrics_endpoint_requires_token(self):
+        self.client.get("/feed.xml")
+
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        response = self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(response.json()["views"]["podcast_feed"]["requests"], 1)
+
+
+class QueryPlanTests(PodcastTestCase):
+    """The hot episode queries must be answered from an index, without sorting."""
+
+    def setUp(self):
+        super().setUp()
+        for number in range(1, 6):
+            self.create_episode(number)
+
+    def explain(self, queryset):
+        if connection.vendor == "postgresql":
+            # With a handful of rows PostgreSQL would rightly prefer a sequential scan
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset):
+        plan = self.explain(queryset)
+        if connection.vendor == "sqlite":
+            episode_steps = [
+                line for line in plan.splitlines() if "podcast_podcastepisodepage" in line
+            ]
+            self.assertTrue(episode_steps, plan)
+            for line in episode_steps:
+                self.assertIn("USING", line, plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+        elif connection.vendor == "postgresql":
+            self.assertRegex(plan, r"Index (Only )?Scan[^\n]*podcast_")
+            self.assertNotIn("Sort", plan)
+        else:
+            self.skipTest(f"No query plan checks for {connection.vendor}")
+
+    def test_lookup_by_guid(self):
+        # As migrate_podcast checks it, without the page tree ordering
+        self.assertUsesIndex(
+            PodcastEpisodePage.objects.filter(guid="itm20250110").order_by()
+        )
+
+    def test_episodes_on_the_same_date_share_a_guid(self):
+        published = PodcastEpisodePage.objects.get(episode_number=1).publication_date
+
+        episode = self.create_episode(6, publication_date=published)
+
+        self.assertEqual(episode.guid, f"itm{published:%Y%m%d}")
+        self.assertEqual(PodcastEpisodePage.objects.filter(guid=episode.guid).count(), 2)
+
+    def test_lookup_by_episode_number(self):
+        self.assertUsesIndex(PodcastEpisodePage.objects.filter(episode_number=3))
+
+    def test_index_page_ordering(self):
+        self.assertUsesIndex(
+            PodcastEpisodePage.objects.live().order_by("-episode_number")
+        )
+
+    def test_feed_ordering(self):
+        self.assertUsesIndex(
+            PodcastEpisodePage.objects.live().public().order_by("-publication_date")
+        )
+
+
+class SQLiteConfigurationTests(TestCase):
+    def test_configure_sqlite(self):
+        database = configure_sqlite(
+            {"ENGINE": "django.db.backends.sqlite3", "NAME": "db.sqlite3"},
+            pragmas={"busy_timeout": 2000},
+        )
+
+        self.assertIn("PRAGMA journal_mode=WAL;", database["OPTIONS"]["init_command"])
+        self.assertIn("PRAGMA busy_timeout=2000;", database["OPTIONS"]["init_command"])
+        self.assertEqual(database["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        self.assertEqual(database["OPTIONS"]["timeout"], 2)
+
+    def test_explicit_options_win(self):
+        database = configure_sqlite(
+            {"ENGINE": "django.db.backends.sqlite3", "OPTIONS": {"timeout": 30}}
+        )
+
+        self.assertEqual(database["OPTIONS"]["timeout"], 30)
+
+
+class ConnectionConfigurationTests(TestCase):
+    def test_persistent_connections(self):
+        database = configure_connections(
+            {"ENGINE": "django.db.backends.sqlite3"}, max_age=60, health_checks=True
+        )
+
+        self.assertEqual(database["CONN_MAX_AGE"], 60)
+        self.assertTrue(database["CONN_HEALTH_CHECKS"])
+
+    def test_pool_replaces_persistent_connections(self):
+        database = configure_connections(
+            {"ENGINE": "django.db.backends.postgresql"},
+            max_age=60,
+            pool={"min_size": 2, "max_size": 4},
+        )
+
+        self.assertEqual(database["CONN_MAX_AGE"], 0)
+        self.assertEqual(database["OPTIONS"]["pool"], {"min_size": 2, "max_size": 4})
+
+    def test_pool_needs_postgresql(self):
+        with self.assertRaises(ValueError):
+            configure_connections(
+                {"ENGINE": "django.db.backends.sqlite3"}, pool={"max_size": 4}
+            )
+
+    def test_pool_statistics(self):
+        # Stands in for a psycopg_pool ConnectionPool
+        pool = mock.Mock()
+        pool.get_stats.return_value = {"pool_size": 2, "pool_available": 1}
+        connection = mock.Mock(
+            vendor="postgresql",
+            settings_dict={
+                "CONN_MAX_AGE": 0,
+                "CONN_HEALTH_CHECKS": True,
+                "OPTIONS": {"pool": {"max_size": 4}},
+            },
+            pool=pool,
+        )
+
+        stats = connection_stats(connection)
+
+        self.assertEqual(stats["pool"], {"pool_size": 2, "pool_available": 1})
+        self.assertTrue(stats["health_checks"])
+
+
+@mock.patch("podcast.routers.replica_configured", return_value=True)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def serve(self, request):
+        seen = {}
+
+        def view(request):
+            seen["db"] = self.router.db_for_read(Page)
+            return HttpResponse()
+
+        response = ReplicaMiddleware(view)(request)
+        return seen["db"], response
+
+    def test_public_reads_use_replica(self, configured):
+        db, _ = self.serve(self.factory.get("/feed.xml"))
+
+        self.assertEqual(db, "replica")
+        # Outside a request (e.g. management commands) reads stay on the primary
+        self.assertEqual(self.router.db_for_read(Page), "default")
+
+    def test_admin_reads_use_primary(self, configured):
+        db, _ = self.serve(self.factory.get("/admin/pages/"))
+
+        self.assertEqual(db, "default")
+
+    def test_writes_pin_user_to_primary(self, configured):
+        db, response = self.serve(self.factory.post("/contact/"))
+        self.assertEqual(db, "default")
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        request = self.factory.get("/episodes/")
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        db, _ = self.serve(request)
+        self.assertEqual(db, "default")
+
+    def test_writes_and_migrations_use_primary(self, configured):
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_write(Page), "default")
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Page), "default")
+        self.assertFalse(self.router.allow_migrate("replica", "podcast"))
+
+
+# Requests a page anonymously, then pinned to the primary, in a process whose
+# primary and replica are separate SQLite files
+TWO_DATABASES_SCRIPT = """
+import json
+from django.db import connections
+from django.test import Client
+from django.test.utils import setup_test_environment
+from podcast.routers import PIN_COOKIE
+
+setup_test_environment()
+client = Client()
+status = {"anonymous": client.get("/about/").status_code}
+client.cookies[PIN_COOKIE] = "1"
+status["pinned"] = client.get("/about/").status_code
+status["databases"] = sorted(connections.settings)
+print(json.dumps(status))
+"""
+
+
+@skipUnless(connection.vendor == "sqlite", "copies the SQLite test database")
+class TwoDatabaseReplicaTests(PodcastTestCase):
+    def copy_database(self, path):
+        # Serialized, as a backup would wait for the test's transaction to end
+        database = sqlite3.connect(":memory:")
+        database.deserialize(connection.connection.serialize())
+        target = sqlite3.connect(path)
+        try:
+            database.backup(target)
+        finally:
+            target.close()
+            database.close()
+
+    def test_reads_follow_the_replica_until_pinned(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        replica = os.path.join(directory, "replica.sqlite3")
+        primary = os.path.join(directory, "primary.sqlite3")
+        # The replica hasn't caught up with the new page yet
+        self.copy_database(replica)
+        self.home.add_child(instance=AboutPage(title="About", slug="about"))
+        self.copy_database(primary)
+
+        env = {
+            **os.environ,
+            "DEBUG": "True",
+            "DATABASE_URL": f"sqlite:///{primary}",
+            "DATABASE_REPLICA_URL": f"sqlite:///{replica}",
+        }
+        result = subprocess.run(
+            [sys.executable, "manage.py", "shell", "-c", TWO_DATABASES_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        status = json.loads(result.stdout.splitlines()[-1])
+        self.assertEqual(status["databases"], ["default", "replica"])
+        self.assertEqual(status["anonymous"], 404)
+        self.assertEqual(status["pinned"], 200)
+
+
+class RangeParsingTests(TestCase):
+    def test_ranges(self):
+        self.assertIsNone(parse_range(None, 1000))
+        self.assertIsNone(parse_range("items=0-10", 1000))
+        self.assertEqual(parse_range("bytes=0-99", 1000), (0, 99))
+        self.assertEqual(parse_range("bytes=900-", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=-100", 1000), (900, 999))
+        self.assertEqual(parse_range("bytes=500-5000", 1000), (500, 999))
+
+    def test_unsatisfiable_range(self):
+        with self.assertRaises(ValueError):
+            parse_range("bytes=1000-", 1000)
+
+
+class AsyncServingTests(PodcastTestCase):
+    def setUp(self):
+        super().setUp()
+        self.episode = self.create_episode(1)
+        self.audio_name = self.episode.audio_file.name.removeprefix("episodes/")
+        self.factory = AsyncRequestFactory()
+
+    async def test_async_feed(self):
+        request = self.factory.get("/feed.xml", headers={"Accept-Encoding": "gzip"})
+
+        response = await AsyncPodcastFeedView.as_view()(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Episode 1", gzip.decompress(response.content))
+
+    async def test_async_audio_range(self):
+        request = self.factory.get("/", headers={"Range": "bytes=0-2"})
+
+        response = await AsyncAudioView.as_view()(request, filename=self.audio_name)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 0-2/128")
+        self.assertEqual(content, b"ID3")
+
+    async def test_slow_read_does_not_hold_up_other_streams(self):
+        reading, release = threading.Event(), threading.Event()
+        open_file = default_storage.open
+
+        class SlowFile:
+            def __init__(self, f):
+                self.f = f
+
+            def __getattr__(self, name):
+                return getattr(self.f, name)
+
+            def read(self, size):
+                reading.set()
+                release.wait(5)
+                return self.f.read(size)
+
+        def open_slow_first(name, mode="rb"):
+            f = open_file(name, mode)
+            return f if reading.is_set() else SlowFile(f)
+
+        async def download():
+            request = self.factory.get("/")
+            response = await AsyncAudioView.as_view()(request, filename=self.audio_name)
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        with mock.patch.object(default_storage, "open", side_effect=open_slow_first):
+            slow = asyncio.create_task(download())
+            try:
+                while not (reading.is_set() or slow.done()):
+                    await asyncio.sleep(0.01)
+                fast = await asyncio.wait_for(download(), timeout=2)
+            finally:
+                release.set()
+            self.assertEqual(await slow, fast)
+
+        self.assertEqual(len(fast), 128)
+
+    def test_audio_range(self):
+        response = self.client.get(
+            f"/media/episodes/{self.audio_name}", HTTP_RANGE="bytes=-3"
+        )
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Length"], "3")
+        self.assertEqual(b"".join(response.streaming_content), bytes(3))
+        self.assertEqual(
+            self.client.get(
+                f"/media/episodes/{self.audio_name}", HTTP_RANGE="bytes=500-"
+            ).status_code,
+            416,
+        )
+
+    @override_settings(PODCAST_SERVER_TIMING=True)
+    async def test_middleware_runs_on_the_event_loop(self):
+        response = await self.async_client.get("/feed.xml")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('cache;desc="0 hits, 1 misses"', response["Server-Timing"])
+
+    @override_settings(PODCAST_SERVER_TIMING=True)
+    async def test_queries_in_worker_threads_counted(self):
+        response = await self.async_client.get("/feed.xml")
+
+        # The feed is built by the ORM in a sync_to_async thread
+        self.assertNotIn('desc="0 queries"', response["Server-Timing"])
+        self.assertRegex(response["Server-Timing"], r'db;dur=[\d.]+;desc="\d+ queries"')
+
+
+class PublicFastPathTests(PodcastTestCase):
+    def test_anonymous_public_request_skips_session_and_auth(self):
+        response = self.client.get("/feed.xml")
+
+        self.assertTrue(response.wsgi_request.podcast_fast_path)
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    def test_session_cookie_takes_full_path(self):
+        user = get_user_model().objects.create_superuser(
+            "editor", "editor@example.com", "password"
+        )
+        self.client.force_login(user)
+
+        response = self.client.get("/episodes/")
+
+        self.assertFalse(is_fast_path(response.wsgi_request))
+        self.assertEqual(response.wsgi_request.user, user)
+
+    def test_admin_takes_full_path(self):
+        response = self.client.get("/admin/login/")
+
+        self.assertFalse(is_fast_path(response.wsgi_request))
+        self.assertIn("csrftoken", response.cookies)
+
+
+class RedirectTests(PodcastTestCase):
+    def test_redirect_served_without_querying_redirects(self):
+        Redirect.add_redirect("/feed.rss", "/feed.xml")
+        self.client.get("/feed.rss")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/feed.rss")
+
+        self.assertRedirects(response, "/feed.xml", status_code=301)
+        self.assertFalse(
+            [q for q in queries.captured_queries if "wagtailredirects" in q["sql"]]
+        )
+
+    def test_editing_a_redirect_reloads_the_table(self):
+        redirect = Redirect.add_redirect("/wp-login.php", "/")
+        self.assertEqual(self.client.get("/wp-login.php").status_code, 301)
+        version = cache_module.get_version()
+
+        with self.committed():
+            redirect.delete()
+
+        self.assertEqual(self.client.get("/wp-login.php").status_code, 404)
+        # The cached pages and feeds are kept
+        self.assertEqual(cache_module.get_version(), version)
+
+    def test_publishing_keeps_the_table(self):
+        Redirect.add_redirect("/feed.rss", "/feed.xml")
+        version = redirects_module.get_version()
+
+        self.create_episode(1)
+
+        self.assertEqual(redirects_module.get_version(), version)
+
+    def test_renaming_a_page_reloads_the_table(self):
+        with self.committed():
+            Redirect.add_redirect("/archive/", redirect_to=self.index)
+        self.assertRedirects(
+            self.client.get("/archive/"),
+            "/episodes/",
+            status_code=301,
+            fetch_redirect_response=False,
+        )
+
+        with self.committed():
+            self.index.slug = "shows"
+            self.index.save_revision().publish()
+
+        self.assertRedirects(
+            self.client.get("/archive/"),
+            "/shows/",
+            status_code=301,
+            fetch_redirect_response=False,
+        )
+
+    def test_unknown_host_follows_redirects_of_any_site(self):
+        site = Site.objects.get(is_default_site=True)
+        Redirect.add_redirect("/feed.rss", "/feed.xml", site=site)
+        # Nothing answers for the test client's host any more
+        Site.objects.filter(pk=site.pk).update(is_default_site=False)
+        cache.clear()
+
+        response = self.client.get("/feed.rss")
+
+        self.assertRedirects(
+            response, "/feed.xml", status_code=301, fetch_redirect_response=False
+        )
+
+    def test_import_legacy_redirects_needs_a_site(self):
+        path = os.path.join(settings.MEDIA_ROOT, "redirects.csv")
+        with open(path, "w") as f:
+            f.write("/feed.rss /feed.xml\n")
+        Site.objects.all().delete()
+
+        with self.assertRaisesMessage(CommandError, "No site configured"):
+            call_command("import_legacy_redirects", path, stdout=StringIO())
+
+    def test_import_legacy_redirects(self):
+        episode = self.create_episode(196)
+        path = os.path.join(settings.MEDIA_ROOT, "redirects.csv")
+        with open(path, "w") as f:
+            f.write("# old,new\n/episodes/196.html,/episodes/196/\n/feed.rss /feed.xml\n")
+
+        call_command("import_legacy_redirects", path, stdout=StringIO())
+
+        redirect = Redirect.objects.get(old_path="/episodes/196.html")
+        self.assertEqual(redirect.redirect_page.pk, episode.pk)
+        self.assertRedirects(
+            self.client.get("/feed.rss"),
+            "/feed.xml",
+            status_code=301,
+            fetch_redirect_response=False,
+        )
+
+
+class EpisodeRoutingTests(PodcastTestCase):
+    def test_episode_found_by_number(self):
+        self.create_episode(7)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/episodes/007/")
+
+        self.assertContains(response, "Episode 7")
+        self.assertEqual(response.resolver_match.url_name, "podcast_episode")
+        # No slug-by-slug walk down from the site root
+        self.assertFalse(
+            [q for q in queries.captured_queries if '"slug" = ' in q["sql"]]
+        )
+
+    def test_view_restrictions_still_apply(self):
+        episode = self.create_episode(7)
+        PageViewRestriction.objects.create(
+            page=episode, restriction_type=PageViewRestriction.LOGIN
+        )
+
+        response = self.client.get("/episodes/007/")
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("login", response["Location"])
+
+    def test_serve_page_hooks_run(self):
+        episode = self.create_episode(7)
+        served = []
+
+        def before_serve_page(page, request, args, kwargs):
+            served.append(page)
+            return HttpResponse("Intercepted")
+
+        with hooks.register_temporarily("before_serve_page", before_serve_page):
+            response = self.client.get("/episodes/007/")
+
+        self.assertContains(response, "Intercepted")
+        self.assertEqual(served, [episode])
+
+    def test_unknown_episode_falls_back_to_wagtail(self):
+        self.assertEqual(self.client.get("/episodes/404/").status_code, 404)
+
+
+class IncrementalCollectStaticTests(SimpleTestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.static_root, ignore_errors=True)
+        self.write("site.css", "body { background: url('bg.svg'); }\n" * 20)
+        self.write("bg.svg", "<svg></svg>")
+        self.write("app.js", "console.log('podcast');\n" * 20)
+        settings_override = override_settings(
+            STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=[
+                "django.contrib.staticfiles.finders.FileSystemFinder"
+            ],
+            STATIC_ROOT=self.static_root,
+            STORAGES={
+                "default": {
+                    "BACKEND": "django.core.files.storage.FileSystemStorage",
+                },
+                "staticfiles": {
+                    "BACKEND": "podcast_cms.storage.IncrementalManifestStaticFilesStorage",
+                },
+            },
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write(self, name, content):
+        path = os.path.join(self.source, name)
+        with open(path, "w") as f:
+            f.write(content)
+        # As in a release exported by git archive: newer than anything collected
+        os.utime(path, (time.time() + 3600, time.time() + 3600))
+
+    def collect(self):
+        out = StringIO()
+        call_command("collectstatic", interactive=False, verbosity=1, stdout=out)
+        with open(os.path.join(self.static_root, "staticfiles.json")) as f:
+            return out.getvalue(), json.load(f)["paths"]
+
+    def test_unchanged_files_are_skipped(self):
+        _, manifest = self.collect()
+        self.write("app.js", "console.log('podcast');\n" * 20)
+
+        output, second_manifest = self.collect()
+
+        self.assertIn("0 static files copied", output)
+        self.assertIn("3 unmodified", output)
+        self.assertNotIn("post-processed", output)
+        self.assertEqual(second_manifest, manifest)
+
+    def test_changes_reprocess_files_and_their_dependents(self):
+        _, manifest = self.collect()
+        self.write("bg.svg", "<svg><rect/></svg>")
+
+        output, second_manifest = self.collect()
+
+        self.assertIn("1 static file copied", output)
+        self.assertNotEqual(second_manifest["bg.svg"], manifest["bg.svg"])
+        # The stylesheet refers to the new hashed image, the script is untouched
+        self.assertNotEqual(second_manifest["site.css"], manifest["site.css"])
+        self.assertEqual(second_manifest["app.js"], manifest["app.js"])
+        with open(os.path.join(self.static_root, second_manifest["site.css"])) as f:
+            self.assertIn(second_manifest["bg.svg"], f.read())
+
+    def test_hashed_files_are_precompressed(self):
+        _, manifest = self.collect()
+
+        with open(os.path.join(self.static_root, manifest["site.css"]), "rb") as f:
+            content = f.read()
+        gz_path = os.path.join(self.static_root, manifest["site.css"] + ".gz")
+        with open(gz_path, "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()), content)
+        # Too small to be worth compressing
+        self.assertFalse(
+            os.path.exists(os.path.join(self.static_root, manifest["bg.svg"] + ".gz"))
+        )
+
+
+class BuildStaticSiteTests(PodcastTestCase):
+    def setUp(self):
+        super().setUp()
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output, ignore_errors=True)
+        self.site = Site.objects.get(is_default_site=True)
+        self.episodes = [self.create_episode(number) for number in (1, 2)]
+
+    def build(self, **options):
+        options.setdefault("processes", 1)
+        stdout = StringIO()
+        call_command(
+            "build_static_site",
+            output=self.output,
+            skip_static=True,
+            stdout=stdout,
+            **options,
+        )
+        return stdout.getvalue()
+
+    def path(self, url):
+        return build_static_site.output_path(self.output, url)
+
+    def manifest(self):
+        with open(os.path.join(self.output, build_static_site.MANIFEST_NAME)) as f:
+            return json.load(f)["pages"]
+
+    def test_renders_site_and_manifest(self):
+        self.build()
+
+        episode_url = self.episodes[0].relative_url(self.site)
+        for url in ("/", "/feed.xml", "/feed.json", "/episodes/", episode_url):
+            self.assertTrue(os.path.exists(self.path(url)), url)
+        self.assertTrue(os.path.exists(self.path("/feed.xml") + ".gz"))
+        self.assertEqual(len(self.manifest()), 6)
+
+    def test_incremental_rebuilds_changed_pages(self):
+        self.build()
+        self.assertIn("0 of 6 pages need rendering", self.build(incremental=True))
+
+        with self.committed():
+            self.episodes[1].title = "Episode 2, retitled"
+            self.episodes[1].save_revision().publish()
+
+        # The episode and the listings showing it
+        self.assertIn("5 of 6 pages need rendering", self.build(incremental=True))
+        with open(self.path(self.episodes[1].relative_url(self.site)), "rb") as f:
+            self.assertIn(b"Episode 2, retitled", f.read())
+
+    def test_pages_no_longer_public_removed(self):
+        self.build()
+        episode_url = self.episodes[1].relative_url(self.site)
+
+        with self.committed():
+            self.episodes[1].unpublish()
+
+        self.assertIn(f"Removed {episode_url}", self.build(incremental=True))
+        self.assertFalse(os.path.exists(self.path(episode_url)))
+        self.assertFalse(os.path.exists(self.path(episode_url) + ".gz"))
+        self.assertNotIn(episode_url, self.manifest())
+
+    def test_failed_pages_retried(self):
+        episode_url = self.episodes[0].relative_url(self.site)
+        render_urls = build_static_site.render_urls
+
+        def fail_episode(urls, output_dir):
+            return [
+                (url, 500 if url == episode_url else status, duration)
+                for url, status, duration in render_urls(urls, output_dir)
+            ]
+
+        with mock.patch.object(build_static_site, "render_urls", side_effect=fail_episode):
+            self.build()
+
+        self.assertNotIn(episode_url, self.manifest())
+        self.assertIn("1 of 6 pages need rendering", self.build(incremental=True))
+        self.assertIn(episode_url, self.manifest())
+
+    def test_renders_in_worker_processes(self):
+        self.build(processes=2)
+
+        self.assertEqual(len(self.manifest()), 6)
+        for url in self.manifest():
+            self.assertTrue(os.path.exists(self.path(url)), url)
+
+
+def apps_ready():
+    from django.apps import apps
+
+    return apps.ready
+
+
+class WorkerPoolTests(SimpleTestCase):
+    # A worker that can't unpickle its task dies and is replaced, forever
+    TIMEOUT = 30
+
+    def test_forked_workers(self):
+        with worker_pool(2) as pool:
+            self.assertTrue(pool.apply_async(apps_ready).get(self.TIMEOUT))
+
+    def test_spawned_workers_set_django_up(self):
+        with mock.patch("multiprocessing.get_all_start_methods", return_value=["spawn"]):
+            with worker_pool(1) as pool:
+                self.assertTrue(pool.apply_async(apps_ready).get(self.TIMEOUT))
+
+
+class WarmCachesTests(PodcastTestCase):
+    def test_builds_feed_pages_and_renditions(self):
+        episode = self.create_episode(1)
+        out = StringIO()
+
+        call_command("warm_caches", jobs=1, stdout=out)
+
+        self.assertIn("Warmed caches", out.getvalue())
+        self.assertIsNotNone(get_artifact("feed"))
+        self.assertIsNotNone(get_artifact(page_artifact_name(episode.pk)))
+        self.assertEqual(self.cover_image.renditions.count(), len(COVER_RENDITIONS))
+
+    def test_per_process_caches_not_warmed_for_a_server(self):
+        self.create_episode(1)
+        out = StringIO()
+
+        with mock.patch(
+            "podcast.management.commands.warm_caches.fetch", return_value=0
+        ) as fetch, mock.patch.object(redirect_table, "get_entries") as get_entries:
+            call_command("warm_caches", url="http://127.0.0.1:8000", jobs=1, stdout=out)
+
+        self.assertEqual(fetch.call_count, 3)
+        get_entries.assert_not_called()
+        self.assertRegex(out.getvalue(), r"settings\s+n/a")
+
+
+class LoadTestTests(SimpleTestCase):
+    def test_parse_access_log(self):
+        line = '1.2.3.4 - - [10/Oct/2025:13:55:{} +0000] "{} HTTP/1.1" {} 512 "-" "-"'
+        lines = [
+            line.format(36, "GET /feed.xml", 200),
+            line.format(38, "POST /admin/login/", 302),
+            "not a log line",
+            line.format(41, "GET /media/episodes/001.mp3", 206),
+            line.format(42, "HEAD /episodes/001/", 200),
+        ]
+
+        self.assertEqual(
+            list(parse_access_log(lines)),
+            [
+                (0, "GET", "/feed.xml", {}),
+                (5, "GET", "/media/episodes/001.mp3", {"Range": AUDIO_RANGE}),
+                (6, "HEAD", "/episodes/001/", {}),
+            ],
+        )
+
+    def test_percentile_is_nearest_rank(self):
+        values = [0.001, 0.002, 0.003, 0.004, 0.005]
+
+        self.assertEqual(percentile(values, 50), 3.0)
+        self.assertEqual(percentile(values, 95), 5.0)
+        self.assertEqual(percentile(values, 20), 1.0)
+        self.assertEqual(percentile(values, 0), 1.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_results_separate_server_and_client_errors(self):
+        results = Results()
+        for status in (200, 200, 404, 429, 500, "error"):
+            results.add("feed", 0.01, status)
+
+        [report] = results.summary(elapsed=2).values()
+
+        self.assertEqual(report["requests"], 6)
+        self.assertEqual(report["rps"], 3)
+        self.assertAlmostEqual(report["error_rate"], 2 / 6)
+        self.assertAlmostEqual(report["client_error_rate"], 2 / 6)
+        self.assertEqual(
+            report["statuses"], {"200": 2, "404": 1, "429": 1, "500": 1, "error": 1}
+        )
+
+
+class ImportProfileTests(SimpleTestCase):
+    def test_parse_importtime(self):
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   requests.compat\n"
+            "import time:       580 |        700 | requests\n"
+            "usage: manage.py\n"
+        )
+
+        self.assertEqual(
+            parse_importtime(output),
+            [("requests.compat", 120, 120), ("requests", 580, 700)],
+        )
+
+
+class EpisodeAPITests(PodcastTestCase):
+    def test_list_pages_with_cursor(self):
+        for number in range(1, 4):
+            self.create_episode(number, transcript="<p>moss</p>")
+
+        first = self.client.get("/api/episodes/?page_size=2").json()
+        second = self.client.get(first["next"]).json()
+
+        self.assertEqual([e["number"] for e in first["results"]], [3, 2])
+        self.assertEqual([e["number"] for e in second["results"]], [1])
+        self.assertNotIn("transcript", first["results"][0])
+        self.assertNotIn("cover", first["results"][0])
+
+    def test_sparse_fieldsets(self):
+        self.create_episode(1, transcript="<p>moss</p>")
+
+        response = self.client.get("/api/episodes/?fields=number,transcript")
+
+        self.assertEqual(
+            response.json()["results"], [{"number": 1, "transcript": "<p>moss</p>"}]
+        )
+        self.assertEqual(
+            self.client.get("/api/episodes/?fields=number,bogus").status_code, 400
+        )
+
+    def test_unknown_query_parameters_rejected(self):
+        self.create_episode(1)
+
+        self.assertEqual(self.client.get("/api/episodes/?utm_source=x").status_code, 400)
+        self.assertEqual(self.client.get("/api/episodes/1/?cursor=x").status_code, 400)
+
+    def test_cached_once_per_set_of_parameters(self):
+        self.create_episode(1)
+        self.client.get("/api/episodes/?page_size=2&fields=title,number")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/episodes/?fields=number,title&page_size=2")
+
+        self.assertEqual(response.json()["results"], [{"title": "Episode 1", "number": 1}])
+        self.assertFalse(
+            [q for q in queries.captured_queries if "podcastepisodepage" in q["sql"]]
+        )
+
+    def test_detail_includes_cover_renditions(self):
+        self.create_episode(7)
+
+        episode = self.client.get("/api/episodes/7/").json()
+
+        self.assertEqual(episode["title"], "Episode 7")
+        self.assertEqual(set(episode["cover"]), set(COVER_RENDITIONS))
+        self.assertEqual(self.client.get("/api/episodes/8/").status_code, 404)
+
+    def test_cached_with_conditional_get(self):
+        self.create_episode(1)
+        response = self.client.get("/api/episodes/")
+
+        with CaptureQueriesContext(connection) as queries:
+            not_modified = self.client.get(
+                "/api/episodes/", HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertFalse(
+            [q for q in queries.captured_queries if "podcastepisodepage" in q["sql"]]
+        )
+
+        self.create_episode(2)
+        refreshed = self.client.get("/api/episodes/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertEqual(refreshed.json()["results"][0]["number"], 2)
+
+
+class WebSubTests(PodcastTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hub = LocalHub(("127.0.0.1", 0))
+        threading.Thread(target=self.hub.serve_forever, daemon=True).start()
+        self.addCleanup(self.hub.server_close)
+        self.addCleanup(self.hub.shutdown)
+        hub_override = override_settings(PODCAST_WEBSUB_HUB=self.hub.url)
+        hub_override.enable()
+        self.addCleanup(hub_override.disable)
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("Timed out waiting for the hub")
+            time.sleep(0.01)
+
+    def test_feeds_advertise_hub(self):
+        self.create_episode(1)
+
+        self.assertContains(
+            self.client.get("/feed.xml"), f'href="{self.hub.url}" rel="hub"'
+        )
+        self.assertEqual(
+            self.client.get("/feed.json").json()["hubs"],
+            [{"type": "WebSub", "url": self.hub.url}],
+        )
+
+    def test_publishing_pings_hub(self):
+        episode = self.create_episode(1)
+        self.wait_for(lambda: len(self.hub.published) == 2)
+        self.hub.published.clear()
+        pings = bus.stats()["hub_pings"]
+
+        with self.committed():
+            episode.save_revision().publish()
+
+        # Saving the page and publishing it are coalesced into one ping, for both feeds
+        self.assertEqual(bus.stats()["hub_pings"], pings + 1)
+        self.wait_for(lambda: len(self.hub.published) == 2)
+        root_url = f"https://{settings.PODCAST_DOMAIN}"
+        self.assertEqual(
+            sorted(self.hub.published), [f"{root_url}/feed.json", f"{root_url}/feed.xml"]
+        )
+
+    def test_both_feeds_pinged_in_one_request_outside_the_task(self):
+        threads = []
+        send = requests.post
+
+        def post(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return send(*args, **kwargs)
+
+        with mock.patch("podcast.websub.requests.post", side_effect=post):
+            notify_hub()
+            self.wait_for(lambda: len(self.hub.published) == 2)
+
+        # The immediate backend would run the task in the editor's request
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    @override_settings(
+        TASKS={"default": {"BACKEND": "django_tasks.backends.dummy.DummyBackend"}}
+    )
+    def test_ping_queued_for_a_task_worker(self):
+        default_task_backend.clear()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_hub()
+
+        [result] = default_task_backend.results
+        self.assertEqual(result.task, ping_hub)
+        self.assertEqual(result.args, [self.hub.url, feed_urls()])
+
+    def test_saving_a_draft_does_not_ping_hub(self):
+        episode = self.create_episode(1)
+
+        with mock.patch("podcast.websub.notify_hub") as notify_hub:
+            with self.committed():
+                episode.title = "Episode 1, draft"
+                episode.save_revision()
+            with self.committed():
+                self.create_episode(2, live=False)
+
+        notify_hub.assert_not_called()
+
+    def test_local_hub_verifies_and_delivers(self):
+        received = []
+
+        class Subscriber(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlsplit(self.path).query)
+                body = query["hub.challenge"][0] if query else "<rss/>"
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def do_POST(self):
+                received.append(self.rfile.read(int(self.headers["Content-Length"])))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        subscriber = ThreadingHTTPServer(("127.0.0.1", 0), Subscriber)
+        threading.Thread(target=subscriber.serve_forever, daemon=True).start()
+        self.addCleanup(subscriber.server_close)
+        self.addCleanup(subscriber.shutdown)
+        callback = f"http://127.0.0.1:{subscriber.server_port}/callback"
+        topic = f"http://127.0.0.1:{subscriber.server_port}/feed.xml"
+
+        subscribe = {"hub.mode": "subscribe", "hub.topic": topic, "hub.callback": callback}
+        self.assertEqual(requests.post(self.hub.url, data=subscribe).status_code, 202)
+        self.wait_for(lambda: self.hub.subscriptions.get(topic))
+        requests.post(self.hub.url, data={"hub.mode": "publish", "hub.url": topic})
+        self.wait_for(lambda: received)
+
+        self.assertEqual(received, [b"<rss/>"])
+
+
+@override_settings(
+    TASKS={"default": {"BACKEND": "django_tasks.backends.dummy.DummyBackend"}}
+)
+class ScheduledReleaseTests(PodcastTestCase):
+    def setUp(self):
+        super().setUp()
+        default_task_backend.clear()
+        # Settings are created on first use, which would invalidate the cache
+        PodcastSettings.for_site(Site.objects.get(is_default_site=True))
+        self.create_episode(1)
+        self.go_live_at = timezone.now().replace(microsecond=0) + datetime.timedelta(hours=1)
+        self.episode = self.create_episode(2, live=False)
+        self.episode.go_live_at = self.go_live_at
+        with self.committed():
+            self.episode.save_revision().publish()
+        self.revision = self.episode.revisions.get(approved_go_live_at__isnull=False)
+
+    def release(self):
+        with self.committed(), mock.patch(
+            "django.utils.timezone.now",
+            return_value=self.go_live_at + datetime.timedelta(seconds=1),
+        ):
+            return publish_release.call(self.revision.pk, self.go_live_at.isoformat())
+
+    def test_schedule_queues_prepare_and_publish(self):
+        tasks = {
+            result.task.name: result.task.run_after
+            for result in default_task_backend.results
+            if result.task.module_path.startswith("podcast.releases.")
+        }
+
+        self.assertEqual(
+            tasks,
+            {
+                "prepare_release": self.go_live_at - datetime.timedelta(minutes=10),
+                "publish_release": self.go_live_at,
+            },
+        )
+
+    def release_tasks(self):
+        return [
+            (result.task.name, result.args)
+            for result in default_task_backend.results
+            if result.task.module_path.startswith("podcast.releases.")
+        ]
+
+    def test_saving_again_does_not_queue_twice(self):
+        queued = self.release_tasks()
+
+        with self.committed():
+            self.revision.save()
+        self.assertEqual(self.release_tasks(), queued)
+
+        later = self.go_live_at + datetime.timedelta(hours=1)
+        with self.committed():
+            self.revision.approved_go_live_at = later
+            self.revision.save()
+        self.assertEqual(
+            self.release_tasks()[len(queued) :],
+            [
+                ("prepare_release", [self.revision.pk, later.isoformat()]),
+                ("publish_release", [self.revision.pk, later.isoformat()]),
+            ],
+        )
+
+    def test_publication_date_schedules_only_when_enabled(self):
+        form_class = PodcastEpisodePage.get_edit_handler().get_form_class()
+
+        form = form_class(instance=self.episode, parent_page=self.index)
+        self.assertNotIn("schedules it", form.fields["publication_date"].help_text)
+        with override_settings(PODCAST_SCHEDULE_FUTURE_EPISODES=True):
+            form = form_class(instance=self.episode, parent_page=self.index)
+        self.assertIn("schedules it", form.fields["publication_date"].help_text)
+
+    def test_prepared_release_swapped_in(self):
+        prepare_release.call(self.revision.pk, self.go_live_at.isoformat())
+
+        self.episode.refresh_from_db()
+        self.assertFalse(self.episode.live)
+        self.assertNotContains(self.client.get("/feed.xml"), "Episode 2")
+
+        report = self.release()
+
+        self.assertTrue(report["prepared"])
+        with CaptureQueriesContext(connection) as queries:
+            feed = self.client.get("/feed.xml")
+        self.assertContains(feed, "Episode 2")
+        self.assertFalse(
+            [q for q in queries.captured_queries if "podcastepisodepage" in q["sql"]]
+        )
+        self.assertIsNotNone(get_artifact(page_artifact_name(self.episode.pk)))
+
+    def test_each_page_prepared_in_its_own_transaction(self):
+        renders = []
+        get_response = BaseHandler.get_response
+
+        def record(handler, request):
+            # The savepoint standing in for the transaction, under the test's
+            renders.append(
+                (
+                    connection.savepoint_ids[-1],
+                    PodcastEpisodePage.objects.live().filter(pk=self.episode.pk).exists(),
+                )
+            )
+            return get_response(handler, request)
+
+        with mock.patch.object(BaseHandler, "get_response", autospec=True, side_effect=record):
+            prepare_release.call(self.revision.pk, self.go_live_at.isoformat())
+
+        # Editors wait on the write lock for one page at a time
+        self.assertGreater(len(renders), 1)
+        self.assertEqual(len({savepoint for savepoint, _ in renders}), len(renders))
+        self.assertTrue(all(live for _, live in renders))
+        self.assertFalse(PodcastEpisodePage.objects.live().filter(pk=self.episode.pk).exists())
+
+    def test_stale_preparation_not_used(self):
+        prepare_release.call(self.revision.pk, self.go_live_at.isoformat())
+        # Another publish after preparing
+        cache_module.invalidate()
+
+        report = self.release()
+
+        self.assertFalse(report["prepared"])
+        self.assertContains(self.client.get("/feed.xml"), "Episode 2")
+
+
+class InvalidationBusTests(PodcastTestCase):
+    def test_batch_flushed_once(self):
+        episodes = [self.create_episode(number) for number in range(1, 4)]
+        before = bus.stats()
+        version = cache_module.get_version()
+
+        with bus.batch():
+            with self.captureOnCommitCallbacks(execute=True):
+                for episode in episodes:
+                    episode.save()
+                    episode.save_revision().publish()
+                # Nothing is invalidated before the changes are visible
+                self.assertEqual(cache_module.get_version(), version)
+            self.assertEqual(cache_module.get_version(), version)
+
+        after = bus.stats()
+        self.assertEqual(cache_module.get_version(), version + 1)
+        self.assertEqual(after["flushes"] - before["flushes"], 1)
+        # Each episode's live change and its draft
+        self.assertEqual(after["flushed_keys"] - before["flushed_keys"], 6)
+
+    def test_rolled_back_changes_not_invalidated(self):
+        episode = self.create_episode(1)
+        before = bus.stats()
+
+        with self.committed():
+            with transaction.atomic():
+                episode.save()
+                transaction.set_rollback(True)
+
+        self.assertEqual(bus.stats()["flushes"], before["flushes"])
+
+    @override_settings(PODCAST_INVALIDATION_WINDOW=0.5)
+    def test_bulk_saves_flushed_once_after_the_window(self):
+        episodes = [self.create_episode(number) for number in range(1, 4)]
+        before = bus.stats()
+        version = cache_module.get_version()
+
+        # A bulk command's saves, each committed on its own outside any request
+        for episode in episodes:
+            with self.captureOnCommitCallbacks(execute=True):
+                episode.save()
+        timer = bus.timer
+        self.assertEqual(bus.stats()["pending"], 3)
+        self.assertEqual(cache_module.get_version(), version)
+        timer.join()
+
+        after = bus.stats()
+        self.assertEqual(cache_module.get_version(), version + 1)
+        self.assertEqual(after["flushes"] - before["flushes"], 1)
+        self.assertEqual(after["pending"], 0)
+
+    @override_settings(PODCAST_INVALIDATION_WINDOW=0.05)
+    def test_commits_outside_a_batch_flushed_once_per_window(self):
+        local_bus = InvalidationBus()
+        version = cache_module.get_version()
+
+        for number in range(100):
+            with self.captureOnCommitCallbacks(execute=True):
+                local_bus.report(f"episode:{number % 10}")
+        self.assertEqual(cache_module.get_version(), version)
+        local_bus.timer.join()
+
+        self.assertEqual(cache_module.get_version(), version + 1)
+        self.assertEqual(
+            local_bus.stats(),
+            {
+                "reported": 100,
+                "flushed_keys": 10,
+                "flushes": 1,
+                "hub_pings": 0,
+                "pending": 0,
+                "coalesced": 99,
+            },
+        )
+
+
+class SearchIndexTests(PodcastTestCase):
+    def search(self, query):
+        return list(PodcastEpisodePage.objects.live().search(query))
+
+    def test_indexed_when_saved_without_a_worker(self):
+        self.create_episode(1, transcript="<p>A walk through the reed beds</p>")
+
+        self.assertEqual(len(self.search("reed")), 1)
+        self.assertFalse(PendingSearchUpdate.objects.exists())
+
+    @override_settings(
+        TASKS={"default": {"BACKEND": "django_tasks.backends.dummy.DummyBackend"}}
+    )
+    def test_saves_indexed_together_by_one_task(self):
+        episodes = [self.create_episode(number) for number in range(1, 4)]
+        update_search_index.call()
+        default_task_backend.clear()
+        cache.clear()
+
+        with self.committed():
+            for episode in episodes:
+                episode.transcript = "<p>A walk through the reed beds</p>"
+                episode.save()
+
+        self.assertEqual(PendingSearchUpdate.objects.count(), 3)
+        tasks = [
+            result.task.name
+            for result in default_task_backend.results
+            if result.task.module_path.startswith("podcast.")
+        ]
+        self.assertEqual(tasks, ["update_search_index"])
+        self.assertEqual(self.search("reed"), [])
+
+        self.assertEqual(update_search_index.call(), 3)
+
+        self.assertEqual(len(self.search("reed")), 3)
+        self.assertFalse(PendingSearchUpdate.objects.exists())
+
+    def test_rebuild_podcast_index(self):
+        self.create_episode(1, transcript="<p>A walk through the reed beds</p>")
+        IndexEntry.objects.all().delete()
+        self.assertEqual(self.search("reed"), [])
+
+        call_command(
+            "rebuild_podcast_index", processes=1, chunk_size=1, stdout=StringIO()
+        )
+
+        self.assertEqual(len(self.search("reed")), 1)
@@ -1,6 +1,37 @@
-from django.urls import path
-from .views import PodcastFeedView
+from django.conf import settings
+from django.urls import path, re_path
+from .api import EpisodeDetailView, EpisodeListView
+from .views import (
+    AsyncAudioView,
+    AsyncPodcastFeedView,
+    AudioView,
+    MetricsView,
+    PodcastFeedView,
+    serve_episode,
+)
+
+# The ASGI server gets the async views, Gunicorn's sync workers the sync ones
+if settings.PODCAST_ASYNC_VIEWS:
+    feed_view, audio_view = AsyncPodcastFeedView, AsyncAudioView
+else:
+    feed_view, audio_view = PodcastFeedView, AudioView
 
 urlpatterns = [
-    path('feed.xml', PodcastFeedView.as_view(), name='podcast_feed'),
-]
\ No newline at end of file
+    path('feed.xml', feed_view.as_view(), name='podcast_feed'),
+    path('feed.json', feed_view.as_view(artifact='feed.json'), name='podcast_json_feed'),
+    path('metrics/', MetricsView.as_view(), name='podcast_metrics'),
+    # Episode slugs are always the zero-padded episode number
+    re_path(r'^episodes/(?P<slug>\d{3,})/$', serve_episode, name='podcast_episode'),
+    path('api/episodes/', EpisodeListView.as_view(), name='api_episodes'),
+    path('api/episodes/<int:number>/', EpisodeDetailView.as_view(), name='api_episode'),
+]
+
+# Audio is served from the CDN when media lives on Spaces
+if settings.MEDIA_URL.startswith("/"):
+    urlpatterns.append(
+        path(
+            f"{settings.MEDIA_URL.lstrip('/')}episodes/<str:filename>",
+            audio_view.as_view(),
+            name="podcast_audio",
+        )
+    )
@@ -1,11 +1,30 @@
+import json
 import os
+import re
 import traceback
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.http import HttpResponse
+from django.core.files.storage import default_storage
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseForbidden,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.utils.crypto import constant_time_compare
 from django.utils.feedgenerator import Rss201rev2Feed
 from django.views.generic import View
 from django.urls import reverse
+from podcast.cache import (
+    aget_or_build_together,
+    artifact_response,
+    get_or_build_together,
+)
+from podcast.instrumentation import collect_metrics
 from podcast.models import PodcastEpisodePage, PodcastSettings
+from wagtail import hooks
+from wagtail import views as wagtail_views
 from wagtail.models import Site
 
 
@@ -24,6 +43,11 @@ class PodcastFeed(Rss201rev2Feed):
         attrs["xmlns:atom"] = "http://www.w3.org/2005/Atom"
         return attrs
 
+    def cover_url(self):
+        if self.podcast_settings.cover_image:
+            return f"https://{settings.PODCAST_DOMAIN}{self.podcast_settings.cover_image.file.url}"
+        return f"https://{settings.PODCAST_DOMAIN}/media/original_images/cover.jpg"
+
     def add_root_elements(self, handler):
         super().add_root_elements(handler)
 
@@ -58,14 +82,10 @@ class PodcastFeed(Rss201rev2Feed):
         handler.endElement("itunes:owner")
 
         # Cover image
-        if self.podcast_settings.cover_image:
-            cover_url = f"https://{settings.PODCAST_DOMAIN}{self.podcast_settings.cover_image.file.url}"
-        else:
-            cover_url = f"https://{settings.PODCAST_DOMAIN}/media/original_images/cover.jpg"
         handler.addQuickElement(
             "itunes:image",
             "",
-            {"href": cover_url},
+            {"href": self.cover_url()},
         )
 
         # Other iTunes tags - set explicit based on whether any episodes are explicit
@@ -83,6 +103,10 @@ class PodcastFeed(Rss201rev2Feed):
                 "type": "application/rss+xml",
             },
         )
+        if settings.PODCAST_WEBSUB_HUB:
+            handler.addQuickElement(
+                "atom:link", "", {"href": settings.PODCAST_WEBSUB_HUB, "rel": "hub"}
+            )
 
     def add_item_elements(self, handler, item):
         # Add iTunes elements first in the desired order
@@ -140,9 +164,57 @@ class PodcastFeed(Rss201rev2Feed):
         if "summary" in itunes_attrs:
             handler.addQuickElement("itunes:summary", itunes_attrs["summary"])
 
+    def write_json(self):
+        """Return the same feed as JSON Feed 1.1, with the audio as attachments."""
+        items = []
+        for item in self.items:
+            itunes = item["itunes"]
+            items.append(
+                {
+                    "id": item["unique_id"],
+                    "url": item["link"],
+                    "title": item["title"],
+                    "content_html": item["description"],
+                    "image": itunes["image"],
+                    "date_published": item["pubdate"].isoformat(),
+                    "attachments": [
+                        {
+                            "url": item["enclosure"]["url"],
+                            "mime_type": item["enclosure"]["mime_type"],
+                            "size_in_bytes": int(item["enclosure"]["length"]),
+                            "duration_in_seconds": float(itunes["duration"]),
+                        }
+                    ],
+                    "_itunes": item["itunes_json"],
+                }
+            )
+        feed = {
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": self.feed["title"],
+            "home_page_url": self.feed["link"],
+            "feed_url": self.feed["feed_url"].replace("/feed.xml", "/feed.json"),
+            "description": self.feed["description"],
+            "icon": self.cover_url(),
+            "authors": [{"name": self.feed["author_name"]}],
+            "language": self.feed["language"],
+            "_itunes": {"explicit": self.has_explicit_episodes},
+            "items": items,
+        }
+        if settings.PODCAST_WEBSUB_HUB:
+            feed["hubs"] = [{"type": "WebSub", "url": settings.PODCAST_WEBSUB_HUB}]
+        return json.dumps(feed, ensure_ascii=False, separators=(",", ":"))
+
 
 class PodcastFeedView(View):
-    """View to generate the podcast RSS feed."""
+    """
+    View to generate the podcast RSS feed, or the JSON Feed when ``artifact``
+    is ``"feed.json"``. Both are rendered from one query, in the same pass, and
+    cached and invalidated together.
+    """
+
+    artifact = "feed"
+    content_type = "application/rss+xml; charset=utf-8"
+    json_content_type = "application/feed+json; charset=utf-8"
 
     def get(self, request):
         try:
@@ -157,132 +229,367 @@ class PodcastFeedView(View):
                     "No site configured", content_type="text/plain", status=500
                 )
 
-            # Use production URL for the feed regardless of environment
-            root_url = f"https://{settings.PODCAST_DOMAIN}"
-
-            # Get episodes first to check for explicit content
-            episodes = (
-                PodcastEpisodePage.objects.live().public().order_by("-publication_date")
+            # The feeds are rendered and compressed once, then served from the cache
+            artifact = get_or_build_together(
+                self.artifact, lambda: self.render_feeds(site)
             )
+            return artifact_response(request, artifact)
+        except Exception as e:
+            return self.error_response(e)
+
+    def error_response(self, e):
+        error_message = f"Error generating feed: {str(e)}\n{traceback.format_exc()}"
+        return HttpResponse(error_message, content_type="text/plain", status=500)
+
+    def render_feeds(self, site):
+        """Render both feed artifacts for ``site`` from a single build."""
+        feed = self.build_feed(site)
+        return {
+            "feed": (self.render_xml(feed), self.content_type),
+            "feed.json": (feed.write_json(), self.json_content_type),
+        }
+
+    def build_feed(self, site):
+        """Build the ``PodcastFeed`` for ``site``, with every live episode."""
+        # Use production URL for the feed regardless of environment
+        root_url = f"https://{settings.PODCAST_DOMAIN}"
+
+        # Get episodes first to check for explicit content
+        episodes = (
+            PodcastEpisodePage.objects.live().public().order_by("-publication_date")
+        )
 
-            # Get podcast settings from CMS
-            podcast_settings = PodcastSettings.for_site(site)
-
-            # Check if any episodes are explicit to set the show-level explicit flag
-            has_explicit_episodes = episodes.filter(explicit_content=True).exists()
-
-            # Basic feed setup
-            feed = PodcastFeed(
-                title=podcast_settings.title,
-                link=root_url,
-                description=podcast_settings.description,
-                language=podcast_settings.language,
-                author_name=podcast_settings.author,
-                feed_url=f"{root_url}/feed.xml",
-                copyright=podcast_settings.copyright_notice,
-                has_explicit_episodes=has_explicit_episodes,
-                podcast_settings=podcast_settings,
-            )
+        # Get podcast settings from CMS
+        podcast_settings = PodcastSettings.for_site(site)
+
+        # Check if any episodes are explicit to set the show-level explicit flag
+        has_explicit_episodes = episodes.filter(explicit_content=True).exists()
+
+        # Basic feed setup
+        feed = PodcastFeed(
+            title=podcast_settings.title,
+            link=root_url,
+            description=podcast_settings.description,
+            language=podcast_settings.language,
+            author_name=podcast_settings.author,
+            feed_url=f"{root_url}/feed.xml",
+            copyright=podcast_settings.copyright_notice,
+            has_explicit_episodes=has_explicit_episodes,
+            podcast_settings=podcast_settings,
+        )
 
-            for episode in episodes:
-                # Zero-pad the episode number for consistent formatting
-                episode_padded = f"{episode.episode_number:03d}"
-
-                # Get file size accurately
-                try:
-                    if episode.audio_file and os.path.exists(episode.audio_file.path):
-                        file_size = str(os.path.getsize(episode.audio_file.path))
-                    else:
-                        # If we can't get the size, use a reasonable estimate based on duration
-                        # ~128kbps = ~16KB per second of audio
-                        file_size = str(int(episode.duration_in_seconds * 16000))
-                except Exception as e:
-                    # Fallback size
-                    file_size = "15000000"  # 15MB is a reasonable default for a 14-minute episode
-
-                # Fix the duration format to match original (840.05)
-                if episode.duration_in_seconds:
-                    # Make sure we're working with seconds, not milliseconds
-                    seconds_value = episode.duration_in_seconds
-                    # If the value is unreasonably large (over an hour), it might be in milliseconds
-                    if seconds_value > 3600:
-                        # Convert from milliseconds to seconds if needed
-                        seconds_value = (
-                            seconds_value / 60
-                        )  # This assumes the value might be in minutes
-
-                    # Format to 2 decimal places
-                    duration = f"{seconds_value:.2f}"
+        for episode in episodes:
+            # Zero-pad the episode number for consistent formatting
+            episode_padded = f"{episode.episode_number:03d}"
+
+            # Get file size accurately
+            try:
+                if episode.audio_file and os.path.exists(episode.audio_file.path):
+                    file_size = str(os.path.getsize(episode.audio_file.path))
+                else:
+                    # If we can't get the size, use a reasonable estimate based on duration
+                    # ~128kbps = ~16KB per second of audio
+                    file_size = str(int(episode.duration_in_seconds * 16000))
+            except Exception as e:
+                # Fallback size
+                file_size = "15000000"  # 15MB is a reasonable default for a 14-minute episode
+
+            # Fix the duration format to match original (840.05)
+            if episode.duration_in_seconds:
+                # Make sure we're working with seconds, not milliseconds
+                seconds_value = episode.duration_in_seconds
+                # If the value is unreasonably large (over an hour), it might be in milliseconds
+                if seconds_value > 3600:
+                    # Convert from milliseconds to seconds if needed
+                    seconds_value = (
+                        seconds_value / 60
+                    )  # This assumes the value might be in minutes
+
+                # Format to 2 decimal places
+                duration = f"{seconds_value:.2f}"
+            else:
+                # Default to 14 minutes (840.05 seconds)
+                duration = "840.05"
+
+            # Get the episode cover image URL - use production URL with zero-padded episode number
+            if episode.cover_image:
+                image_url = f"{root_url}/media/original_images/{episode_padded}.jpg"
+            else:
+                # Fall back to podcast main cover image
+                if podcast_settings.cover_image:
+                    image_url = f"{root_url}{podcast_settings.cover_image.file.url}"
                 else:
-                    # Default to 14 minutes (840.05 seconds)
-                    duration = "840.05"
+                    image_url = f"{root_url}/media/original_images/cover.jpg"
 
-                # Get the episode cover image URL - use production URL with zero-padded episode number
-                if episode.cover_image:
-                    image_url = f"{root_url}/media/original_images/{episode_padded}.jpg"
+            # Generate an estimated file size if we can't get the actual size
+            try:
+                if os.path.exists(episode.audio_file.path):
+                    file_size = str(os.path.getsize(episode.audio_file.path))
                 else:
-                    # Fall back to podcast main cover image
-                    if podcast_settings.cover_image:
-                        image_url = f"{root_url}{podcast_settings.cover_image.file.url}"
-                    else:
-                        image_url = f"{root_url}/media/original_images/cover.jpg"
-
-                # Generate an estimated file size if we can't get the actual size
-                try:
-                    if os.path.exists(episode.audio_file.path):
-                        file_size = str(os.path.getsize(episode.audio_file.path))
-                    else:
-                        # Estimate based on duration: ~15MB for 14 minutes
-                        file_size = str(int(episode.duration_in_seconds * 1000 * 15))
-                except:
-                    file_size = "15000000"  # Default estimate
-
-                # Add episode to feed with zero-padded URLs
-                feed.add_item(
-                    title=episode.title,
-                    link=f"{root_url}/episodes/{episode_padded}",
-                    description=str(episode.description),
-                    pubdate=episode.publication_date,
-                    unique_id=(
-                        episode.guid
-                        if episode.guid
-                        else f"itm-ep{episode.episode_number}"
-                    ),
-                    enclosure={
-                        "url": f"{root_url}/media/episodes/{episode_padded}.mp3",
-                        "length": file_size,
-                        "mime_type": "audio/mpeg",
-                    },
-                    itunes={
-                        "duration": duration,
-                        "summary": str(episode.description),
-                        "image": image_url,
-                        "explicit": "true" if episode.explicit_content else "false",
-                        "episode": str(episode.season_episode_number),
-                        "season": str(episode.season_number),
-                    },
-                    # Add custom field for episode ID
-                    custom_fields={"epid": episode_padded},
-                )
+                    # Estimate based on duration: ~15MB for 14 minutes
+                    file_size = str(int(episode.duration_in_seconds * 1000 * 15))
+            except:
+                file_size = "15000000"  # Default estimate
+
+            # Add episode to feed with zero-padded URLs
+            feed.add_item(
+                title=episode.title,
+                link=f"{root_url}/episodes/{episode_padded}",
+                description=str(episode.description),
+                pubdate=episode.publication_date,
+                unique_id=(
+                    episode.guid
+                    if episode.guid
+                    else f"itm-ep{episode.episode_number}"
+                ),
+                enclosure={
+                    "url": f"{root_url}/media/episodes/{episode_padded}.mp3",
+                    "length": file_size,
+                    "mime_type": "audio/mpeg",
+                },
+                itunes={
+                    "duration": duration,
+                    "summary": str(episode.description),
+                    "image": image_url,
+                    "explicit": "true" if episode.explicit_content else "false",
+                    "episode": str(episode.season_episode_number),
+                    "season": str(episode.season_number),
+                },
+                # Add custom field for episode ID
+                custom_fields={"epid": episode_padded},
+                itunes_json=self.itunes_json(episode),
+            )
 
-            # Generate and return the feed
-            # Use a custom formatter to get proper indentation
-            response = HttpResponse(content_type="application/rss+xml; charset=utf-8")
+        return feed
+
+    def itunes_json(self, episode):
+        """The JSON Feed ``_itunes`` extension of an episode item."""
+        itunes = {}
+        # Optional in the admin, unlike the season
+        if episode.season_episode_number is not None:
+            itunes["episode"] = episode.season_episode_number
+        itunes["season"] = episode.season_number
+        itunes["explicit"] = episode.explicit_content
+        return itunes
+
+    def render_xml(self, feed):
+        """Render ``feed`` as pretty-printed XML."""
+        # Pretty print the XML with indentation
+        from xml.dom import minidom
+
+        xml_str = feed.writeString("utf-8")
+        parsed = minidom.parseString(xml_str)
+        pretty_xml = parsed.toprettyxml(indent="  ")
+
+        # Remove extra blank lines that minidom sometimes adds
+        pretty_xml = "\n".join(
+            [line for line in pretty_xml.split("\n") if line.strip()]
+        )
 
-            # Pretty print the XML with indentation
-            from xml.dom import minidom
+        return pretty_xml
 
-            xml_str = feed.writeString("utf-8")
-            parsed = minidom.parseString(xml_str)
-            pretty_xml = parsed.toprettyxml(indent="  ")
 
-            # Remove extra blank lines that minidom sometimes adds
-            pretty_xml = "\n".join(
-                [line for line in pretty_xml.split("\n") if line.strip()]
-            )
+class AsyncPodcastFeedView(PodcastFeedView):
+    """
+    The feed for the ASGI server. Cache hits are answered without leaving the
+    event loop; only a rebuild runs in a worker thread.
+    """
 
-            response.write(pretty_xml)
-            return response
+    async def get(self, request):
+        try:
+            site = await Site.objects.filter(is_default_site=True).afirst()
+            if site is None:
+                site = await Site.objects.afirst()
+
+            if not site:
+                return HttpResponse(
+                    "No site configured", content_type="text/plain", status=500
+                )
+
+            artifact = await aget_or_build_together(
+                self.artifact, lambda: self.render_feeds(site)
+            )
+            return artifact_response(request, artifact)
         except Exception as e:
-            error_message = f"Error generating feed: {str(e)}\n{traceback.format_exc()}"
-            return HttpResponse(error_message, content_type="text/plain", status=500)
+            return self.error_response(e)
+
+
+def find_episode(request, slug):
+    """
+    Return the live episode served at ``request.path``, found by its episode
+    number in a single indexed query, or ``None`` if it isn't there.
+    """
+    try:
+        episode = (
+            PodcastEpisodePage.objects.live()
+            .select_related("cover_image")
+            .get(episode_number=int(slug))
+        )
+    except PodcastEpisodePage.DoesNotExist:
+        return None
+    if episode.slug != slug:
+        return None
+    # The episode must really live at this URL on this site, e.g. if the
+    # index has been renamed the normal tree walk decides instead
+    site = Site.find_for_request(request)
+    if site is None or episode.relative_url(site, request) != request.path:
+        return None
+    return episode
+
+
+def serve_episode(request, slug):
+    """
+    Serve ``/episodes/NNN/`` without walking the page tree.
+
+    The episode is served as Wagtail's own serve view would, through the
+    ``on_serve_page`` and ``before_serve_page`` hooks, so view restrictions
+    and the user bar behave as usual. Anything this doesn't recognise falls
+    back to normal Wagtail routing.
+    """
+    episode = find_episode(request, slug)
+    if episode is None:
+        return wagtail_views.serve(request, request.path_info.lstrip("/"))
+
+    args, kwargs = [], {}
+    on_serve_chain = wagtail_views.serve_chain
+    for fn in reversed(hooks.get_hooks("on_serve_page")):
+        on_serve_chain = fn(on_serve_chain)
+    for fn in hooks.get_hooks("before_serve_page"):
+        result = fn(episode, request, args, kwargs)
+        if isinstance(result, HttpResponse):
+            return result
+    return on_serve_chain(episode, request, args, kwargs)
+
+
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Read size when streaming audio files
+AUDIO_CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """
+    Return the inclusive ``(start, end)`` byte range requested by a Range
+    header, or ``None`` to send the whole file.
+
+    Only single ranges are supported, which is all podcast apps ask for.
+    Raises ``ValueError`` when the range can't be satisfied.
+    """
+    match = RANGE_HEADER.match(header.strip()) if header else None
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # A suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+class AudioView(View):
+    """
+    Stream episode audio from the media storage, with Range support.
+
+    Only used when media is stored locally; on Spaces the CDN serves audio.
+    """
+
+    http_method_names = ["get", "head"]
+
+    def get(self, request, filename):
+        name = f"episodes/{filename}"
+        if not filename.endswith(".mp3") or not default_storage.exists(name):
+            raise Http404
+        size = default_storage.size(name)
+        return self.build_response(request, name, size)
+
+    def build_response(self, request, name, size):
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        start, end = byte_range or (0, size - 1)
+        if request.method == "HEAD":
+            response = HttpResponse(status=206 if byte_range else 200)
+        else:
+            response = StreamingHttpResponse(
+                self.stream(name, start, end - start + 1),
+                status=206 if byte_range else 200,
+            )
+        response["Content-Type"] = "audio/mpeg"
+        response["Content-Length"] = str(end - start + 1)
+        response["Accept-Ranges"] = "bytes"
+        if byte_range:
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return response
+
+    def stream(self, name, start, length):
+        with default_storage.open(name, "rb") as f:
+            f.seek(start)
+            while length > 0:
+                chunk = f.read(min(AUDIO_CHUNK_SIZE, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+
+
+def file_io(fn):
+    """
+    Run ``fn`` in the thread pool. File access doesn't touch the database, so
+    it needn't queue on the single thread that ``sync_to_async`` uses by
+    default.
+    """
+    return sync_to_async(fn, thread_sensitive=False)
+
+
+class AsyncAudioView(AudioView):
+    """
+    Audio for the ASGI server. A slow listener only holds a coroutine, and a
+    thread is borrowed just long enough to read each chunk.
+    """
+
+    async def get(self, request, filename):
+        name = f"episodes/{filename}"
+        if not filename.endswith(".mp3") or not await file_io(default_storage.exists)(
+            name
+        ):
+            raise Http404
+        size = await file_io(default_storage.size)(name)
+        return self.build_response(request, name, size)
+
+    async def stream(self, name, start, length):
+        f = await file_io(default_storage.open)(name, "rb")
+        try:
+            await file_io(f.seek)(start)
+            while length > 0:
+                chunk = await file_io(f.read)(min(AUDIO_CHUNK_SIZE, length))
+                if not chunk:
+                    break
+                length -= len(chunk)
+                yield chunk
+        finally:
+            await file_io(f.close)()
+
+
+class MetricsView(View):
+    """Aggregated request metrics, for superusers or holders of the metrics token."""
+
+    def get(self, request):
+        token = settings.PODCAST_METRICS_TOKEN
+        authorization = request.headers.get("Authorization", "")
+        user = getattr(request, "user", None)
+        if not (
+            (token and constant_time_compare(authorization, f"Bearer {token}"))
+            or (user is not None and user.is_superuser)
+        ):
+            return HttpResponseForbidden()
+
+        return JsonResponse(collect_metrics())
@@ -1,23 +1,48 @@
 from django.urls import reverse
 from wagtail import hooks
 from wagtail.admin.menu import MenuItem
+from wagtail.admin.ui.sidebar import LinkMenuItem as LinkMenuItemComponent
 
+from podcast.cache import get_cached
 
-@hooks.register("register_admin_menu_item")
-def register_podcast_menu_item():
-    # Find the podcast index page to get its ID
+
+def get_podcast_index_id():
+    """Return the ID of the live podcast index, cached until the page tree changes."""
     from podcast.models import PodcastIndexPage
 
-    podcast_index = PodcastIndexPage.objects.live().first()
-    if not podcast_index:
-        return None
+    def find_podcast_index_id():
+        podcast_index = PodcastIndexPage.objects.live().first()
+        return podcast_index.pk if podcast_index else None
+
+    return get_cached("podcast-index", find_podcast_index_id)
+
+
+class AddEpisodeMenuItem(MenuItem):
+    """
+    Shortcut to add an episode under the podcast index.
 
-    return MenuItem(
-        "Add Episode",
-        reverse(
+    Wagtail builds menu items once per process, so the index is looked up when
+    the menu is rendered rather than when the item is registered.
+    """
+
+    def is_shown(self, request):
+        return get_podcast_index_id() is not None
+
+    def render_component(self, request):
+        url = reverse(
             "wagtailadmin_pages:add",
-            args=["podcast", "podcastepisodepage", podcast_index.id],
-        ),
-        icon_name="circle-plus",
-        order=10,
-    )
+            args=["podcast", "podcastepisodepage", get_podcast_index_id()],
+        )
+        return LinkMenuItemComponent(
+            self.name,
+            self.label,
+            url,
+            icon_name=self.icon_name,
+            classname=self.classname,
+            attrs=self.attrs,
+        )
+
+
+@hooks.register("register_admin_menu_item")
+def register_podcast_menu_item():
+    return AddEpisodeMenuItem("Add Episode", None, icon_name="circle-plus", order=10)
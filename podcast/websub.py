@@ -0,0 +1,194 @@
+"""
+WebSub (PubSubHubbub) for the feeds.
+
+The feeds advertise ``PODCAST_WEBSUB_HUB`` with a ``rel="hub"`` link, and when
+an episode is published or unpublished, or the podcast settings change, a
+background task tells the hub that the feeds were updated, naming both in one
+request. The hub fetches them once and pushes them to every subscribed
+directory, which can then stop polling on a timer. With the immediate task
+backend, which would run the task inside the editor's request, the ping is
+sent from a daemon thread instead, with a shorter timeout.
+
+``LocalHub`` is a minimal stand-in for a real hub, for development and tests
+(see ``manage.py websub_hub``). It keeps its subscriptions in memory.
+"""
+
+import logging
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+
+import requests
+from django.conf import settings
+from django_tasks import task
+from django_tasks.backends.immediate import ImmediateBackend
+
+logger = logging.getLogger(__name__)
+
+# Paths of the feeds the hub is told about
+FEED_PATHS = ("/feed.xml", "/feed.json")
+
+# Seconds to wait for the hub before giving up on a ping
+PING_TIMEOUT = 10
+
+# The same, for a ping sent from a thread of the process serving requests
+THREAD_PING_TIMEOUT = 3
+
+
+def feed_urls():
+    return [f"https://{settings.PODCAST_DOMAIN}{path}" for path in FEED_PATHS]
+
+
+def send_ping(hub, topics, timeout=PING_TIMEOUT):
+    """Tell ``hub`` that the ``topics`` URLs have new content, in one request."""
+    data = [("hub.mode", "publish")] + [("hub.url", topic) for topic in topics]
+    response = requests.post(hub, data=data, timeout=timeout)
+    response.raise_for_status()
+    return len(topics)
+
+
+@task()
+def ping_hub(hub, topics):
+    """Ping ``hub`` from a task worker."""
+    return send_ping(hub, topics)
+
+
+def ping_in_thread(hub, topics):
+    try:
+        send_ping(hub, topics, timeout=THREAD_PING_TIMEOUT)
+    except requests.RequestException as e:
+        logger.warning("Could not ping %s: %s", hub, e)
+
+
+def notify_hub():
+    """Ping the configured hub, in the background."""
+    hub = settings.PODCAST_WEBSUB_HUB
+    if not hub:
+        return
+    if isinstance(ping_hub.get_backend(), ImmediateBackend):
+        threading.Thread(
+            target=ping_in_thread, args=(hub, feed_urls()), daemon=True
+        ).start()
+    else:
+        ping_hub.enqueue(hub, feed_urls())
+
+
+class LocalHub(ThreadingHTTPServer):
+    """
+    A WebSub hub for local testing.
+
+    Subscription requests are verified against the subscriber's callback, and
+    a publish ping fetches the topic and POSTs it to each subscriber. Every
+    ping is also recorded in ``published``. With ``origin`` set, topics are
+    fetched from that server (e.g. ``http://127.0.0.1:8000``) rather than from
+    the host in their URL.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, origin=None, timeout=10):
+        super().__init__(address, LocalHubHandler)
+        self.origin = origin
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.subscriptions = {}  # topic -> set of callbacks
+        self.published = []
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def verify(self, mode, topic, callback, lease_seconds):
+        """Confirm the subscriber asked for ``mode``, then apply it."""
+        challenge = secrets.token_urlsafe(16)
+        query = urlencode(
+            {
+                "hub.mode": mode,
+                "hub.topic": topic,
+                "hub.challenge": challenge,
+                "hub.lease_seconds": lease_seconds,
+            }
+        )
+        separator = "&" if urlsplit(callback).query else "?"
+        try:
+            response = requests.get(
+                f"{callback}{separator}{query}", timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            logger.warning("Could not verify %s of %s: %s", mode, callback, e)
+            return False
+        if response.status_code // 100 != 2 or response.text != challenge:
+            logger.warning("%s of %s was not confirmed", mode, callback)
+            return False
+        with self.lock:
+            callbacks = self.subscriptions.setdefault(topic, set())
+            if mode == "subscribe":
+                callbacks.add(callback)
+            else:
+                callbacks.discard(callback)
+        return True
+
+    def publish(self, topic):
+        """Fetch ``topic`` and distribute it to its subscribers."""
+        with self.lock:
+            self.published.append(topic)
+            callbacks = list(self.subscriptions.get(topic, ()))
+        if not callbacks:
+            return
+        url = topic
+        if self.origin:
+            origin = urlsplit(self.origin)
+            url = urlunsplit(
+                urlsplit(topic)._replace(scheme=origin.scheme, netloc=origin.netloc)
+            )
+        content = requests.get(url, timeout=self.timeout)
+        headers = {
+            "Content-Type": content.headers.get("Content-Type", ""),
+            "Link": f'<{self.url}>; rel="hub", <{topic}>; rel="self"',
+        }
+        for callback in callbacks:
+            try:
+                requests.post(
+                    callback, data=content.content, headers=headers, timeout=self.timeout
+                )
+            except requests.RequestException as e:
+                logger.warning("Could not deliver %s to %s: %s", topic, callback, e)
+
+
+class LocalHubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        query = parse_qs(self.rfile.read(length).decode())
+        params = {key: values[0] for key, values in query.items()}
+        mode = params.get("hub.mode")
+        if mode == "publish":
+            # A ping can name several topics
+            topics = query.get("hub.url") or query.get("hub.topic")
+            if not topics:
+                return self.reply(400, "hub.url is required")
+            jobs = [(self.server.publish, (topic,)) for topic in topics]
+        elif mode in ("subscribe", "unsubscribe"):
+            topic, callback = params.get("hub.topic"), params.get("hub.callback")
+            if not (topic and callback):
+                return self.reply(400, "hub.topic and hub.callback are required")
+            lease_seconds = params.get("hub.lease_seconds", "86400")
+            jobs = [(self.server.verify, (mode, topic, callback, lease_seconds))]
+        else:
+            return self.reply(400, f"Unsupported hub.mode {mode!r}")
+        # Verification and delivery happen after the request is acknowledged
+        for target, args in jobs:
+            threading.Thread(target=target, args=args, daemon=True).start()
+        self.reply(202, "Accepted")
+
+    def reply(self, status, message):
+        body = message.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info("%s %s", self.address_string(), format % args)
@@ -0,0 +1,8 @@
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "podcast_cms.settings")
+os.environ.setdefault("PODCAST_ASYNC_VIEWS", "True")
+
+application = get_asgi_application()
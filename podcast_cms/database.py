@@ -0,0 +1,77 @@
+"""
+Database configuration helpers used by settings.py.
+
+These only manipulate the settings dictionaries, so they can be imported
+before Django is set up.
+"""
+
+SQLITE_ENGINE = "django.db.backends.sqlite3"
+POSTGRESQL_ENGINE = "django.db.backends.postgresql"
+
+# Applied to every new SQLite connection. WAL lets readers carry on while an
+# editor or an import writes, and NORMAL sync is safe in WAL mode.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -64000,  # in KiB when negative, so ~64MB
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+
+def is_sqlite(database):
+    return database.get("ENGINE") == SQLITE_ENGINE
+
+
+def is_postgresql(database):
+    return database.get("ENGINE") == POSTGRESQL_ENGINE
+
+
+def configure_connections(database, max_age=0, health_checks=False, pool=None):
+    """
+    Configure how connections to ``database`` are reused.
+
+    ``max_age`` keeps a connection open across requests in the same worker
+    thread, and ``health_checks`` pings it before reuse so a restarted server
+    doesn't surface as an error. ``pool`` is a dict of psycopg_pool options
+    (min_size, max_size, timeout) for an in-process PostgreSQL pool, which
+    suits the ASGI server where connections aren't tied to a thread. Django
+    doesn't allow persistent connections alongside a pool, so ``max_age`` is
+    ignored when one is used.
+    """
+    if pool:
+        if not is_postgresql(database):
+            raise ValueError("Connection pooling needs PostgreSQL and psycopg 3")
+        database.setdefault("OPTIONS", {})["pool"] = pool
+        max_age = 0
+    database["CONN_MAX_AGE"] = max_age
+    database["CONN_HEALTH_CHECKS"] = health_checks
+    return database
+
+
+def configure_sqlite(database, pragmas=None):
+    """
+    Tune a SQLite database setting for production use.
+
+    Write transactions start with BEGIN IMMEDIATE, so concurrent writers queue
+    on the busy timeout instead of failing to upgrade a read lock mid-way,
+    while reads (which run in autocommit) never block on them.
+    """
+    pragmas = {**SQLITE_PRAGMAS, **(pragmas or {})}
+    options = database.setdefault("OPTIONS", {})
+    options.setdefault(
+        "init_command",
+        "".join(f"PRAGMA {name}={value};" for name, value in pragmas.items()),
+    )
+    options.setdefault("transaction_mode", "IMMEDIATE")
+    # Python's sqlite3 busy handler, in seconds, matching busy_timeout
+    options.setdefault("timeout", pragmas["busy_timeout"] / 1000)
+    return database
+
+
+def optimize_sqlite(connection):
+    """Run SQLite's incremental planner statistics update."""
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA optimize")
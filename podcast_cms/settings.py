@@ -4,6 +4,8 @@ import sys
 from pathlib import Path
 from django.core.management.utils import get_random_secret_key
 
+from podcast_cms.database import configure_connections, configure_sqlite, is_sqlite
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,24 +48,35 @@ INSTALLED_APPS = [
     "wagtail",
     "modelcluster",
     "taggit",
+    "django_tasks",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
-    "django.contrib.staticfiles",
+    # Ahead of staticfiles so its incremental collectstatic is the one used
     "podcast",
+    "django.contrib.staticfiles",
 ]
 
 MIDDLEWARE = [
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "podcast.instrumentation.PerformanceMiddleware",
+    "podcast.routers.ReplicaMiddleware",
+    # One cache invalidation per request, however many saves it makes
+    "podcast.invalidation.InvalidationMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
+    # Anonymous public GETs skip the session, CSRF, auth and message
+    # middleware below (see podcast/middleware.py)
+    "podcast.middleware.PublicFastPathMiddleware",
+    "podcast.middleware.SessionMiddleware",
+    "podcast.middleware.CsrfViewMiddleware",
+    "podcast.middleware.AuthenticationMiddleware",
+    "podcast.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "wagtail.contrib.redirects.middleware.RedirectMiddleware",
+    # Wagtail's redirects, looked up in memory (see podcast/redirects.py)
+    "podcast.redirects.RedirectMiddleware",
+    "podcast.instrumentation.AdminHookProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "podcast_cms.urls"
@@ -95,6 +108,73 @@ DATABASES = {
     "default": env.db("DATABASE_URL", default="sqlite:///db.sqlite3"),
 }
 
+# Reuse connections across requests instead of reconnecting for every feed
+# poll. DB_POOL switches PostgreSQL to an in-process psycopg pool instead,
+# which needs psycopg 3 (pip install "psycopg[binary,pool]").
+db_pool = None
+if env.bool("DB_POOL", default=False):
+    db_pool = {
+        "min_size": env.int("DB_POOL_MIN_SIZE", default=2),
+        "max_size": env.int("DB_POOL_MAX_SIZE", default=10),
+        "timeout": env.float("DB_POOL_TIMEOUT", default=10),
+    }
+configure_connections(
+    DATABASES["default"],
+    max_age=env.int("DB_CONN_MAX_AGE", default=60),
+    health_checks=env.bool("DB_CONN_HEALTH_CHECKS", default=True),
+    pool=db_pool,
+)
+
+# Optional read replica for public GET traffic (see podcast/routers.py). To try
+# it locally, copy db.sqlite3 and point DATABASE_REPLICA_URL at the copy.
+if env.str("DATABASE_REPLICA_URL", default=""):
+    DATABASES["replica"] = env.db("DATABASE_REPLICA_URL")
+    configure_connections(
+        DATABASES["replica"],
+        max_age=DATABASES["default"]["CONN_MAX_AGE"],
+        health_checks=DATABASES["default"]["CONN_HEALTH_CHECKS"],
+        pool=db_pool,
+    )
+    # Tests run against the primary's test database
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+    DATABASE_ROUTERS = ["podcast.routers.ReplicaRouter"]
+
+# Seconds a user reads from the primary after writing, to hide replication lag
+DATABASE_REPLICA_PIN_SECONDS = env.int("DATABASE_REPLICA_PIN_SECONDS", default=10)
+
+# Requests under these paths always read from the primary
+DATABASE_PRIMARY_PATHS = ("/admin/", "/django-admin/")
+
+# Small single-box deployments run on SQLite: use WAL, tuned pragmas and
+# serialized write transactions (see podcast_cms/database.py)
+if env.bool("SQLITE_TUNED", default=True):
+    for database in DATABASES.values():
+        if is_sqlite(database):
+            configure_sqlite(database)
+
+# Seconds between PRAGMA optimize runs per process, when using SQLite
+SQLITE_OPTIMIZE_INTERVAL = env.int("SQLITE_OPTIMIZE_INTERVAL", default=60 * 60)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Use a shared cache (e.g. pymemcache://127.0.0.1:11211) when running more than
+# one worker, so that publishing invalidates the feed for every process.
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+
+
+# Background tasks
+# Tasks run in the process that enqueues them, once its transaction commits.
+# With TASKS_DATABASE=True they are queued in the database instead, and run by
+# `python manage.py db_worker`.
+if env.bool("TASKS_DATABASE", default=False):
+    INSTALLED_APPS.append("django_tasks.backends.database")
+    TASKS = {"default": {"BACKEND": "django_tasks.backends.database.DatabaseBackend"}}
+else:
+    TASKS = {"default": {"BACKEND": "django_tasks.backends.immediate.ImmediateBackend"}}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -163,7 +243,7 @@ STORAGES = {
         "BACKEND": "django.core.files.storage.FileSystemStorage",
     },
     "staticfiles": {
-        "BACKEND": "django.contrib.staticfiles.storage.ManifestStaticFilesStorage",
+        "BACKEND": "podcast_cms.storage.IncrementalManifestStaticFilesStorage",
     },
 }
 
@@ -186,6 +266,66 @@ WAGTAILADMIN_BASE_URL = env("WAGTAILADMIN_BASE_URL", default="http://localhost:8
 # Podcast technical configuration
 PODCAST_DOMAIN = env("PODCAST_DOMAIN", default="yoursite.com")
 
+# WebSub hub advertised in the feeds and pinged when they change, e.g.
+# https://pubsubhubbub.appspot.com/ (`manage.py websub_hub` runs a local one)
+PODCAST_WEBSUB_HUB = env("PODCAST_WEBSUB_HUB", default="")
+
+# Changes saved outside a request, e.g. by bulk commands, invalidate the cache
+# at most once per this many seconds (see podcast/invalidation.py)
+PODCAST_INVALIDATION_WINDOW = env.float("PODCAST_INVALIDATION_WINDOW", default=2.0)
+
+# Longest an episode save waits to reach the search index when a task worker
+# indexes in batches (see podcast/indexing.py)
+PODCAST_SEARCH_INDEX_DELAY = env.int("PODCAST_SEARCH_INDEX_DELAY", default=10)
+
+# Publishing an episode whose publication date is in the future schedules it
+# to go live at that date, as the admin form's help text then explains
+PODCAST_SCHEDULE_FUTURE_EPISODES = env.bool(
+    "PODCAST_SCHEDULE_FUTURE_EPISODES", default=False
+)
+
+# Seconds before a scheduled episode goes live that its feed and pages are
+# rendered (see podcast/releases.py). Keep it below PODCAST_CACHE_TIMEOUT.
+PODCAST_RELEASE_LEAD = env.int("PODCAST_RELEASE_LEAD", default=10 * 60)
+
+# How long rendered feed and page artifacts are kept. Publishing invalidates
+# them straight away, this only bounds staleness after out-of-band edits.
+PODCAST_CACHE_TIMEOUT = env.int("PODCAST_CACHE_TIMEOUT", default=60 * 60)
+
+# Show superusers a panel of the queries each Wagtail hook runs on admin pages
+PODCAST_ADMIN_PROFILING = env.bool("PODCAST_ADMIN_PROFILING", default=False)
+
+# Request metrics: per-view timings at /metrics/ (superusers, or
+# "Authorization: Bearer <PODCAST_METRICS_TOKEN>"), and in Server-Timing
+# headers, which every client sees, so those are off by default in production
+PODCAST_METRICS_ENABLED = env.bool("PODCAST_METRICS_ENABLED", default=True)
+PODCAST_SERVER_TIMING = env.bool("PODCAST_SERVER_TIMING", default=DEBUG)
+PODCAST_METRICS_TOKEN = env("PODCAST_METRICS_TOKEN", default="")
+PODCAST_METRICS_FLUSH_INTERVAL = env.int("PODCAST_METRICS_FLUSH_INTERVAL", default=10)
+
+# Opt-in profiling: this fraction of requests runs under cProfile, and profiles
+# of requests slower than PODCAST_PROFILE_SLOW_MS are saved for inspection
+PODCAST_PROFILE_SAMPLE_RATE = env.float("PODCAST_PROFILE_SAMPLE_RATE", default=0.0)
+PODCAST_PROFILE_SLOW_MS = env.int("PODCAST_PROFILE_SLOW_MS", default=500)
+PODCAST_PROFILE_DIR = env("PODCAST_PROFILE_DIR", default=os.path.join(BASE_DIR, "profiles"))
+
+# Public routes served without sessions, CSRF, auth or messages, as long as the
+# request has no session cookie. Patterns match the path from its leading "/".
+PODCAST_FAST_PATH_ENABLED = env.bool("PODCAST_FAST_PATH_ENABLED", default=True)
+PODCAST_FAST_PATHS = [
+    r"^/$",
+    r"^/feed\.(xml|json)$",
+    r"^/episodes/",
+    r"^/media/episodes/[^/]+\.mp3$",
+    r"^/search/$",
+    r"^/about/$",
+    r"^/api/episodes/",
+]
+
+# Serve the feed, search and audio with async views. podcast_cms/asgi.py turns
+# this on; Gunicorn's sync workers are better off with the sync views.
+PODCAST_ASYNC_VIEWS = env.bool("PODCAST_ASYNC_VIEWS", default=False)
+
 # Allowed file extensions for documents in the document library
 WAGTAILDOCS_EXTENSIONS = [
     "csv",
@@ -0,0 +1,62 @@
+"""
+Process warm-up for the web servers.
+
+Django imports the URLconf, and with it every view module and most of the
+Wagtail admin, on the first request a process serves, and compiles each
+template the first time it is rendered. ``warm_up()`` does that work ahead of
+time: in the Gunicorn master when the app is preloaded, so that every worker
+forks with it done, or in each worker before it accepts requests otherwise
+(see ``gunicorn.conf.py``).
+
+``worker_pool()`` starts the worker processes of the management commands that
+render or index in parallel.
+"""
+
+import multiprocessing
+
+import django
+from django.core.cache import caches
+from django.db import connections
+
+# Templates of the public pages, compiled once by the cached template loader
+PUBLIC_TEMPLATES = (
+    "base.html",
+    "404.html",
+    "podcast/podcast_index_page.html",
+    "podcast/podcast_episode_page.html",
+    "home/about_page.html",
+    "home/contact_page.html",
+    "search/search.html",
+)
+
+
+def warm_up():
+    from django.template.loader import get_template
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    for name in PUBLIC_TEMPLATES:
+        get_template(name)
+
+
+def close_connections():
+    """
+    Close database and cache connections, which mustn't be shared with the
+    processes forked from this one.
+    """
+    connections.close_all()
+    for cache in caches.all(initialized_only=True):
+        cache.close()
+
+
+def worker_pool(processes):
+    """
+    Return a ``multiprocessing`` pool of ``processes`` workers with Django set
+    up. Workers are forked where the platform allows and inherit this
+    process's setup. Elsewhere they're spawned, and run ``django.setup()``
+    before taking work.
+    """
+    close_connections()
+    start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    context = multiprocessing.get_context(start_method)
+    return context.Pool(processes, initializer=django.setup)
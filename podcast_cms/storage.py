@@ -0,0 +1,200 @@
+"""
+Incremental static files storage.
+
+Every release is exported with ``git archive``, which stamps every file with
+the commit time, so ``collectstatic`` can't use modification times to skip
+anything: each deploy re-copied, re-hashed and re-wrote every project and
+Wagtail admin asset. ``IncrementalManifestStaticFilesStorage`` keeps an index
+of the content hash of every collected source next to the manifest, and only
+copies and post-processes the files whose content changed (plus the CSS and
+JS that refer to them). The manifest and index are written atomically, and
+each hashed file gets ``.gz`` and, with the optional ``brotli`` package,
+``.br`` siblings for nginx's ``gzip_static``/``brotli_static``.
+
+The copy step is skipped by ``podcast``'s ``collectstatic`` command, which asks
+``is_unmodified()`` before falling back to Django's modification time check.
+"""
+
+import json
+import os
+import posixpath
+import tempfile
+from hashlib import md5
+
+from django.contrib.staticfiles.storage import (
+    HashedFilesMixin,
+    ManifestStaticFilesStorage,
+)
+from django.contrib.staticfiles.utils import matches_patterns
+from django.core.files.base import ContentFile
+
+from podcast import cache
+
+# Pre-compressing images, fonts and audio saves next to nothing
+COMPRESSED_EXTENSIONS = (
+    "*.css", "*.js", "*.mjs", "*.map", "*.json", "*.svg", "*.txt", "*.html",
+    "*.xml", "*.ico", "*.ttf", "*.otf", "*.eot",
+)
+
+# The file name each stored encoding is served from by nginx
+ENCODING_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+class IncrementalManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    index_name = "staticfiles.sources.json"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sources = self.load_index()
+        self.source_hashes = {}
+
+    def load_index(self):
+        try:
+            with self.open(self.index_name) as f:
+                return json.loads(f.read().decode()).get("sources", {})
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def source_hash(self, name, source_storage, path):
+        """Return the content hash of the source collected as ``name``."""
+        if name not in self.source_hashes:
+            hasher = md5(usedforsecurity=False)
+            with source_storage.open(path) as f:
+                for chunk in f.chunks():
+                    hasher.update(chunk)
+            self.source_hashes[name] = hasher.hexdigest()
+        return self.source_hashes[name]
+
+    def is_unmodified(self, name, source_storage, path):
+        """Whether ``name`` was already collected from identical content."""
+        return (
+            self.sources.get(name) == self.source_hash(name, source_storage, path)
+            and self.exists(name)
+        )
+
+    def changed_paths(self, paths):
+        """
+        Return the names in ``paths`` that need post-processing: new or
+        changed files, files whose hashed copy is missing, and the CSS and JS
+        that mention any of those by name.
+        """
+        changed = set()
+        for name, (storage, path) in paths.items():
+            hashed_name = self.hashed_files.get(self.hash_key(self.clean_name(name)))
+            if (
+                self.sources.get(name) != self.source_hash(name, storage, path)
+                or hashed_name is None
+                or not self.exists(hashed_name)
+            ):
+                changed.add(name)
+
+        # Post-processing rewrites references to hashed names, so a changed
+        # file changes the hashed name of everything that refers to it.
+        # Matching the bare file name errs on the side of reprocessing.
+        adjustable = {}
+        for name, (storage, path) in paths.items():
+            if name not in changed and matches_patterns(path, self._patterns):
+                with storage.open(path) as f:
+                    adjustable[name] = f.read().decode("utf-8", "replace")
+        while changed and adjustable:
+            basenames = {posixpath.basename(name) for name in changed}
+            dependents = {
+                name
+                for name, content in adjustable.items()
+                if any(basename in content for basename in basenames)
+            }
+            if not dependents:
+                break
+            changed |= dependents
+            for name in dependents:
+                del adjustable[name]
+        return changed
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+
+        changed = self.changed_paths(paths)
+        # Unchanged files keep their hashed names from the last manifest, and
+        # files that are no longer collected drop out of it.
+        self.hashed_files = {
+            key: hashed_name
+            for key, hashed_name in self.hashed_files.items()
+            if key in paths and key not in changed
+        }
+        self.unchanged_files = dict(self.hashed_files)
+        if changed:
+            yield from HashedFilesMixin.post_process(
+                self, {name: paths[name] for name in sorted(changed)}, **options
+            )
+
+        self.compress_files()
+        self.save_manifest()
+        self.sources = {
+            name: self.source_hash(name, storage, path)
+            for name, (storage, path) in paths.items()
+        }
+        self.save_index()
+        self.source_hashes = {}
+
+    def _post_process(self, paths, adjustable_paths, hashed_files):
+        # References to unchanged files resolve to their existing hashed names
+        for key, hashed_name in self.unchanged_files.items():
+            hashed_files.setdefault(key, hashed_name)
+        yield from super()._post_process(paths, adjustable_paths, hashed_files)
+
+    def compress_files(self):
+        """Write the missing compressed siblings of every hashed file."""
+        suffixes = [
+            ENCODING_SUFFIXES[encoding]
+            for encoding in cache.ENCODINGS
+            if encoding != "br" or cache.brotli is not None
+        ]
+        for hashed_name in self.hashed_files.values():
+            if not matches_patterns(hashed_name, COMPRESSED_EXTENSIONS):
+                continue
+            missing = [s for s in suffixes if not self.exists(hashed_name + s)]
+            if not missing or self.size(hashed_name) < cache.MIN_COMPRESS_SIZE:
+                continue
+            with self.open(hashed_name) as f:
+                encoded = cache.compress(f.read())
+            for encoding, content in encoded.items():
+                suffix = ENCODING_SUFFIXES[encoding]
+                if suffix in missing:
+                    self.write_atomically(hashed_name + suffix, content)
+
+    def save_manifest(self):
+        self.manifest_hash = self.file_hash(
+            None,
+            ContentFile(json.dumps(sorted(self.hashed_files.items())).encode()),
+        )
+        payload = {
+            "paths": self.hashed_files,
+            "version": self.manifest_version,
+            "hash": self.manifest_hash,
+        }
+        self.write_atomically(self.manifest_name, json.dumps(payload).encode())
+
+    def save_index(self):
+        payload = {"sources": self.sources}
+        self.write_atomically(self.index_name, json.dumps(payload).encode())
+
+    def write_atomically(self, name, content):
+        """Replace ``name`` in one step, so readers never see a partial file."""
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            # mkstemp creates the file private, nginx needs to read it
+            mode = self.file_permissions_mode
+            if mode is None:
+                umask = os.umask(0)
+                os.umask(umask)
+                mode = 0o666 & ~umask
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
@@ -12,7 +12,11 @@ urlpatterns = [
     path("django-admin/", admin.site.urls),
     path("admin/", include(wagtailadmin_urls)),
     path("documents/", include(wagtaildocs_urls)),
-    path("search/", search_views.search, name="search"),
+    path(
+        "search/",
+        search_views.async_search if settings.PODCAST_ASYNC_VIEWS else search_views.search,
+        name="search",
+    ),
     # Include the podcast app URLs
     path("", include("podcast.urls")),
 ]
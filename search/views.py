@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
 from django.template.response import TemplateResponse
 
@@ -5,7 +6,7 @@ from wagtail.models import Page
 
 # To enable logging of search queries for use with the "Promoted search results" module
 # <https://docs.wagtail.org/en/stable/reference/contrib/searchpromotions.html>
-# uncomment the following line and the lines indicated in the search function
+# uncomment the following line and the lines indicated in get_search_results
 # (after adding wagtail.contrib.search_promotions to INSTALLED_APPS):
 
 # from wagtail.contrib.search_promotions.models import Query
@@ -15,6 +16,35 @@ def search(request):
     search_query = request.GET.get("query", None)
     page = request.GET.get("page", 1)
 
+    return TemplateResponse(
+        request,
+        "search/search.html",
+        {
+            "search_query": search_query,
+            "search_results": get_search_results(search_query, page),
+        },
+    )
+
+
+async def async_search(request):
+    """The search view for the ASGI server."""
+    search_query = request.GET.get("query", None)
+    page = request.GET.get("page", 1)
+
+    # Wagtail's search backends are synchronous, so they run in a worker thread
+    search_results = await sync_to_async(get_search_results)(search_query, page)
+
+    return TemplateResponse(
+        request,
+        "search/search.html",
+        {
+            "search_query": search_query,
+            "search_results": search_results,
+        },
+    )
+
+
+def get_search_results(search_query, page):
     # Search
     if search_query:
         search_results = Page.objects.live().search(search_query)
@@ -36,11 +66,4 @@ def search(request):
     except EmptyPage:
         search_results = paginator.page(paginator.num_pages)
 
-    return TemplateResponse(
-        request,
-        "search/search.html",
-        {
-            "search_query": search_query,
-            "search_results": search_results,
-        },
-    )
+    return search_results